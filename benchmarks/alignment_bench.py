@@ -0,0 +1,82 @@
+"""Time the alignment of a document with its raw MT file and check it on reordered and regenerated files.
+
+The MT file is derived from the parsed document: its segments are shuffled, part of the trans-unit IDs are
+regenerated and part of the segments are removed. A segment counts as correctly aligned if its MT segment has the
+same source string.
+
+Run from the repository root:
+    python -m benchmarks.alignment_bench [--segments 100000] [--regenerated 0.05] [--missing 0.01]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+from benchmarks.sdlxliff import write_sdlxliff
+from source.alignment import align, segment_keys
+from source.parsing import parse_xml_stream
+
+
+def by_seg_id(keys, mt_keys):
+    """Match on segment ID only, like the MT join before the alignment stage."""
+    index = {}
+    for j, key in enumerate(mt_keys):
+        index.setdefault(key[2], j)
+    return [index.get(key[2], -1) for key in keys]
+
+
+def second_file(keys, first):
+    """Move segments after the first ones to a second file, in which segment IDs restart at 1.
+
+    Segment IDs alone are then ambiguous, as in SDLXLIFF files with several file elements.
+    """
+    return [(f + '-2', u, str(int(i) - first)) if int(i) > first else (f, u, i) for f, u, i in keys]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--segments', type=int, default=100000)
+    parser.add_argument('--regenerated', type=float, default=0.05, help='Share of segments with a new trans-unit ID')
+    parser.add_argument('--missing', type=float, default=0.01, help='Share of segments missing in the MT file')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        fp = os.path.join(tmp, 'bench.sdlxliff')
+        write_sdlxliff(fp, args.segments)
+        units = []
+        seg_id, text, _ = parse_xml_stream(fp, units=units)
+    keys = segment_keys(seg_id, units)
+    source = text['source']
+
+    rng = random.Random(args.seed)
+    order = [j for j in range(len(keys)) if rng.random() >= args.missing]
+    rng.shuffle(order)
+    mt_keys = [(f, 'new-{}'.format(u) if rng.random() < args.regenerated else u, i)
+               for f, u, i in (keys[j] for j in order)]
+    mt_source = [source[j] for j in order]
+    keys = second_file(keys, len(keys) // 2)
+    mt_keys = second_file(mt_keys, len(keys) // 2)
+
+    print('{} segments, {} in MT file'.format(len(keys), len(mt_keys)))
+    print('{:>10} | {:>8} | {:>7} | {:>9}'.format('join', 'time [s]', 'correct', 'unaligned'))
+    failed = False
+    for name, run in [('seg id', lambda: by_seg_id(keys, mt_keys)),
+                      ('alignment', lambda: align(keys, source, mt_keys, mt_source)[0])]:
+        start = time.perf_counter()
+        positions = run()
+        elapsed = time.perf_counter() - start
+        correct = sum(j >= 0 and mt_source[j] == source[i] for i, j in enumerate(positions))
+        print('{:>10} | {:>8.3f} | {:>7} | {:>9}'.format(name, elapsed, correct, positions.count(-1)))
+        if name == 'alignment':
+            failed = correct != len(mt_keys)
+
+    if failed:
+        print('Alignment missed segments present in the MT file')
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
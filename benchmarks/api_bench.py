@@ -0,0 +1,95 @@
+"""Compare per-call requests with the pooled DeepLTranslator against a local DeepL stand-in and check its retries.
+
+Run from the repository root:
+    python -m benchmarks.api_bench [--batches 200] [--latency 0.002]
+"""
+import argparse
+import sys
+import time
+
+import requests
+
+from benchmarks.fake_deepl import FakeDeepL
+from source.api import DeepLTranslator, collect_trans_parameters, handle_response, parse_translations
+
+SOURCE = ['Dies ist Satz Nummer {}.'.format(i) for i in range(50)]
+
+
+def per_call(url, batches):
+    """Send batches like post_translation: one requests.post and one key file read per batch."""
+    for _ in range(batches):
+        parameters = collect_trans_parameters(SOURCE, 'EN', source_lang='DE', auth_key='test')
+        response = requests.post(url, params=parameters, headers={'Content-Type': 'application/x-www-form-urlencoded'})
+        parse_translations(handle_response(response))
+
+
+def pooled(url, batches):
+    with DeepLTranslator(auth_key='test', url=url) as translator:
+        for _ in range(batches):
+            translator.translate(SOURCE, 'EN', source_lang='DE')
+
+
+def compare(batches, latency):
+    print('{:>10} | {:>8} | {:>11} | {:>8}'.format('client', 'time [s]', 'connections', 'requests'))
+    for name, run in [('per call', per_call), ('pooled', pooled)]:
+        with FakeDeepL(latency=latency) as server:
+            start = time.perf_counter()
+            run(server.url, batches)
+            elapsed = time.perf_counter() - start
+            print('{:>10} | {:>8.3f} | {:>11} | {:>8}'.format(name, elapsed, server.connections, server.requests))
+
+
+def check_retries():
+    """Return list of failed checks."""
+    failed = []
+
+    # Transient errors are retried until the request succeeds
+    with FakeDeepL(fail=[429, 503, 502], retry_after=0) as server:
+        translator = DeepLTranslator(auth_key='test', url=server.url, backoff=0.01)
+        if translator.translate(SOURCE[:3], 'EN') != SOURCE[:3] or server.requests != 4:
+            failed.append('retry on 429/5xx')
+
+    # Retry-After is honoured
+    with FakeDeepL(fail=[429], retry_after=0.2) as server:
+        start = time.perf_counter()
+        DeepLTranslator(auth_key='test', url=server.url, backoff=0.01).translate(SOURCE[:3], 'EN')
+        if time.perf_counter() - start < 0.2:
+            failed.append('Retry-After header')
+
+    # Persistent errors give up after max_retries
+    with FakeDeepL(fail=[503] * 10) as server:
+        try:
+            DeepLTranslator(auth_key='test', url=server.url, max_retries=2, backoff=0.01).translate(SOURCE[:3], 'EN')
+            failed.append('give up after max_retries')
+        except Exception:
+            if server.requests != 3:
+                failed.append('give up after max_retries')
+
+    # Client errors are not retried
+    with FakeDeepL(fail=[456]) as server:
+        try:
+            DeepLTranslator(auth_key='test', url=server.url, backoff=0.01).translate(SOURCE[:3], 'EN')
+        except Exception:
+            pass
+        if server.requests != 1:
+            failed.append('no retry on 4xx')
+
+    return failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--batches', type=int, default=200)
+    parser.add_argument('--latency', type=float, default=0.002, help='Server delay per request in seconds')
+    args = parser.parse_args()
+
+    compare(args.batches, args.latency)
+
+    failed = check_retries()
+    print('Retry checks: {}'.format('failed: ' + ', '.join(failed) if failed else 'ok'))
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
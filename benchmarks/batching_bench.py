@@ -0,0 +1,72 @@
+"""Compare the former fixed-count batching with the byte-size batch planner against a local DeepL stand-in.
+
+The stand-in rejects URIs above --max-uri bytes with 414. Sample texts contain umlauts, which take up to six bytes
+each once url-encoded.
+
+Run from the repository root:
+    python -m benchmarks.batching_bench [--segments 500] [--max-uri 8192] [--runs 3]
+"""
+import argparse
+import itertools
+import random
+
+from benchmarks.fake_deepl import FakeDeepL
+from benchmarks.levenshtein_bench import WORDS
+from source.api import Error414, DeepLTranslator
+
+
+def make_source(segments, seed=0):
+    rng = random.Random(seed)
+    return [' '.join(rng.choice(WORDS) for _ in range(rng.randint(3, 60))) for _ in range(segments)]
+
+
+def fixed_count(translator, source, max_request_size=50, step=10):
+    """Former new_translation loop: restart the whole sample with 10 segments less per batch on every 414.
+
+    Returns:
+        target -- list of translated strings
+        wasted -- number of segments translated and thrown away
+    """
+    limit = max_request_size
+    wasted = 0
+    while limit >= step:
+        target = []
+        try:
+            for base in range(0, len(source), limit):
+                target += translator.translate(source[base:base + limit], 'EN', source_lang='DE')
+            return target, wasted
+        except Error414:
+            wasted += len(target)
+            limit -= step
+
+    return [], wasted + len(target)
+
+
+def planned(translator, source):
+    batches = translator.plan(source, 'EN', source_lang='DE', max_segments=50)
+    return list(itertools.chain.from_iterable(translator.translate_batches(batches, 'EN', source_lang='DE'))), 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--segments', type=int, default=500)
+    parser.add_argument('--max-uri', type=int, default=8192, help='URI limit of the stand-in server in bytes')
+    parser.add_argument('--runs', type=int, default=3, help='Consecutive samples, showing the learned limit')
+    args = parser.parse_args()
+
+    print('{:>12} | {:>3} | {:>8} | {:>4} | {:>6} | {:>8}'.format('batching', 'run', 'requests', '414s', 'wasted',
+                                                                    'complete'))
+    for name, run in [('fixed count', fixed_count), ('planned', planned)]:
+        with FakeDeepL(max_uri=args.max_uri) as server:
+            translator = DeepLTranslator(auth_key='test', url=server.url, concurrency=1)
+            for i in range(args.runs):
+                source = make_source(args.segments, seed=i)
+                requests, rejected = server.requests, server.statuses[414]
+                target, wasted = run(translator, source)
+                print('{:>12} | {:>3} | {:>8} | {:>4} | {:>6} | {:>8}'.format(
+                    name, i + 1, server.requests - requests, server.statuses[414] - rejected, wasted,
+                    str(target == source)))
+
+
+if __name__ == '__main__':
+    main()
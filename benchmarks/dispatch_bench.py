@@ -0,0 +1,47 @@
+"""Measure MT throughput of DeepLTranslator.translate_batches as concurrency increases, against a local DeepL stand-in.
+
+Run from the repository root:
+    python -m benchmarks.dispatch_bench [--segments 1000] [--batch-size 50] [--latency 0.1] [--concurrency 1 2 4 8 16]
+"""
+import argparse
+import sys
+import time
+
+from benchmarks.fake_deepl import FakeDeepL
+from source.api import DeepLTranslator
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--segments', type=int, default=1000)
+    parser.add_argument('--batch-size', type=int, default=50)
+    parser.add_argument('--latency', type=float, default=0.1, help='Server delay per request in seconds')
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 2, 4, 8, 16])
+    parser.add_argument('--rate-limit', type=float, default=None, help='Maximum requests per second')
+    args = parser.parse_args()
+
+    source = ['Segment {} mit Umlauten äöü.'.format(i) for i in range(args.segments)]
+    batches = [source[i:i + args.batch_size] for i in range(0, len(source), args.batch_size)]
+
+    print('{} segments in {} batches, {:.0f} ms latency'.format(len(source), len(batches), args.latency * 1000))
+    print('{:>11} | {:>8} | {:>12} | {:>11}'.format('concurrency', 'time [s]', 'segments/s', 'connections'))
+    with FakeDeepL(latency=args.latency) as server:
+        for concurrency in args.concurrency:
+            server.connections = 0
+            with DeepLTranslator(auth_key='test', url=server.url, concurrency=concurrency,
+                                 rate_limit=args.rate_limit) as translator:
+                start = time.perf_counter()
+                translations = translator.translate_batches(batches, 'EN', source_lang='DE')
+                elapsed = time.perf_counter() - start
+
+            # The stand-in echoes the source, so the reassembled output must match the input order
+            if [t for batch in translations for t in batch] != source:
+                print('Translations out of order at concurrency {}'.format(concurrency))
+                sys.exit(1)
+
+            print('{:>11} | {:>8.3f} | {:>12.0f} | {:>11}'.format(concurrency, elapsed, len(source) / elapsed,
+                                                                   server.connections))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,138 @@
+"""Local stand-in for the DeepL /v2/translate endpoint.
+
+The server echoes the source strings as translations. It can add latency, reject long URIs with 414 and answer
+the first requests with error codes, e.g. to check retries. It counts requests, answers by status code,
+translated texts and TCP connections.
+
+Run standalone from the repository root:
+    python -m benchmarks.fake_deepl [--port 8080] [--latency 0.05] [--fail 429 503]
+and point a DeepLTranslator to it: DeepLTranslator(auth_key='test', url='http://127.0.0.1:8080/v2/translate')
+"""
+import argparse
+import json
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+
+class FakeDeepL(ThreadingHTTPServer):
+    """Threaded HTTP server mimicking the DeepL translate endpoint.
+
+    Arguments:
+        port -- TCP port on localhost. 0 picks a free port
+        latency -- delay in seconds before each answer
+        fail -- list of status codes returned for the first requests, one per request
+        max_uri -- URI length in bytes above which requests are rejected with 414
+        retry_after -- value of the Retry-After header sent with 429 answers, or None
+    """
+    daemon_threads = True
+
+    def __init__(self, port=0, latency=0.0, fail=(), max_uri=None, retry_after=None):
+        super().__init__(('127.0.0.1', port), TranslateHandler)
+        self.latency = latency
+        self.fail = list(fail)
+        self.max_uri = max_uri
+        self.retry_after = retry_after
+        self.requests = 0
+        self.statuses = Counter()
+        self.texts = 0
+        self.connections = 0
+        self.lock = threading.Lock()
+
+    @property
+    def url(self):
+        return 'http://{}:{}/v2/translate'.format(*self.server_address)
+
+    def start(self):
+        """Serve in a background thread and return self."""
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+class TranslateHandler(BaseHTTPRequestHandler):
+    # HTTP/1.1 keeps connections open between requests
+    protocol_version = 'HTTP/1.1'
+    # Send header and body in one segment. Otherwise Nagle's algorithm delays answers on kept-alive connections.
+    wbufsize = -1
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        body = self.rfile.read(length).decode('utf-8')
+        parameters = parse_qs(urlsplit(self.path).query)
+        parameters.update(parse_qs(body))
+
+        with self.server.lock:
+            self.server.requests += 1
+            status = self.server.fail.pop(0) if self.server.fail else None
+
+        time.sleep(self.server.latency)
+
+        if urlsplit(self.path).path != '/v2/translate':
+            self.answer(404, {'message': 'Not found'})
+        elif self.server.max_uri is not None and len(self.path.encode('utf-8')) > self.server.max_uri:
+            self.answer(414, {'message': 'URI too long'})
+        elif status is not None:
+            headers = {}
+            if status == 429 and self.server.retry_after is not None:
+                headers['Retry-After'] = str(self.server.retry_after)
+            self.answer(status, {'message': 'Simulated error'}, headers)
+        elif 'auth_key' not in parameters:
+            self.answer(403, {'message': 'Authorization failed'})
+        else:
+            texts = parameters.get('text', [])
+            with self.server.lock:
+                self.server.texts += len(texts)
+            self.answer(200, {'translations': [{'detected_source_language': 'EN', 'text': t} for t in texts]})
+
+    def answer(self, status, content, headers=None):
+        data = json.dumps(content).encode('utf-8')
+        with self.server.lock:
+            self.server.statuses[status] += 1
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--latency', type=float, default=0.0, help='Delay per request in seconds')
+    parser.add_argument('--fail', type=int, nargs='*', default=[], help='Status codes for the first requests')
+    parser.add_argument('--max-uri', type=int, default=None, help='Reject longer URIs with 414')
+    args = parser.parse_args()
+
+    server = FakeDeepL(args.port, args.latency, args.fail, args.max_uri)
+    print('Serving on {}'.format(server.url))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
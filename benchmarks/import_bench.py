@@ -0,0 +1,71 @@
+"""Measure import time of the core modules and entry points with python -X importtime and check their dependencies.
+
+Each import runs in a fresh interpreter. The script exits with status 1 if a module pulls in one of the GUI modules
+at import time, or if an entry point takes longer than the budget or pulls in one of the HEAVY modules, so it can
+guard against regressions in CI.
+
+Run from the repository root:
+    python -m benchmarks.import_bench [--repeat 5] [--budget-ms 100]
+"""
+import argparse
+import subprocess
+import sys
+
+# Modules imported by the command line tool, the batch mode and the GUI
+MODULES = ['source.parsing', 'source.sampling', 'source.calculation', 'source.api', 'source.utils',
+           'source.caching']
+# Command line entry points, which import the pipeline on first use
+ENTRY_POINTS = ['pe_density', 'source.batch']
+# Dependencies of the notebook GUI, which the headless modules must not import
+GUI = ['PyQt5', 'ipywidgets', 'matplotlib']
+# Dependencies the entry points must not import before they are needed
+HEAVY = GUI + ['pandas', 'numpy', 'bs4', 'requests', 'pyarrow']
+
+
+def import_profile(module):
+    """Import module in a fresh interpreter.
+
+    Returns:
+        total -- Cumulative import time of module in microseconds
+        imported -- Set of all top-level package names imported along with module
+    """
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import ' + module],
+                            capture_output=True, text=True, check=True)
+    total = None
+    imported = set()
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line.split('|')
+        name = name.strip()
+        imported.add(name.split('.')[0])
+        if name == module:
+            total = int(cumulative)
+
+    return total, imported
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('modules', nargs='*', default=MODULES + ENTRY_POINTS)
+    parser.add_argument('--repeat', type=int, default=5, help='Best of this many runs is reported')
+    parser.add_argument('--budget-ms', type=float, default=100, help='Maximum import time per entry point')
+    args = parser.parse_args()
+
+    failed = False
+    print('{:>20} | {:>9} | {}'.format('module', 'time [ms]', 'unwanted dependencies'))
+    for module in args.modules:
+        runs = [import_profile(module) for _ in range(args.repeat)]
+        best = min(total for total, _ in runs) / 1000
+        entry_point = module in ENTRY_POINTS
+        unwanted = sorted(set(HEAVY if entry_point else GUI) & set.union(*(imported for _, imported in runs)))
+        print('{:>20} | {:>9.1f} | {}'.format(module, best, ', '.join(unwanted) or '-'))
+        failed = failed or (entry_point and best > args.budget_ms) or bool(unwanted)
+
+    if failed:
+        print('Import budget of {:.0f} ms exceeded or unwanted dependency imported'.format(args.budget_ms))
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
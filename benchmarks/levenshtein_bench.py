@@ -0,0 +1,63 @@
+"""Compare per-pair run times of the Levenshtein engines across segment length buckets.
+
+Run from the repository root:
+    python -m benchmarks.levenshtein_bench [--pairs 50] [--seed 1]
+"""
+import argparse
+import random
+import time
+
+from source.calculation import ENGINES
+
+# Segment length buckets in characters (lower bound inclusive, upper bound exclusive)
+BUCKETS = [(1, 50), (50, 150), (150, 300), (300, 600), (600, 1000)]
+WORDS = ['Schraube', 'Ventil', 'Druck', 'der', 'die', 'das', 'mit', 'und', 'wird', 'Gehäuse', 'montiert',
+         'geprüft', 'Temperatur', 'über', '10', 'mm', 'Nm', '°C', 'gemäß', 'Abbildung', 'Anschluss']
+
+
+def make_pair(rng, length):
+    """Create a target string of the given length and a perturbed MT string."""
+    words = []
+    while len(' '.join(words)) < length:
+        words.append(rng.choice(WORDS))
+    target = ' '.join(words)[:length]
+
+    # Edit roughly a fifth of the words to mimic post-editing
+    mt = [rng.choice(WORDS) if rng.random() < 0.2 else w for w in target.split(' ')]
+    return target, ' '.join(mt)
+
+
+def time_engine(engine, pairs):
+    start = time.perf_counter()
+    results = [engine(t, m) for t, m in pairs]
+    return (time.perf_counter() - start) / len(pairs), results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--pairs', type=int, default=50, help='Number of pairs per bucket')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    names = [name for name in ENGINES if name != 'reference']
+
+    print('{:>10} | {:>14} | '.format('chars', 'reference [ms]')
+          + ' | '.join('{:>14} | {:>7}'.format(name + ' [ms]', 'speedup') for name in names))
+
+    for low, high in BUCKETS:
+        pairs = [make_pair(rng, rng.randrange(low, high)) for _ in range(args.pairs)]
+        ref_time, ref_results = time_engine(ENGINES['reference'], pairs)
+
+        row = '{:>10} | {:>14.3f} | '.format('{}-{}'.format(low, high - 1), ref_time * 1000)
+        cells = []
+        for name in names:
+            engine_time, results = time_engine(ENGINES[name], pairs)
+            if results != ref_results:
+                raise AssertionError("Engine '{}' deviates from reference results".format(name))
+            cells.append('{:>14.3f} | {:>6.1f}x'.format(engine_time * 1000, ref_time / engine_time))
+        print(row + ' | '.join(cells))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,56 @@
+"""Measure API traffic and time of repeated, overlapping samples with and without the MT cache.
+
+Samples are drawn from the same pool of segments, like repeated samples from one client. The MT cache is created
+in a temporary folder.
+
+Run from the repository root:
+    python -m benchmarks.mt_cache_bench [--pool 1000] [--sample-size 300] [--runs 5] [--latency 0.05]
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from benchmarks.fake_deepl import FakeDeepL
+from benchmarks.levenshtein_bench import WORDS
+from source.api import DeepLTranslator
+from source.utils import translate_segments
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--pool', type=int, default=1000, help='Number of distinct segments to sample from')
+    parser.add_argument('--sample-size', type=int, default=300)
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--latency', type=float, default=0.05, help='Server delay per request in seconds')
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    pool = [' '.join(rng.choice(WORDS) for _ in range(rng.randint(3, 30))) + ' ({})'.format(i)
+            for i in range(args.pool)]
+    samples = [rng.sample(pool, args.sample_size) for _ in range(args.runs)]
+
+    cwd = os.getcwd()
+    print('{:>8} | {:>3} | {:>8} | {:>13} | {:>8}'.format('MT cache', 'run', 'requests', 'segments sent', 'time [s]'))
+    for use_cache in [False, True]:
+        with tempfile.TemporaryDirectory() as tmp, FakeDeepL(latency=args.latency) as server:
+            # The MT cache is created in data/ below the working directory
+            os.chdir(tmp)
+            try:
+                translator = DeepLTranslator(auth_key='test', url=server.url, concurrency=1)
+                for i, sample in enumerate(samples):
+                    requests, texts = server.requests, server.texts
+                    start = time.perf_counter()
+                    target = translate_segments(sample, 'EN', 'DE', translator=translator, use_cache=use_cache)
+                    elapsed = time.perf_counter() - start
+                    assert target == sample
+                    print('{:>8} | {:>3} | {:>8} | {:>13} | {:>8.3f}'.format(
+                        'on' if use_cache else 'off', i + 1, server.requests - requests, server.texts - texts,
+                        elapsed))
+            finally:
+                os.chdir(cwd)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,50 @@
+"""Measure how pe_density scales with the number of worker processes.
+
+Run from the repository root:
+    python -m benchmarks.parallel_bench [--segments 40000] [--workers 1 2 4 8]
+"""
+import argparse
+import random
+import time
+
+import pandas as pd
+
+from benchmarks.levenshtein_bench import make_pair
+from source.calculation import pe_density
+
+
+def make_table(rng, segments):
+    """Create a table with a mix of short UI strings and long technical segments."""
+    pairs = [make_pair(rng, rng.choice([rng.randrange(5, 40), rng.randrange(40, 200), rng.randrange(200, 1000)]))
+             for _ in range(segments)]
+    target, mt = zip(*pairs)
+    return pd.DataFrame({'file': '', 'unit': '', 'seg_id': range(1, segments + 1), 'source': target, 'target': target, 'mt': mt})
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--segments', type=int, default=40000)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8])
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    df = make_table(random.Random(args.seed), args.segments)
+    print('{} segments, {} characters'.format(args.segments, df['target'].str.len().sum()))
+    print('{:>7} | {:>8} | {:>7}'.format('workers', 'time [s]', 'speedup'))
+
+    baseline = None
+    for workers in args.workers:
+        start = time.perf_counter()
+        cache = pe_density(df.copy(), {}, workers=workers)
+        elapsed = time.perf_counter() - start
+
+        if baseline is None:
+            baseline = elapsed, cache
+        elif cache['ped'] != baseline[1]['ped'] or list(cache['ped_details']) != list(baseline[1]['ped_details']):
+            raise AssertionError('Result with {} workers deviates from the first run'.format(workers))
+
+        print('{:>7} | {:>8.2f} | {:>6.1f}x'.format(workers, elapsed, baseline[0] / elapsed))
+
+
+if __name__ == '__main__':
+    main()
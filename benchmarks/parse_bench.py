@@ -0,0 +1,62 @@
+"""Compare time and peak memory of the SDLXLIFF parsers on synthetic files.
+
+Each measurement runs in a fresh process, so that peak memory is not shared between parsers.
+
+Run from the repository root (Unix only, uses the resource module):
+    python -m benchmarks.parse_bench [--segments 5000 20000 80000]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+from benchmarks.sdlxliff import write_sdlxliff
+
+MEASURE = '''
+import json, resource, sys, time
+from bs4 import BeautifulSoup
+from source.parsing import parse_xml_strings, parse_xml_stream
+
+parser, fp = sys.argv[1:3]
+start = time.perf_counter()
+if parser == 'soup':
+    with open(fp, 'r', encoding='utf-8') as f:
+        result = parse_xml_strings(BeautifulSoup(f, 'lxml'))
+else:
+    result = parse_xml_stream(fp)
+elapsed = time.perf_counter() - start
+print(json.dumps({'time': elapsed, 'rss': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+                  'segments': len(result[0])}))
+'''
+
+
+def measure(parser, fp):
+    output = subprocess.run([sys.executable, '-c', MEASURE, parser, fp], check=True, capture_output=True, text=True,
+                            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))).stdout
+    return json.loads(output)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--segments', type=int, nargs='+', default=[5000, 20000, 80000])
+    parser.add_argument('--parsers', nargs='+', default=['soup', 'stream'])
+    args = parser.parse_args()
+
+    print('{:>8} | {:>9} | {:>6} | {:>8} | {:>13}'.format('segments', 'file [MB]', 'parser', 'time [s]',
+                                                          'peak RSS [MB]'))
+    with tempfile.TemporaryDirectory() as tmp:
+        for segments in args.segments:
+            fp = os.path.join(tmp, 'bench_{}.sdlxliff'.format(segments))
+            write_sdlxliff(fp, segments)
+            size = os.path.getsize(fp) / 2 ** 20
+
+            for name in args.parsers:
+                result = measure(name, fp)
+                print('{:>8} | {:>9.1f} | {:>6} | {:>8.2f} | {:>13.0f}'.format(result['segments'], size, name,
+                                                                              result['time'], result['rss'] / 1024))
+
+
+if __name__ == '__main__':
+    main()
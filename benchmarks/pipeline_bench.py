@@ -0,0 +1,64 @@
+"""Time the full sample, translate and score pipeline offline on synthetic SDLXLIFF files.
+
+MT output comes from the deterministic OfflineTranslator, so no network access or API key is needed.
+
+Run from the repository root:
+    python -m benchmarks.pipeline_bench [--segments 2000 20000] [--sample-size 50 500] [--latency 0.0]
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from benchmarks.sdlxliff import write_sdlxliff
+from source.api import OfflineTranslator
+from source.calculation import pe_density
+from source.parsing import read_from_file
+from source.sampling import new_sample
+from source.utils import match_target_mt, new_translation
+
+
+def run_pipeline(fp, sample_size, translator):
+    """Run the pipeline once and return the time of each stage in seconds and the Post-Edit Density."""
+    times = {}
+    start = time.perf_counter()
+    df, cache = read_from_file(fp, use_cache=False)
+    times['parse'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    sample_object, _ = new_sample(df, sample_size=sample_size)
+    times['sample'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    df = new_translation(df, cache, sample_object, translator=translator)
+    times['translate'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    cache = pe_density(match_target_mt(df), cache)
+    times['score'] = time.perf_counter() - start
+
+    return times, cache['ped']
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--segments', type=int, nargs='+', default=[2000, 20000])
+    parser.add_argument('--sample-size', type=int, nargs='+', default=[50, 500])
+    parser.add_argument('--latency', type=float, default=0.0, help='Simulated MT delay per batch in seconds')
+    args = parser.parse_args()
+
+    translator = OfflineTranslator(latency=args.latency)
+    print('{:>8} | {:>6} | {:>9} | {:>10} | {:>13} | {:>9} | {:>5}'.format(
+        'segments', 'sample', 'parse [s]', 'sample [s]', 'translate [s]', 'score [s]', 'ped'))
+    with tempfile.TemporaryDirectory() as tmp:
+        for segments in args.segments:
+            fp = os.path.join(tmp, 'synthetic_{}.sdlxliff'.format(segments))
+            write_sdlxliff(fp, segments)
+            for sample_size in args.sample_size:
+                times, ped = run_pipeline(fp, sample_size, translator)
+                print('{:>8} | {:>6} | {:>9.3f} | {:>10.3f} | {:>13.3f} | {:>9.3f} | {:>5.3f}'.format(
+                    segments, sample_size, times['parse'], times['sample'], times['translate'], times['score'], ped))
+
+
+if __name__ == '__main__':
+    main()
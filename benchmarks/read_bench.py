@@ -0,0 +1,48 @@
+"""Time read_from_file without the document cache on the files in test/ and on a synthetic SDLXLIFF file.
+
+Run from the repository root:
+    python -m benchmarks.read_bench [--segments 20000] [--repeat 5] [FILE ...]
+"""
+import argparse
+import glob
+import os
+import tempfile
+import time
+
+from benchmarks.sdlxliff import write_sdlxliff
+from source.parsing import read_from_file
+
+
+def time_read(fp, repeat):
+    """Return the best of repeat runs in seconds."""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        read_from_file(fp, use_cache=False)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('files', nargs='*')
+    parser.add_argument('--segments', type=int, default=20000, help='Size of the synthetic SDLXLIFF file')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    files = args.files or sorted(glob.glob(os.path.join('test', '*.htm')))
+    with tempfile.TemporaryDirectory() as tmp:
+        if not args.files and args.segments:
+            fp = os.path.join(tmp, 'synthetic_{}.sdlxliff'.format(args.segments))
+            write_sdlxliff(fp, args.segments)
+            files.append(fp)
+
+        print('{:>40} | {:>9} | {:>8}'.format('file', 'size [kB]', 'time [s]'))
+        for fp in files:
+            print('{:>40} | {:>9.0f} | {:>8.3f}'.format(os.path.basename(fp), os.path.getsize(fp) / 1024,
+                                                         time_read(fp, args.repeat)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+"""Time the search for the sample with the most translatable characters on a synthetic SDLXLIFF file.
+
+Compares the previous approach, which searches every sampled string for letters, with summing letter counts
+precomputed by prepare_sample_object.
+
+Run from the repository root:
+    python -m benchmarks.sampling_bench [--segments 20000] [--sample-size 50 500] [--iterations 7 1000]
+"""
+import argparse
+import os
+import re
+import tempfile
+import time
+
+from benchmarks.sdlxliff import write_sdlxliff
+from source.parsing import read_from_file
+from source.sampling import optimize_sample_object, prepare_sample_object
+
+
+def per_string(filtered_items, sample_size, iterations):
+    """Search letters in each string of each candidate sample, like optimize_sample_object did before."""
+    sample_size = min(filtered_items.shape[0], sample_size)
+    alpha_share = []
+    for _ in range(iterations):
+        text = filtered_items.sample(sample_size)['source']
+        length = 0
+        alpha = 0
+        for i in range(len(text)):
+            length += len(text.iloc[i])
+            alpha += len(re.findall(r'[^\W\d]', text.iloc[i]))
+        alpha_share.append(alpha / length)
+    return max(alpha_share)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--segments', type=int, default=20000)
+    parser.add_argument('--sample-size', type=int, nargs='+', default=[50, 500])
+    parser.add_argument('--iterations', type=int, nargs='+', default=[7, 1000])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        fp = os.path.join(tmp, 'bench.sdlxliff')
+        write_sdlxliff(fp, args.segments)
+        df, _ = read_from_file(fp, use_cache=False)
+
+    start = time.perf_counter()
+    filtered_items = prepare_sample_object(df)
+    print('prepare_sample_object: {} eligible segments in {:.3f} s'.format(filtered_items.shape[0],
+                                                                          time.perf_counter() - start))
+
+    print('{:>6} | {:>10} | {:>14} | {:>14}'.format('sample', 'iterations', 'per string [s]', 'vectorized [s]'))
+    for sample_size in args.sample_size:
+        for iterations in args.iterations:
+            start = time.perf_counter()
+            per_string(filtered_items, sample_size, iterations)
+            reference = time.perf_counter() - start
+
+            start = time.perf_counter()
+            optimize_sample_object(filtered_items, sample_size, iterations=iterations)
+            vectorized = time.perf_counter() - start
+
+            print('{:>6} | {:>10} | {:>14.3f} | {:>14.3f}'.format(sample_size, iterations, reference, vectorized))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+"""Create synthetic SDLXLIFF files for benchmarking the parsers.
+
+Run from the repository root:
+    python -m benchmarks.sdlxliff OUTPUT_PATH [--segments 10000] [--files 1] [--mt]
+"""
+import argparse
+import base64
+import random
+from xml.sax.saxutils import escape
+
+from benchmarks.levenshtein_bench import make_pair
+
+HEADER = ('\ufeff<?xml version="1.0" encoding="utf-8"?>'
+          '<xliff xmlns:sdl="http://sdl.com/FileTypes/SdlXliff/1.0" xmlns="urn:oasis:names:tc:xliff:document:1.2" '
+          'version="1.2" sdl:version="1.0">')
+FILE_HEADER = ('<file original="C:\\Projekte\\{name}.docx" datatype="x-sdlfilterframework2" '
+               'source-language="{s_lid}" target-language="{t_lid}">'
+               '<header><file-info xmlns="http://sdl.com/FileTypes/SdlXliff/1.0">'
+               '<value key="SDL:FileId">0c8e3b5a</value></file-info>'
+               '<reference><internal-file form="base64">{payload}</internal-file></reference></header>'
+               '<body>\n')
+FILE_FOOTER = '</body></file>'
+FOOTER = '</xliff>\n'
+STATUS = ['Translated', 'ApprovedTranslation', 'ApprovedSignOff', 'Draft']
+
+
+def trans_unit(rng, tu, seg, mt=False):
+    """Return a trans-unit with one or two segments and the next free segment id."""
+    pairs = [make_pair(rng, rng.randrange(5, 300)) for _ in range(rng.choice([1, 1, 2]))]
+    source = ''.join('<g id="{}">{}</g> '.format(i, escape(s)) for i, (s, _) in enumerate(pairs))
+    seg_source = ''
+    target = ''
+    seg_defs = ''
+    for i, (s, t) in enumerate(pairs):
+        # The MT file holds the same segments as the document with the unedited string as target. Random numbers
+        # are drawn in the same order for both, so that files with the same seed have the same structure.
+        conf = rng.choice(STATUS)
+        seg_source += '<g id="{}"><mrk mtype="seg" mid="{}">{}</mrk></g> '.format(i, seg, escape(s))
+        target += '<g id="{}"><mrk mtype="seg" mid="{}">{}</mrk></g> '.format(i, seg, escape(s if mt else t))
+        if mt:
+            seg_defs += '<sdl:seg id="{}" origin="mt" origin-system="DeepL"/>'.format(seg)
+        else:
+            seg_defs += '<sdl:seg id="{}" conf="{}" origin="interactive"/>'.format(seg, conf)
+        seg += 1
+
+    unit = ('<group><sdl:cxts><sdl:cxt id="{tu}"/></sdl:cxts>'
+            '<trans-unit id="{tu:08x}-tu"><source>{source}</source><seg-source>{seg_source}</seg-source>'
+            '<target>{target}</target><sdl:seg-defs>{seg_defs}</sdl:seg-defs></trans-unit></group>\n'
+            .format(tu=tu, source=source, seg_source=seg_source, target=target, seg_defs=seg_defs))
+    # Locked placeholders without segments
+    if rng.random() < 0.1:
+        unit += '<trans-unit translate="no" id="{:08x}-ph"><source><x id="{}"/></source></trans-unit>\n'.format(tu, tu)
+    return unit, seg
+
+
+def write_sdlxliff(fp, segments, seed=1, mt=False, s_lid='en-US', t_lid='de-DE', files=1):
+    """Write a file with roughly the given number of segments to fp.
+
+    With several files, the segments are spread over as many "file" elements. Segment IDs restart at 1 in each of
+    them, like in SDLXLIFF files of merged documents.
+    """
+    rng = random.Random(seed)
+    payload = base64.b64encode(bytes(rng.getrandbits(8) for _ in range(4096))).decode('ascii')
+    with open(fp, 'w', encoding='utf-8') as f:
+        f.write(HEADER)
+        tu = 0
+        for i in range(files):
+            name = 'benchmark' if files == 1 else 'benchmark_{}'.format(i + 1)
+            f.write(FILE_HEADER.format(name=name, s_lid=s_lid, t_lid=t_lid, payload=payload))
+            seg = 1
+            while seg <= segments // files:
+                unit, seg = trans_unit(rng, tu, seg, mt=mt)
+                f.write(unit)
+                tu += 1
+            f.write(FILE_FOOTER)
+        f.write(FOOTER)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('output')
+    parser.add_argument('--segments', type=int, default=10000)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--files', type=int, default=1, help='Number of "file" elements')
+    parser.add_argument('--mt', action='store_true', help='Mark all segments as MT output')
+    args = parser.parse_args()
+
+    write_sdlxliff(args.output, args.segments, seed=args.seed, mt=args.mt, files=args.files)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+"""Compare the triage of segment pairs with full scoring across segment lengths.
+
+Half of the pairs are post-edited like in levenshtein_bench, the other half pairs unrelated strings, which triage
+rejects as bad apples without calculating their full distance.
+
+Run from the repository root:
+    python -m benchmarks.triage_bench [--pairs 2000] [--seed 1]
+"""
+import argparse
+import random
+import time
+
+from benchmarks.levenshtein_bench import make_pair
+from source.calculation import BA_LIMIT, PP_LIMIT, classify_pairs, score_pairs
+
+# Segment lengths in characters
+LENGTHS = [40, 300, 800]
+
+
+def make_pairs(rng, n, length):
+    """Create n pairs of the given length, every second one with an unrelated MT string."""
+    pairs = [make_pair(rng, length) for _ in range(n)]
+    return [(t, make_pair(rng, length)[1] if i % 2 else m) for i, (t, m) in enumerate(pairs)]
+
+
+def classify_scores(scores, max_char):
+    """Classify full scores like the statistics of the GUI."""
+    return ['' if n == 0 else 'bad_apple' if s >= BA_LIMIT else 'peach_perfect' if s <= PP_LIMIT else ''
+            for s, n in zip(scores, max_char)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--pairs', type=int, default=2000, help='Number of pairs per length')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    print('{:>6} | {:>10} | {:>11} | {:>7}'.format('chars', 'score [s]', 'triage [s]', 'speedup'))
+
+    for length in LENGTHS:
+        pairs = make_pairs(rng, args.pairs, length)
+        target, mt = [t for t, _ in pairs], [m for _, m in pairs]
+
+        start = time.perf_counter()
+        _, max_char, scores = score_pairs(target, mt)
+        score_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        classes = classify_pairs(target, mt)
+        triage_time = time.perf_counter() - start
+
+        if list(classes) != classify_scores(scores, max_char):
+            raise AssertionError('Triage deviates from the classification of full scores')
+        print('{:>6} | {:>10.3f} | {:>11.3f} | {:>6.1f}x'.format(length, score_time, triage_time,
+                                                                 score_time / triage_time))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,4 @@
+"""Make the source and benchmarks packages importable when pytest is run from the repository root.
+
+The tests live in the test folder next to the files they read, e.g. test/HTML_preview_test.htm.
+"""
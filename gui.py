@@ -15,9 +15,9 @@ from matplotlib.backends.backend_qt5agg import (FigureCanvas, NavigationToolbar2
 from matplotlib.figure import Figure
 
 from source.parsing import read_from_file
-from source.utils import new_translation, match_target_mt, save_cache
+from source.utils import new_translation, match_target_mt, save_cache, select_mt_segments
 from source.sampling import new_sample
-from source.calculation import pe_density
+from source.calculation import pe_density, BA_LIMIT, PP_LIMIT
 from source.settings import SettingsWindow
 
 
@@ -59,6 +59,11 @@ class MyWindow(QMainWindow):
         w.sample_object, alpha_share = new_sample(w.df, sample_size=sample_size)
         w.textOutput.setText(str("The sample's share of translatable characters is {:.1f}%".format(alpha_share * 100)))
 
+    def select_mt_file(self, fp):
+        """Prompt for path to SDLXLIFF containing MT output"""
+        return QFileDialog.getOpenFileName(caption="Select file with MT segments",
+                                           filter='SDLXLIFF-Datei ({})'.format(os.path.basename(fp)))[0]
+
     def run_calculation(self):
         """Calculate post-edit density results and create separate outputs.
 
@@ -75,14 +80,9 @@ class MyWindow(QMainWindow):
 
             fp = w.input_file_line_edit.text()
 
-            w.df, w.cache = read_from_file(fp, raw_mt=True)
-            #  TODO: Check if the filter index is still necessary when matching string indices in match_target_mt below.
-            filter_index = w.df.query('status == "mt"').index
-            w.df = w.df.loc[filter_index]
-
-            # Create boolean filter with all repetitions except for first occurrences set to True
-            filter_index = w.df.query('stype == "source"').duplicated('text')
-            w.df = w.df[-filter_index]
+            w.df, w.cache = read_from_file(fp, raw_mt=True, select_mt_file=w.select_mt_file)
+            # Keep segments with MT output and drop repetitions
+            w.df = select_mt_segments(w.df)
 
         else:
             w.df = new_translation(w.df, w.cache, w.sample_object)
@@ -129,7 +129,7 @@ class MyWindow(QMainWindow):
         except OSError:
             QMessageBox.warning(w, "Warning", "Not a valid path for saving!")
 
-    def statistics(self, ba_limit=0.4, pp_limit=0.05):
+    def statistics(self, ba_limit=BA_LIMIT, pp_limit=PP_LIMIT):
         """Run additional statistics on Levenshtein distance results
 
         Arguments:
@@ -1,30 +1,253 @@
+"""Calculate Post-Edit Density for an SDLXLIFF file or Across HTML preview without the GUI.
+
+Examples:
+    python pe_density.py deliverable.htm --raw-mt --format csv --out scores.csv
+    python pe_density.py deliverable.sdlxliff --raw-mt raw_mt.sdlxliff --out scores.json
+    python pe_density.py deliverable.sdlxliff --sample-size 50
+    python pe_density.py deliverable.sdlxliff --full --format csv --out scores.csv
+    python pe_density.py deliverable.sdlxliff --full --format parquet --out scores.parquet
+    python pe_density.py deliverable.sdlxliff --raw-mt raw_mt.sdlxliff --format jsonl --out scores.jsonl
+    python pe_density.py deliverable.sdlxliff --target-width 0.04
+    python pe_density.py deliverable.sdlxliff --raw-mt raw_mt.sdlxliff --triage --out triage.json
+"""
 import argparse
+from contextlib import nullcontext
+import os
+import sys
+import time
+
+# Minimum number of seconds between progress messages in full document mode
+PROGRESS_INTERVAL = 1.0
+
+
+def parse_args(argv=None):
+    from source.api import PROVIDER, PROVIDERS
+    from source.sampling import MIN_PER_STRATUM
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0],
+                                     formatter_class=argparse.RawDescriptionHelpFormatter,
+                                     epilog='\n'.join(__doc__.splitlines()[2:]))
+    parser.add_argument('input', help='Path to SDLXLIFF file or Across HTML preview')
+    parser.add_argument('--raw-mt', nargs='?', const=True, default=False, metavar='PATH',
+                        help='Score existing MT output instead of sampling and translating. Pass the path to the raw '
+                             'MT file for SDLXLIFF input. Without path, HTML previews use their version history.')
+    parser.add_argument('--sample-size', type=int, default=50,
+                        help='Number of segments sent for translation if no MT output is available (default: 50)')
+    parser.add_argument('--sampling', choices=['alpha', 'stratified'], default='alpha',
+                        help='"alpha" keeps the sample with the most letters. "stratified" samples by segment length '
+                             'and status and reports a confidence interval (default: alpha)')
+    parser.add_argument('--target-width', type=float, default=None, metavar='WIDTH',
+                        help='Sample in steps until the 95%% confidence interval is at most WIDTH wide, e.g. 0.04. '
+                             'Implies --sampling stratified; --sample-size is ignored.')
+    parser.add_argument('--max-sample-size', type=int, default=None,
+                        help='Maximum number of segments translated with --target-width (default: all)')
+    parser.add_argument('--full', action='store_true',
+                        help='Translate all eligible segments instead of a sample. Batches are scored as they return '
+                             'and a running Post-Edit Density is printed. JSON output holds the summary and histogram '
+                             'only; use CSV for segment scores.')
+    parser.add_argument('--triage', action='store_true',
+                        help='Only count bad apples and peach perfects instead of calculating the Post-Edit Density. '
+                             'Distances are only calculated up to the bad apple limit, which is faster for long '
+                             'segments. JSON output holds the counts only.')
+    parser.add_argument('--provider', choices=list(PROVIDERS), default=PROVIDER,
+                        help='MT provider for the sample. "offline" works without network access (default: deepl)')
+    parser.add_argument('--concurrency', type=int, default=None,
+                        help='Number of translation requests in flight (default: source.api.CONCURRENCY)')
+    parser.add_argument('--workers', type=int, default=1, help='Number of processes for scoring (default: 1)')
+    parser.add_argument('--format', choices=['json', 'jsonl', 'csv', 'parquet'], default='json',
+                        help='Output format: JSON with metadata and segment scores, JSON Lines with one line per '
+                             'segment and a summary line at the end, CSV with one row per segment, or Parquet with '
+                             'one row per segment plus a JSON summary next to it (needs pyarrow)')
+    parser.add_argument('--out', default=None, help='Output file. Prints the Post-Edit Density only if omitted.')
+    args = parser.parse_args(argv)
+
+    if args.raw_mt is True and args.input.lower().endswith('.sdlxliff'):
+        parser.error('SDLXLIFF input needs the path to the raw MT file: --raw-mt PATH')
+    if args.full and args.raw_mt:
+        parser.error('--full translates the document and cannot be combined with --raw-mt')
+    if args.sampling == 'stratified' and args.sample_size < MIN_PER_STRATUM:
+        parser.error('--sampling stratified needs a sample size of at least {}'.format(MIN_PER_STRATUM))
+    if args.target_width is not None and (args.full or args.raw_mt):
+        parser.error('--target-width samples the document and cannot be combined with --full or --raw-mt')
+    if args.triage and (args.full or args.target_width is not None):
+        parser.error('--triage cannot be combined with --full or --target-width')
+    if args.triage and args.out and args.format != 'json':
+        parser.error('--triage writes JSON output only')
+
+    return args
+
+
+def open_results(args, cache):
+    """Return writer for result rows as they are scored, or None if the output format is written at the end.
+
+    Use the writer as context manager, so that the output of a failed run is not completed with a summary.
+    """
+    from source.export import CsvWriter, JsonlWriter, ResultWriter
+
+    if not args.out:
+        return None
+    if args.format == 'csv':
+        return CsvWriter(args.out, cache)
+    if args.format == 'jsonl':
+        return JsonlWriter(args.out, cache)
+    if args.format == 'parquet':
+        return ResultWriter(args.out, cache)
+    return None
+
+
+def summary_path(fp):
+    """Return path of the JSON summary next to Parquet results."""
+    return os.path.splitext(fp)[0] + '.json'
+
+
+def run_full_document(args, df, cache):
+    """Translate and score all eligible segments batch by batch, printing the running Post-Edit Density.
+
+    Segment scores are written to the CSV, JSON Lines or Parquet output as they arrive instead of being added to
+    the cache.
+
+    Returns:
+        cache -- Dictionary updated with ped and ped_summary
+    """
+    from source.api import create_translator
+    from source.streaming import RunningPED, eligible_segments, stream_density
+
+    segments = eligible_segments(df)
+    print('Translating {} segments'.format(len(segments)))
+
+    running = RunningPED(total=len(segments))
+    with open_results(args, cache) or nullcontext() as results:
+        with create_translator(args.provider) as translator:
+            last = 0
+            for running, batch in stream_density(segments, cache['t_lid'], cache['s_lid'], translator,
+                                                 concurrency=args.concurrency):
+                if results:
+                    results.write(batch)
+                if time.monotonic() - last >= PROGRESS_INTERVAL:
+                    print('{:>6}/{} segments, running Post-Edit Density {:.3f}'.format(
+                        running.segments, running.total, running.ped))
+                    last = time.monotonic()
+
+        # Update the cache before closing the output, which may end with a summary.
+        # Without eligible segments, the score is NaN and the summary is empty.
+        cache['ped'] = running.ped
+        cache['ped_summary'] = running.summary() if segments else {}
+
+    return cache
+
+
+def run_sequential_sample(args, df, cache, results=None):
+    """Translate stratified samples step by step until the confidence interval is narrow enough.
+
+    Arguments:
+        results -- Optional writer from open_results for the scored segments
+
+    Returns:
+        cache -- Dictionary updated with ped, ped_ci, confidence and ped_details of the sampled segments
+    """
+    from source.api import create_translator
+    from source.streaming import sequential_density
+
+    ped_details = {}
+    with create_translator(args.provider) as translator:
+        for estimate, batch in sequential_density(df, cache['t_lid'], cache['s_lid'], translator,
+                                                  target_width=args.target_width, max_size=args.max_sample_size,
+                                                  concurrency=args.concurrency):
+            ped_details.update((row, {'file': file, 'unit': unit, 'seg_id': seg_id, 'score': score, 'source': source,
+                                      'target': target, 'mt': mt})
+                               for row, file, unit, seg_id, score, lev, max_char, source, target, mt in batch)
+            if results:
+                results.write(batch)
+            print('{:>6}/{} segments, Post-Edit Density {:.3f} [{:.3f}, {:.3f}]'.format(
+                estimate['segments'], estimate['total'], estimate['ped'], *estimate['ped_ci']))
+
+    cache['ped'] = estimate['ped']
+    cache['ped_ci'] = estimate['ped_ci']
+    cache['confidence'] = estimate['confidence']
+    cache['ped_details'] = ped_details
+    return cache
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    # Import the pipeline on first use, so that importing this module stays fast, see benchmarks/import_bench.py
+    from source.api import create_translator
+    from source.calculation import CONFIDENCE, pe_density, pe_triage, ratio_interval
+    from source.export import save_summary
+    from source.parsing import read_from_file
+    from source.sampling import new_sample
+    from source.utils import match_target_mt, new_translation, save_cache, select_mt_segments
+
+    result = read_from_file(args.input, raw_mt=args.raw_mt)
+    if result is None:
+        return 1
+    df, cache = result
+
+    if args.full:
+        cache = run_full_document(args, df, cache)
+        print('Your Post-Edit Density score is {:.3f} ({} segments)'.format(cache['ped'],
+                                                                          cache['ped_summary'].get('segments', 0)))
+        if args.out and args.format == 'json':
+            save_cache(args.out, cache)
+        elif args.out and args.format == 'parquet':
+            save_summary(summary_path(args.out), cache)
+        return 0
+
+    sample_object = None
+    if args.target_width is not None:
+        with open_results(args, cache) or nullcontext() as results:
+            cache = run_sequential_sample(args, df, cache, results)
+    elif args.raw_mt:
+        df = select_mt_segments(df)
+    else:
+        sample_object, alpha_share = new_sample(df, sample_size=args.sample_size, method=args.sampling)
+        print("The sample's share of translatable characters is {:.1f}%".format(alpha_share * 100))
+        with create_translator(args.provider) as translator:
+            df = new_translation(df, cache, sample_object, translator=translator, concurrency=args.concurrency)
+
+    if args.triage:
+        cache = pe_triage(match_target_mt(df), cache)
+        print('{} bad apples and {} peach perfects in {} segments'.format(cache['bad_apples'],
+                                                                          cache['peach_perfects'],
+                                                                          cache['segments']))
+        if args.out:
+            save_cache(args.out, cache)
+        return 0
+
+    # Segment details are exported from the scored table directly in all formats but JSON
+    streamed = args.out and args.format != 'json'
+    if args.target_width is None:
+        stratified = sample_object is not None and 'weight' in sample_object
+        # Sampled segments without MT output are scored against an empty string, like in sequential_density, so that
+        # the weights of their strata still add up
+        df_mt = match_target_mt(df, keep=sample_object.index if stratified else None)
+        cache = pe_density(df_mt, cache, workers=args.workers, details=not streamed)
+        if stratified:
+            # Weight each pair by the number of segments it stands for in its stratum
+            pairs = sample_object.loc[df_mt.index]
+            cache['ped'], low, high = ratio_interval(df_mt['lev'], df_mt['max_char'], pairs['stratum'],
+                                                     pairs['weight'])
+            cache['ped_ci'] = [low, high]
+            cache['confidence'] = CONFIDENCE
+
+    segments = df_mt.shape[0] if args.target_width is None else len(cache['ped_details'])
+    print('Your Post-Edit Density score is {:.3f} ({} segments)'.format(cache['ped'], segments))
+    if 'ped_ci' in cache:
+        print('{:.0%} confidence interval: {:.3f} to {:.3f}'.format(cache['confidence'], *cache['ped_ci']))
+
+    if args.out:
+        # Results of the sequential sample were written while scoring
+        if streamed and args.target_width is None:
+            with open_results(args, cache) as writer:
+                writer.write_frame(df_mt)
+        if args.format == 'parquet':
+            save_summary(summary_path(args.out), cache)
+        elif args.format == 'json':
+            save_cache(args.out, cache)
+
+    return 0
+
 
-from scripts.parsing import read_from_file
-from scripts.utils import new_sample, new_translation, query_yes_no, comp_entry
-from scripts.calculation import new_calculation
-
-
-parser = argparse.ArgumentParser(
-    description="Calculate Post-Edit Density and submit entry",
-)
-parser.add_argument("user", help="Specify name of user.")
-parser.add_argument("input", help="Specify filename.")
-parser.add_argument("--folder", default="data", help="path/to/file.")
-parser.add_argument("--sample_size", type=int, default=50, help="Run sampling on specified no. of segments")
-
-args = parser.parse_args()
-print(args)
-# Read source file and project information
-df, cache = read_from_file(args.input, args.folder)
-cache['user'] = args.user
-# Create sample object
-sample_object, source = new_sample(df, sample_size=args.sample_size)
-#
-target_list, mt_list, cache = new_translation(df, cache, sample_object, source, args.input)
-# Calculate Post-Edit Density, show bad apples and peach perfects, plot results for user review
-cache = new_calculation(target_list, mt_list, cache)
-
-if query_yes_no('Do you want to submit your competition entry? '):
-    cache = comp_entry(cache)
-    print('Thank you for submitting your entry!')
+if __name__ == '__main__':
+    sys.exit(main())
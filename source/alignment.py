@@ -0,0 +1,77 @@
+import logging
+
+# Number of unaligned segment IDs named in the log message
+LOGGED_SEGMENTS = 10
+
+
+def segment_keys(seg_id, units):
+    """Combine segment IDs with their (file, trans-unit id) into alignment keys.
+
+    Arguments:
+        seg_id -- list of segment IDs as read by the SDLXLIFF parsers
+        units -- list of (file, trans-unit id) tuples in the same order
+
+    Returns:
+        keys -- list of (file, trans-unit id, seg_id) tuples
+    """
+    return [(file, unit, i) for (file, unit), i in zip(units, seg_id)]
+
+
+def align(keys, source, mt_keys, mt_source):
+    """Match the segments of a document to the segments of a separate MT file in linear time.
+
+    Arguments:
+        keys -- list of (file, trans-unit id, seg_id) tuples of the document segments
+        source -- list of source strings of the document segments
+        mt_keys -- list of (file, trans-unit id, seg_id) tuples of the MT file segments
+        mt_source -- list of source strings of the MT file segments
+
+    Segments are first joined on their keys. Segments left over on both sides are then joined on their source
+    strings, e.g. after trans-units were regenerated or moved to another file. Repeated source strings are matched
+    in document order. Each MT segment is used at most once.
+
+    Returns:
+        positions -- list with the position of the matching MT segment for each document segment, or -1
+        report -- dictionary with the number of segments aligned by 'key' and by 'source', the keys of the
+                  'unaligned' document segments and the number of 'unused_mt' segments
+    """
+    positions = [-1] * len(keys)
+    used = [False] * len(mt_keys)
+
+    # Hash-join on keys. Duplicate keys keep their first MT segment.
+    index = {}
+    for j, key in enumerate(mt_keys):
+        index.setdefault(key, j)
+    for i, key in enumerate(keys):
+        j = index.get(key)
+        if j is not None and not used[j]:
+            positions[i] = j
+            used[j] = True
+    by_key = len(keys) - positions.count(-1)
+
+    # Hash-join the remaining segments on their source strings
+    by_source = 0
+    if by_key < len(keys):
+        index = {}
+        for j, text in enumerate(mt_source):
+            if not used[j]:
+                index.setdefault(text, []).append(j)
+        for candidates in index.values():
+            # Pop from the end in document order
+            candidates.reverse()
+        for i, text in enumerate(source):
+            if positions[i] == -1 and index.get(text):
+                j = index[text].pop()
+                positions[i] = j
+                used[j] = True
+                by_source += 1
+
+    report = {'key': by_key, 'source': by_source,
+              'unaligned': [keys[i] for i, j in enumerate(positions) if j == -1],
+              'unused_mt': used.count(False)}
+    if report['unaligned']:
+        logging.warning('%d segments without MT segment: %s%s', len(report['unaligned']),
+                        ', '.join('{} in {}'.format(i, file) for file, _, i in report['unaligned'][:LOGGED_SEGMENTS]),
+                        ', ...' if len(report['unaligned']) > LOGGED_SEGMENTS else '')
+
+    return positions, report
@@ -1,13 +1,504 @@
+import hashlib
 import json
 import os.path
+import random
+import threading
+import time
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote_plus, urlencode
 
 import requests
+from requests.adapters import HTTPAdapter
+
+# DeepL endpoint for translation requests
+API_URL = 'https://api.deepl.com/v2/translate'
+# Connect and read timeout in seconds
+TIMEOUT = (5, 60)
+# Number of retries for requests which are rate limited (429) or fail on the server side (5xx)
+MAX_RETRIES = 4
+# Wait time in seconds before the first retry. Doubles with every further retry, unless the server sends Retry-After.
+BACKOFF = 0.5
+# Status codes which are worth another try
+RETRY_STATUS = {429, 500, 502, 503, 504}
+# Number of batches in flight at the same time. Also the number of connections kept alive per DeepLTranslator.
+CONCURRENCY = 4
+# Maximum number of requests per second, including retries. None for no limit.
+RATE_LIMIT = None
+# MT provider used if none is selected, see PROVIDERS
+PROVIDER = 'deepl'
+# Share of words edited by the offline MT provider in 'perturb' mode
+PERTURBATION_RATE = 0.15
+# Initial limit for the size of a request URI in bytes, i.e. URL plus url-encoded parameters.
+# Lowered per endpoint when the server answers 414 (URI too long).
+MAX_REQUEST_BYTES = 16 * 1024
 
 
 class Error414(Exception):
     pass
 
 
+class MTProvider(ABC):
+    """Base class for MT providers.
+
+    Subclasses implement translate() for one batch and may override plan() and translate_batch().
+
+    Arguments:
+        concurrency -- default number of batches in flight in translate_batches
+    """
+    # Name under which the provider is registered in PROVIDERS and its output is kept in the MT cache
+    name = None
+    # Flag to store the provider's output in the MT cache. Offline output is cheaper to create again.
+    cacheable = True
+
+    def __init__(self, concurrency=CONCURRENCY):
+        self.concurrency = concurrency
+
+    @abstractmethod
+    def translate(self, source, target_lang, source_lang=0, **options):
+        """Translate list of source strings.
+
+        Arguments:
+            source -- list of source strings
+            target_lang -- required string, eg. 'EN', 'DE', 'FR'
+            source_lang -- optional string, eg. 'EN', 'DE', 'FR'
+            options -- optional API parameters accepted by collect_trans_parameters
+
+        Returns:
+            target -- list of strings from translation output
+        """
+
+    def request_options(self, **options):
+        """Return the request parameters which change the MT output, e.g. to key the MT cache.
+
+        Arguments:
+            options -- optional API parameters passed with the request
+
+        Returns:
+            options -- dictionary with the parameters and the provider name
+        """
+        return dict(options, provider=self.name)
+
+    def translate_batch(self, source, target_lang, source_lang=0, **options):
+        """Translate one planned batch. Providers with request limits handle failed batches here."""
+        return self.translate(source, target_lang, source_lang, **options)
+
+    def plan(self, source, target_lang, source_lang=0, max_segments=None, **options):
+        """Split source strings into batches of at most max_segments strings.
+
+        Arguments:
+            source -- list of source strings
+            target_lang, source_lang, options -- request parameters
+            max_segments -- optional maximum number of strings per batch
+
+        Returns:
+            batches -- list of lists of source strings in the original order
+        """
+        if not max_segments:
+            return [list(source)] if len(source) else []
+        return [list(source[i:i + max_segments]) for i in range(0, len(source), max_segments)]
+
+    def translate_batches(self, batches, target_lang, source_lang=0, concurrency=None, **options):
+        """Translate batches of source strings with several requests in flight.
+
+        Arguments:
+            batches -- list of lists of source strings
+            target_lang -- required string, eg. 'EN', 'DE', 'FR'
+            source_lang -- optional string, eg. 'EN', 'DE', 'FR'
+            concurrency -- maximum number of batches in flight. Defaults to the concurrency of the provider
+            options -- optional API parameters accepted by collect_trans_parameters
+
+        If a batch fails, the batches not yet sent are cancelled and the exception is raised.
+
+        Returns:
+            translations -- list with the translated strings of each batch, in the order of batches
+        """
+        concurrency = concurrency or self.concurrency
+        if concurrency <= 1 or len(batches) <= 1:
+            return [self.translate_batch(batch, target_lang, source_lang, **options) for batch in batches]
+
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            futures = [executor.submit(self.translate_batch, batch, target_lang, source_lang, **options)
+                       for batch in batches]
+            try:
+                return [future.result() for future in futures]
+            except BaseException:
+                for future in futures:
+                    future.cancel()
+                raise
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class DeepLTranslator(MTProvider):
+    """Reusable DeepL client which keeps connections alive between requests.
+
+    Arguments:
+        auth_key -- DeepL authentication key. Read from data/key_file on first request if omitted
+        key_file -- local file in the data folder containing the API key
+        url -- endpoint for translation requests, e.g. a local stand-in server for testing
+        timeout -- connect and read timeout in seconds, as single number or tuple
+        max_retries -- number of retries for rate limited (429) and failed (5xx) requests and connection errors
+        backoff -- wait time in seconds before the first retry
+        concurrency -- default number of batches in flight in translate_batches and size of the connection pool
+        rate_limit -- maximum number of requests per second shared by all threads, or None
+        options -- dictionary of API parameters sent with every request, e.g. {'formality': 'less'}. See
+                   collect_trans_parameters for the parameters and their defaults.
+
+    Use as context manager or call close() to release the connections.
+    """
+    name = 'deepl'
+
+    def __init__(self, auth_key=None, key_file='API_key.txt', url=API_URL, timeout=TIMEOUT,
+                 max_retries=MAX_RETRIES, backoff=BACKOFF, concurrency=CONCURRENCY, rate_limit=RATE_LIMIT,
+                 options=None):
+        super().__init__(concurrency)
+        self.options = dict(options or {})
+        self._auth_key = auth_key
+        self.key_file = key_file
+        self.url = url
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.rate_limiter = RateLimiter(rate_limit)
+        self.limit = request_limit(url)
+        self.session = requests.Session()
+        self.session.headers['Content-Type'] = 'application/x-www-form-urlencoded'
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(concurrency, 1))
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    @property
+    def auth_key(self):
+        # The key file is only needed once something is sent, e.g. not if all segments are found in the MT cache
+        if self._auth_key is None:
+            self._auth_key = read_auth_key(self.key_file)
+        return self._auth_key
+
+    def translate(self, source, target_lang, source_lang=0, **options):
+        parameters = collect_trans_parameters(source, target_lang, source_lang=source_lang, auth_key=self.auth_key,
+                                              **dict(self.options, **options))
+        return parse_translations(handle_response(self.post(parameters)))
+
+    def request_options(self, **options):
+        """Return the API parameters of a request except for texts, languages and key, with their defaults."""
+        parameters = collect_trans_parameters([], None, auth_key='', **dict(self.options, **options))
+        for key in ('auth_key', 'text', 'target_lang', 'source_lang'):
+            del parameters[key]
+        return dict(parameters, provider=self.name)
+
+    def translate_batch(self, source, target_lang, source_lang=0, **options):
+        """Translate list of source strings. If the request is too long (414), split only this list and retry.
+
+        Returns:
+            target -- list of strings from translation output
+        """
+        overhead, sizes = self.request_sizes(source, target_lang, source_lang, **options)
+        size = overhead + sum(sizes)
+
+        # Other batches may have lowered the limit since this batch was planned
+        if size > self.limit.max_bytes and len(source) > 1:
+            return self._split(source, sizes, overhead, target_lang, source_lang, **options)
+
+        try:
+            target = self.translate(source, target_lang, source_lang, **options)
+        except Error414:
+            # A single segment cannot be split any further
+            if len(source) <= 1:
+                raise
+            self.limit.failed(size)
+            return self._split(source, sizes, overhead, target_lang, source_lang, **options)
+
+        self.limit.passed(size)
+        return target
+
+    def _split(self, source, sizes, overhead, target_lang, source_lang, **options):
+        """Split batch according to the current limit, or in half if it fits, and translate the parts."""
+        batches = plan_batches(source, sizes, self.limit.max_bytes - overhead)
+        if len(batches) == 1:
+            batches = [source[:len(source) // 2], source[len(source) // 2:]]
+
+        return [t for batch in batches for t in self.translate_batch(batch, target_lang, source_lang, **options)]
+
+    def plan(self, source, target_lang, source_lang=0, max_segments=None, **options):
+        """Pack source strings into batches which fit the learned request size limit of the endpoint.
+
+        Arguments:
+            source -- list of source strings
+            target_lang, source_lang, options -- request parameters, which add to the size of each request
+            max_segments -- optional maximum number of strings per batch
+
+        Returns:
+            batches -- list of lists of source strings in the original order
+        """
+        overhead, sizes = self.request_sizes(source, target_lang, source_lang, **options)
+        return plan_batches(source, sizes, self.limit.max_bytes - overhead, max_segments)
+
+    def request_sizes(self, source, target_lang, source_lang=0, **options):
+        """Return size of the request URI in bytes without texts, and the size each text adds to it."""
+        parameters = collect_trans_parameters([], target_lang, source_lang=source_lang, auth_key=self.auth_key,
+                                              **dict(self.options, **options))
+        # requests drops parameters with None value
+        parameters = {k: v for k, v in parameters.items() if v is not None and k != 'text'}
+        overhead = len(self.url) + 1 + len(urlencode(parameters))
+        sizes = [len('&text=') + len(quote_plus(str(text))) for text in source]
+        return overhead, sizes
+
+    def post(self, parameters):
+        """Send request and retry with exponential backoff on 429, 5xx and connection errors.
+
+        Returns:
+            response -- last response received from the server
+        """
+        for attempt in range(self.max_retries + 1):
+            self.rate_limiter.wait()
+            try:
+                response = self.session.post(self.url, params=parameters, timeout=self.timeout)
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt == self.max_retries:
+                    raise
+                time.sleep(self.backoff * 2 ** attempt)
+                continue
+
+            if response.status_code not in RETRY_STATUS or attempt == self.max_retries:
+                return response
+            time.sleep(retry_after(response, self.backoff * 2 ** attempt))
+
+    def close(self):
+        self.session.close()
+
+
+class OfflineTranslator(MTProvider):
+    """Deterministic MT stand-in which works without network access, e.g. for benchmarks on build machines.
+
+    Arguments:
+        mode -- 'identity' returns the source strings, 'perturb' returns source strings with random word-level
+                edits, 'replay' returns translations from replay_file
+        rate -- share of words edited in 'perturb' mode
+        replay_file -- JSON file with a dictionary mapping source strings to translations, or results saved by the
+                       tool with MT strings under 'ped_details'. Unknown strings are perturbed.
+        latency -- delay in seconds per batch, to simulate the time spent on requests
+        concurrency -- default number of batches in flight in translate_batches
+
+    The same source string always gets the same output for the same target language.
+    """
+    name = 'offline'
+    cacheable = False
+
+    def __init__(self, mode='perturb', rate=PERTURBATION_RATE, replay_file=None, latency=0.0,
+                 concurrency=CONCURRENCY):
+        if mode not in ('identity', 'perturb', 'replay'):
+            raise ValueError("Unknown offline mode '{}'. Choose from identity, perturb, replay".format(mode))
+        if mode == 'replay' and replay_file is None:
+            raise ValueError('Replay mode needs a replay_file')
+
+        super().__init__(concurrency)
+        self.mode = mode
+        self.rate = rate
+        self.latency = latency
+        self.replay = load_replay(replay_file) if replay_file else {}
+
+    def translate(self, source, target_lang, source_lang=0, **options):
+        if self.latency:
+            time.sleep(self.latency)
+
+        if self.mode == 'identity':
+            return [str(text) for text in source]
+
+        return [self.replay[text] if text in self.replay else perturb(str(text), self.rate, target_lang)
+                for text in source]
+
+
+def perturb(text, rate, salt=''):
+    """Drop, repeat, swap or change words of text at the given rate, seeded by the text itself.
+
+    Arguments:
+        text -- source string
+        rate -- share of words edited
+        salt -- additional seed string, e.g. the target language
+
+    Returns:
+        String with the edited words
+    """
+    seed = hashlib.sha256('{}\x00{}'.format(salt, text).encode('utf-8')).digest()
+    rng = random.Random(seed)
+    words = text.split(' ')
+    result = []
+    for word in words:
+        if rng.random() >= rate:
+            result.append(word)
+            continue
+
+        edit = rng.randrange(4)
+        if edit == 0:
+            continue
+        elif edit == 1:
+            result += [word, word]
+        elif edit == 2 and result:
+            result.insert(len(result) - 1, word)
+        else:
+            result.append(word[:-1] + 'e' if len(word) > 1 else word)
+
+    return ' '.join(result)
+
+
+def load_replay(fp):
+    """Read translations for OfflineTranslator from a JSON file.
+
+    Arguments:
+        fp -- path to a JSON dictionary mapping source strings to translations, or to results saved by the tool
+              as JSON or JSON Lines (.jsonl)
+
+    Returns:
+        replay -- dictionary mapping source strings to translations
+    """
+    with open(fp, 'r', encoding='utf-8') as f:
+        if fp.endswith('.jsonl'):
+            records = (json.loads(line) for line in f)
+            return {r['source']: r['mt'] for r in records if 'summary' not in r}
+        data = json.load(f)
+
+    if 'ped_details' in data:
+        return {segment['source']: segment['mt'] for segment in data['ped_details'].values()}
+    return data
+
+
+# MT providers selectable by name
+PROVIDERS = {'deepl': DeepLTranslator, 'offline': OfflineTranslator}
+
+
+def create_translator(provider=PROVIDER, **kwargs):
+    """Create MT provider by name.
+
+    Arguments:
+        provider -- String specifying a key in PROVIDERS, e.g. 'deepl' (default) or 'offline'
+        kwargs -- Arguments passed to the provider class
+
+    Returns:
+        translator -- MTProvider instance. Use as context manager or call close() when done
+    """
+    if provider not in PROVIDERS:
+        raise ValueError("Unknown MT provider '{}'. Choose from {}".format(provider, ', '.join(PROVIDERS)))
+    return PROVIDERS[provider](**kwargs)
+
+
+class RateLimiter:
+    """Space calls evenly so that no more than rate calls per second start, across all threads.
+
+    Arguments:
+        rate -- maximum number of calls per second, or None for no limit
+    """
+
+    def __init__(self, rate=None):
+        self.interval = 1 / rate if rate else 0.0
+        self.next_call = 0.0
+        self.lock = threading.Lock()
+
+    def wait(self):
+        """Block until the next call may start."""
+        if not self.interval:
+            return
+
+        with self.lock:
+            now = time.monotonic()
+            start = max(now, self.next_call)
+            self.next_call = start + self.interval
+
+        time.sleep(start - now)
+
+
+class RequestLimit:
+    """Request size limit of an endpoint, learned from requests that passed and requests that failed with 414.
+
+    The limit lies between the largest size that passed and the smallest size that failed. Requests are planned
+    for the middle of both, so that the limit is found like in a binary search over successive batches.
+
+    Arguments:
+        max_bytes -- initial limit in bytes, used until a request fails
+    """
+
+    def __init__(self, max_bytes=MAX_REQUEST_BYTES):
+        self.largest_passed = 0
+        self.smallest_failed = None
+        self.initial = max_bytes
+        self.lock = threading.Lock()
+
+    @property
+    def max_bytes(self):
+        if self.smallest_failed is None:
+            return max(self.initial, self.largest_passed)
+        return max(self.largest_passed, (self.largest_passed + self.smallest_failed) // 2)
+
+    def passed(self, size):
+        with self.lock:
+            self.largest_passed = max(self.largest_passed, size)
+
+    def failed(self, size):
+        with self.lock:
+            if self.smallest_failed is None or size < self.smallest_failed:
+                self.smallest_failed = size
+
+
+# Learned request size limits by endpoint URL, shared by all Translators
+_request_limits = {}
+_request_limits_lock = threading.Lock()
+
+
+def request_limit(url):
+    """Return the RequestLimit for an endpoint URL."""
+    with _request_limits_lock:
+        return _request_limits.setdefault(url, RequestLimit())
+
+
+def plan_batches(source, sizes, max_bytes, max_segments=None):
+    """Pack strings in order into batches with a total size of at most max_bytes.
+
+    Arguments:
+        source -- list of strings
+        sizes -- list with the size of each string in bytes
+        max_bytes -- maximum size of a batch. Strings larger than max_bytes are sent on their own
+        max_segments -- optional maximum number of strings per batch
+
+    Returns:
+        batches -- list of lists of strings
+    """
+    batches = []
+    batch, batch_size = [], 0
+    for text, size in zip(source, sizes):
+        if batch and (batch_size + size > max_bytes or len(batch) == max_segments):
+            batches.append(batch)
+            batch, batch_size = [], 0
+        batch.append(text)
+        batch_size += size
+
+    if batch:
+        batches.append(batch)
+
+    return batches
+
+
+def retry_after(response, default):
+    """Return wait time in seconds from the Retry-After header of response, or default if not given in seconds."""
+    try:
+        return max(0.0, float(response.headers['Retry-After']))
+    except (KeyError, ValueError):
+        return default
+
+
+def read_auth_key(file='API_key.txt'):
+    """Read DeepL authentication key from local file in the data folder."""
+    fp = os.path.join("data", file)
+    with open(fp, 'r') as f:
+        return f.readline().strip()
+
+
 def call_api(parameters, method='post'):
     """
     Call API and store response in translation variable
@@ -29,8 +520,11 @@ def call_api(parameters, method='post'):
     else:
         response = get_translation(parameters)
 
-    translation = handle_response(response)
-    # Parse output from json response: target values are stored under the 'text' key
+    return parse_translations(handle_response(response))
+
+
+def parse_translations(translation):
+    """Parse output from json response: target values are stored under the 'text' key"""
     return [translation['translations'][i]['text'] for i in range(len(translation['translations']))]
 
 
@@ -52,17 +546,20 @@ def collect_trans_parameters(source,
                              target_lang,
                              file='API_key.txt',
                              source_lang=0,
+                             auth_key=None,
                              tag_handling=None,
                              non_splitting_tags=None,
                              ignore_tags=None,
                              split_sentences='0',   # make sure to use write as string. Else the for loop will
-                             preserve_formatting=0  # default split_sentence parameter to "1"
+                             preserve_formatting=0,  # default split_sentence parameter to "1"
+                             formality=None
                              ):
     """
     Check for required and optional parameters and write to list
 
     Arguments: (see API documentation: https://www.deepl.com/api.html)
-        file -- required, local file containing API key.
+        file -- local file containing API key. Required unless auth_key is given
+        auth_key -- optional API key, e.g. read once by a DeepLTranslator
         source -- list of source strings. Used as input for the 'text' parameter
         target_lang -- required string, eg. 'EN', 'DE', 'FR'
         source_lang -- optional string, eg. 'EN', 'DE', 'FR'
@@ -71,15 +568,15 @@ def collect_trans_parameters(source,
         ignore_tags -- optional, comma-separated list of XML tags whose content is never translated
         split_sentences -- optional, accepts '0' and '1' (default)
         preserve_formatting -- optional, accepts '1' and '0' (default)
+        formality -- optional, accepts 'more', 'less' and 'default' for target languages with formal address
 
     Returns:
     Parameters -- dictionary with key-value pairs
     """
 
     # collect authentication key string from file
-    fp = os.path.join("data", file)
-    with open(fp, 'r') as f:
-        auth_key = f.readline()
+    if auth_key is None:
+        auth_key = read_auth_key(file)
 
     # populate list with parameter values
     parameters = {'auth_key': auth_key,
@@ -90,7 +587,8 @@ def collect_trans_parameters(source,
                   'non_splitting_tags': non_splitting_tags,
                   'ignore_tags': ignore_tags,
                   'split_sentences': split_sentences,
-                  'preserve_formatting': preserve_formatting}
+                  'preserve_formatting': preserve_formatting,
+                  'formality': formality}
 
     return parameters
 
@@ -107,7 +605,7 @@ def get_translation(parameters):
         Error code in case the request failed
     """
 
-    url = 'https://api.deepl.com/v2/translate'
+    url = API_URL
     params = parameters
 
     return requests.get(url, params=params)
@@ -124,7 +622,7 @@ def post_translation(parameters):
         API response in nested dict format with detected source language and translation as text.
     """
 
-    url = 'https://api.deepl.com/v2/translate'
+    url = API_URL
     headers = {'Content-Type': 'application/x-www-form-urlencoded'}
 
     return requests.post(url, params=parameters, headers=headers)
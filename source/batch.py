@@ -0,0 +1,184 @@
+"""Score all SDLXLIFF and Across HTML files in a project tree and write one consolidated result table.
+
+Usage:
+    python -m source.batch PATH_OR_GLOB [--out results.csv] [--workers 4] [--mt-root DIR] [--triage]
+"""
+import argparse
+import glob
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+
+# File extensions picked up when scanning a directory
+EXTENSIONS = ('.sdlxliff', '.htm', '.html')
+# Columns of the result table
+COLUMNS = ['level', 'Relation', 'Project', 'Document', 's_lid', 't_lid', 'segments', 'lev', 'max_char', 'ped',
+           'bad_apples', 'peach_perfects', 'path', 'error']
+# Columns summed when pooling document scores. They are nullable integers, so that documents which could not be scored
+# do not turn them into floats.
+COUNTS = ['segments', 'lev', 'max_char', 'bad_apples', 'peach_perfects']
+
+
+def find_files(path):
+    """List input files in a directory tree or matching a glob pattern.
+
+    Arguments:
+        path -- String specifying a directory or a glob pattern (use ** to match subfolders)
+
+    Returns:
+        files -- Sorted list of file paths
+    """
+    if os.path.isdir(path):
+        files = [os.path.join(root, name) for root, _, names in os.walk(path) for name in names
+                 if name.lower().endswith(EXTENSIONS)]
+    else:
+        files = glob.glob(path, recursive=True)
+
+    return sorted(files)
+
+
+def base_dir(path):
+    """Return the directory itself or the leading directories of a glob pattern without wildcards."""
+    if os.path.isdir(path):
+        return path
+
+    parts = []
+    for part in os.path.dirname(path).split(os.sep):
+        if any(c in part for c in '*?['):
+            break
+        parts.append(part)
+
+    return os.sep.join(parts) or '.'
+
+
+def find_mt_file(fp, root, mt_root):
+    """Return path of the raw MT file for an SDLXLIFF file at the same relative location below mt_root."""
+    if mt_root is None:
+        return None
+    mt_fp = os.path.join(mt_root, os.path.relpath(fp, root))
+    return mt_fp if os.path.exists(mt_fp) else None
+
+
+def score_file(fp, mt_fp=None, triage=False):
+    """Score one file against its MT output.
+
+    Arguments:
+        fp -- path to SDLXLIFF or Across HTML file
+        mt_fp -- path to raw MT file (SDLXLIFF only). Across HTML files use their version history.
+        triage -- Count bad apples and peach perfects only instead of calculating the ped
+
+    Returns:
+        row -- Dictionary with metadata, summed Levenshtein distances and string lengths and the document ped,
+            or the number of bad apples and peach perfects in triage mode
+    """
+    # Import the pipeline on first use, so that importing this module stays fast, see benchmarks/import_bench.py
+    from source.calculation import pe_density, pe_triage
+    from source.parsing import read_from_file
+    from source.utils import match_target_mt, select_mt_segments
+
+    row = {'level': 'Document', 'path': fp}
+    try:
+        if fp.lower().endswith('.sdlxliff'):
+            if mt_fp is None:
+                raise FileNotFoundError('No raw MT file found')
+            result = read_from_file(fp, raw_mt=mt_fp)
+        else:
+            result = read_from_file(fp, raw_mt=True)
+
+        if result is None:
+            raise ValueError('Filetype not supported')
+
+        df, cache = result
+        df_mt = match_target_mt(select_mt_segments(df))
+        row.update({k: cache.get(k) for k in ['Relation', 'Project', 'Document', 's_lid', 't_lid']})
+        row['segments'] = int(df_mt.shape[0])
+
+        if triage:
+            cache = pe_triage(df_mt, cache)
+            row['bad_apples'] = cache['bad_apples']
+            row['peach_perfects'] = cache['peach_perfects']
+        else:
+            cache = pe_density(df_mt, cache)
+            row['ped'] = cache['ped']
+            row['lev'] = int(df_mt['lev'].sum())
+            row['max_char'] = int(df_mt['max_char'].sum())
+
+    except Exception as e:
+        logging.warning('Could not score %s: %s', fp, e)
+        row['error'] = '{}: {}'.format(type(e).__name__, e)
+
+    return row
+
+
+def pool_scores(documents, level):
+    """Pool document scores by Relation or Project.
+
+    The pooled ped is the sum of all Levenshtein distances divided by the sum of all string lengths,
+    i.e. the score a single document with all segments would get.
+    """
+    scored = documents[documents['error'].isna()]
+    keys = ['Relation'] if level == 'Relation' else ['Relation', 'Project']
+    pooled = scored.groupby(keys, dropna=False)[COUNTS].sum(min_count=1).reset_index()
+    pooled['ped'] = (pooled['lev'] / pooled['max_char']).astype(float)
+    pooled['level'] = level
+
+    return pooled
+
+
+def run_batch(path, workers=None, mt_root=None, triage=False):
+    """Score all files found for path in a process pool.
+
+    Arguments:
+        path -- String specifying a directory or a glob pattern
+        workers -- int() specifying the number of processes. Defaults to the number of CPUs
+        mt_root -- Optional directory mirroring the project tree with raw MT files for SDLXLIFF inputs
+        triage -- Count bad apples and peach perfects only, see score_file()
+
+    Returns:
+        results -- DataFrame with one row per document plus pooled rows per Relation and per Project
+    """
+    import pandas as pd
+
+    files = find_files(path)
+    root = base_dir(path)
+    mt_files = [find_mt_file(fp, root, mt_root) for fp in files]
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        rows = list(executor.map(score_file, files, mt_files, repeat(triage), chunksize=4))
+
+    documents = pd.DataFrame(rows, columns=COLUMNS).astype({**dict.fromkeys(COUNTS, 'Int64'), 'ped': float})
+    results = pd.concat([documents, pool_scores(documents, 'Project'), pool_scores(documents, 'Relation')],
+                        ignore_index=True)
+
+    return results[COLUMNS]
+
+
+def save_results(fp, results):
+    """Write result table as CSV, or as Parquet if the file name ends with .parquet."""
+    if fp.lower().endswith('.parquet'):
+        results.to_parquet(fp, index=False)
+    else:
+        results.to_csv(fp, index=False, encoding='utf-8')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('path', help='Directory or glob pattern, e.g. "ab Dez 2010/**/*.sdlxliff"')
+    parser.add_argument('--out', default='results.csv', help='Output file (.csv or .parquet)')
+    parser.add_argument('--workers', type=int, default=None, help='Number of processes')
+    parser.add_argument('--mt-root', default=None, help='Directory with raw MT files mirroring the project tree')
+    parser.add_argument('--triage', action='store_true',
+                        help='Count bad apples and peach perfects instead of calculating the Post-Edit Density')
+    args = parser.parse_args()
+
+    results = run_batch(args.path, workers=args.workers, mt_root=args.mt_root, triage=args.triage)
+    save_results(args.out, results)
+
+    documents = results[results['level'] == 'Document']
+    print('Scored {} of {} files, results written to {}'.format(documents['error'].isna().sum(), len(documents),
+                                                               args.out))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,147 @@
+import hashlib
+import importlib.util
+import json
+import logging
+import os
+
+# Folder for parsed documents. Relative paths are resolved against the working directory, like data/API_key.txt.
+CACHE_DIR = os.path.join('data', 'cache')
+# Maximum size of the cache folder in bytes. Least recently used entries are removed beyond this size.
+MAX_CACHE_SIZE = 512 * 2 ** 20
+# Key for storing the metadata dictionary in the Parquet schema
+META_KEY = b'woerdle-zehla'
+
+
+def available():
+    """Check if the optional pyarrow dependency for the document cache is installed."""
+    # pyarrow is imported on first use only, as it takes longer to import than parsing most documents
+    return importlib.util.find_spec('pyarrow') is not None
+
+
+def file_hash(fp, chunk_size=2 ** 20):
+    """Return SHA-256 hex digest of the file content."""
+    sha = hashlib.sha256()
+    with open(fp, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+def document_key(paths, parser_version, **options):
+    """Create cache key from file contents, parser version and parsing options.
+
+    Arguments:
+        paths -- List of input file paths, e.g. deliverable and raw MT file
+        parser_version -- String identifying the parser output format
+        options -- Additional keyword arguments that change the parser output
+
+    Returns:
+        key -- String with SHA-256 hex digest
+    """
+    sha = hashlib.sha256(parser_version.encode('utf-8'))
+    for fp in paths:
+        sha.update(file_hash(fp).encode('ascii'))
+    sha.update(json.dumps(options, sort_keys=True).encode('utf-8'))
+    return sha.hexdigest()
+
+
+def entry_path(key, cache_dir=CACHE_DIR):
+    return os.path.join(cache_dir, key + '.parquet')
+
+
+def load_document(key, cache_dir=CACHE_DIR):
+    """Load parsed document from the cache.
+
+    Arguments:
+        key -- String returned by document_key
+        cache_dir -- Folder containing the cache entries
+
+    Returns:
+        df, cache -- DataFrame and metadata dictionary as returned by read_from_file, or None if there is no entry
+    """
+    fp = entry_path(key, cache_dir)
+    if not available() or not os.path.exists(fp):
+        return None
+
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    try:
+        table = pq.read_table(fp)
+        cache = json.loads(table.schema.metadata[META_KEY].decode('utf-8'))
+        df = table.to_pandas()
+    except (OSError, KeyError, ValueError, pa.ArrowException) as e:
+        logging.warning('Ignoring invalid cache entry %s: %s', fp, e)
+        remove_entry(fp)
+        return None
+
+    # Mark entry as recently used
+    try:
+        os.utime(fp)
+    except OSError:
+        pass
+
+    return df, cache
+
+
+def store_document(key, df, cache, cache_dir=CACHE_DIR, max_size=MAX_CACHE_SIZE):
+    """Write parsed document to the cache and evict least recently used entries beyond max_size.
+
+    Arguments:
+        key -- String returned by document_key
+        df -- DataFrame returned by read_from_file
+        cache -- Metadata dictionary returned by read_from_file
+        cache_dir -- Folder containing the cache entries
+        max_size -- Maximum size of the cache folder in bytes
+    """
+    if not available():
+        return
+
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        table = pa.Table.from_pandas(df)
+        metadata = dict(table.schema.metadata or {})
+        metadata[META_KEY] = json.dumps(cache, ensure_ascii=False).encode('utf-8')
+        table = table.replace_schema_metadata(metadata)
+
+        # Write to temporary file first, so that readers never see partial entries
+        fp = entry_path(key, cache_dir)
+        tmp = fp + '.{}.tmp'.format(os.getpid())
+        pq.write_table(table, tmp, compression='zstd')
+        os.replace(tmp, fp)
+
+    except (OSError, TypeError, ValueError, pa.ArrowException) as e:
+        logging.warning('Could not write cache entry for %s: %s', key, e)
+        return
+
+    evict(cache_dir, max_size)
+
+
+def evict(cache_dir=CACHE_DIR, max_size=MAX_CACHE_SIZE):
+    """Remove least recently used cache entries until the folder size is at most max_size bytes."""
+    entries = []
+    for entry in os.scandir(cache_dir):
+        if entry.name.endswith('.parquet'):
+            # Entries may be removed concurrently by other processes
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+    total = sum(size for _, size, _ in entries)
+    for _, size, fp in sorted(entries):
+        if total <= max_size:
+            break
+        remove_entry(fp)
+        total -= size
+
+
+def remove_entry(fp):
+    try:
+        os.remove(fp)
+    except OSError:
+        pass
@@ -1,8 +1,49 @@
+import heapq
+from concurrent.futures import ProcessPoolExecutor
+from statistics import NormalDist
+
+import numpy as np
+import pandas as pd
+
+# Lower score limit for bad apples and upper score limit for peach perfects
+BA_LIMIT = 0.4
+PP_LIMIT = 0.05
+# Number of chunks per worker process when scoring in parallel. More chunks even out the load between workers.
+CHUNKS_PER_WORKER = 4
+# Minimum number of pairs for which a process pool is used. Smaller tables are scored serially.
+MIN_PARALLEL_PAIRS = 2000
+# Number of bits per block of the numpy bit vectors in bounded_distances(). Patterns are split into blocks of this many
+# characters, each held in one uint64 word.
+WORD_SIZE = 64
+# Confidence level of the interval for post edit density estimated from a sample
+CONFIDENCE = 0.95
+# Number of pairs whose bounded distances are calculated together in numpy arrays, see bounded_distances()
+BATCH_PAIRS = 1024
+# Number of DP columns between two checks of Ukkonen's cut-off in bounded_distances()
+CHECK_INTERVAL = 8
+# Bit counts of all byte values, for counting the set bits of numpy bit vectors
+POPCOUNT = np.array([bin(i).count('1') for i in range(256)], dtype=np.int64)
 
 
 def levenshtein(s1, s2):
     """Calculate Levenshtein distance based on string1 and string2
 
+    Arguments:
+        s1 and s2 as str() where s1 corresponds to the target segment and s2 to the mt segment
+
+    The calculation is delegated to the engine selected with set_engine(). All engines return identical results.
+
+    Returns:
+        Levenshtein distance as int()
+    """
+    return _engine(s1, s2)
+
+
+def levenshtein_reference(s1, s2):
+    """Calculate Levenshtein distance with the row-by-row dynamic program.
+
+    This is the reference implementation the other engines are checked against.
+
     Arguments:
         s1 and s2 as str() where s1 corresponds to the target segment and s2 to the mt segment
 
@@ -12,7 +53,7 @@ def levenshtein(s1, s2):
     Source: Wikibooks
     """
     if len(s1) < len(s2):
-        return levenshtein(s2, s1)
+        return levenshtein_reference(s2, s1)
 
     # len(s1) >= len(s2)
     if len(s2) == 0:
@@ -32,29 +73,517 @@ def levenshtein(s1, s2):
     return previous_row[-1]
 
 
-def pe_density(df, cache):
+def levenshtein_bitparallel(s1, s2):
+    """Calculate Levenshtein distance with the bit-parallel algorithm by Myers/Hyyrö.
+
+    Arguments:
+        s1 and s2 as str() where s1 corresponds to the target segment and s2 to the mt segment
+
+    Common prefixes and suffixes do not change the distance and are stripped first. The shorter string is then
+    encoded as bit vectors, so that each character of the longer string updates a whole DP column at once.
+    The bit vectors are Python integers of any length, so carries and shifts across machine words are handled by
+    Python's integer arithmetic. bounded_distances() splits them into WORD_SIZE blocks instead.
+
+    Returns:
+        Levenshtein distance as int()
+    """
+    text, pattern = _strip_affixes(s1, s2)
+
+    if len(pattern) == 0:
+        return len(text)
+
+    return _myers(pattern, text)
+
+
+def levenshtein_bounded(s1, s2, k):
+    """Calculate Levenshtein distance up to an upper bound k.
+
+    Arguments:
+        s1 and s2 as str() where s1 corresponds to the target segment and s2 to the mt segment
+        k -- int() specifying the largest distance of interest
+
+    Follows Ukkonen's cut-off: Every alignment ends on the main diagonal of the DP matrix, so the distance is at least
+    the length difference, and at least the value on the diagonal that leads to the last cell. The calculation stops
+    as soon as one of these bounds exceeds k.
+
+    Returns:
+        Levenshtein distance as int() if it does not exceed k, else k + 1
+    """
+    text, pattern = _strip_affixes(s1, s2)
+
+    if len(text) - len(pattern) > k:
+        return k + 1
+
+    if len(pattern) == 0:
+        return len(text)
+
+    return min(_myers(pattern, text, k), k + 1)
+
+
+def bounded_distances(s1, s2, k):
+    """Calculate Levenshtein distances up to an upper bound for many pairs at once.
+
+    Arguments:
+        s1 and s2 -- array-likes of str() where s1 corresponds to the target segments and s2 to the mt segments
+        k -- int() or array-like of int() specifying the largest distance of interest for each pair
+
+    Pairs whose length difference exceeds k are rejected before any bit vectors are built. The remaining pairs are
+    grouped by the number of WORD_SIZE blocks of their pattern and run through the bit-parallel recurrences in
+    numpy arrays, one DP column of all pairs of a batch at a time. Blocks are only calculated once their rows can
+    hold a value of at most k, and pairs leave the batch as soon as Ukkonen's cut-off rejects them.
+
+    Returns:
+        numpy array with the Levenshtein distance of each pair if it does not exceed k, else k + 1
+    """
+    s1, s2 = list(s1), list(s2)
+    k = np.broadcast_to(np.asarray(k, dtype=np.int64), (len(s1),))
+    result = np.empty(len(s1), dtype=np.int64)
+
+    positions, patterns, texts = [], [], []
+    for i, (a, b, bound) in enumerate(zip(s1, s2, k)):
+        if abs(len(a) - len(b)) > bound:
+            result[i] = bound + 1
+            continue
+        text, pattern = _strip_affixes(a, b)
+        if len(pattern) == 0:
+            result[i] = min(len(text), bound + 1)
+            continue
+        positions.append(i)
+        patterns.append(pattern)
+        texts.append(text)
+
+    positions = np.array(positions, dtype=np.int64)
+    blocks = np.array([(len(p) + WORD_SIZE - 1) // WORD_SIZE for p in patterns], dtype=np.int64)
+    for n_blocks in np.unique(blocks):
+        members = np.flatnonzero(blocks == n_blocks)
+        for start in range(0, len(members), BATCH_PAIRS):
+            batch = members[start:start + BATCH_PAIRS]
+            result[positions[batch]] = _myers_blocks([patterns[i] for i in batch], [texts[i] for i in batch],
+                                                     k[positions[batch]], int(n_blocks))
+
+    return result
+
+
+def _myers_blocks(patterns, texts, k, n_blocks):
+    """Run the bit-parallel recurrences for a batch of pairs with 0 < len(pattern) <= len(text).
+
+    Bit vectors are numpy arrays of shape (pairs, n_blocks) with WORD_SIZE rows per block. Returns the distance of
+    each pair, or k + 1 once it is known to exceed k.
+    """
+    word = np.uint64(WORD_SIZE)
+    one = np.uint64(1)
+    m = np.array([len(p) for p in patterns], dtype=np.int64)
+    n = np.array([len(t) for t in texts], dtype=np.int64)
+    pairs = np.arange(len(patterns))
+
+    # Match masks for each (pair, character) of the patterns, with a row of zeros for characters of the texts
+    # that do not occur in the pattern of their pair
+    chars = _code_points(patterns)
+    pair = np.repeat(pairs, m)
+    row = np.arange(len(chars)) - np.repeat(np.cumsum(m) - m, m)
+    keys, ids = np.unique((pair << 21) | chars, return_inverse=True)
+    peq = np.zeros((len(keys) + 1, n_blocks), dtype=np.uint64)
+    np.bitwise_or.at(peq, (ids, row // WORD_SIZE), one << (row % WORD_SIZE).astype(np.uint64))
+
+    text_keys = (np.repeat(pairs, n) << 21) | _code_points(texts)
+    found = np.minimum(np.searchsorted(keys, text_keys), len(keys) - 1)
+    # Character ids of the texts by column, so that each column is read from contiguous memory
+    codes = np.full((n.max(), len(texts)), len(keys), dtype=np.int64)
+    codes[np.arange(len(text_keys)) - np.repeat(np.cumsum(n) - n, n), np.repeat(pairs, n)] = \
+        np.where(keys[found] == text_keys, found, len(keys))
+
+    # Bits above the last row of a pattern only ever carry and shift into higher bits, so they are masked out when
+    # the vertical deltas are counted instead of after each column
+    mask = _low_bits(m, n_blocks)
+    pv = mask.copy()
+    mv = np.zeros_like(pv)
+    result = np.empty(len(patterns), dtype=np.int64)
+
+    for j in range(int(n.max())):
+        # Rows below j + k hold values above k. A block is taken up one column before its first row can reach k,
+        # so that it starts from values that are too large, but never too small.
+        active = min(n_blocks, (j + int(k.max()) + 1) // WORD_SIZE + 1)
+        eq = peq[codes[j, pairs], :active]
+        pv_a, mv_a = pv[:, :active], mv[:, :active]
+
+        xv = eq | mv_a
+        total = (eq & pv_a) + pv_a
+        if active > 1:
+            # Carry the overflow of each block into the next one, also through blocks with all bits set
+            carry = np.zeros(total.shape, dtype=bool)
+            carry[:, 1:] = total[:, :-1] < pv_a[:, :-1]
+            spill = carry & (total == np.uint64(2 ** 64 - 1))
+            while spill[:, :-1].any():
+                new = spill[:, :-1] & ~carry[:, 1:]
+                carry[:, 1:] |= new
+                spill = np.zeros_like(carry)
+                spill[:, 1:] = new & (total[:, 1:] == np.uint64(2 ** 64 - 1))
+            total += carry.astype(np.uint64)
+        xh = (total ^ pv_a) | eq
+        ph = mv_a | ~(xh | pv_a)
+        mh = pv_a & xh
+
+        ph_top, mh_top = ph >> (word - one), mh >> (word - one)
+        ph <<= one
+        mh <<= one
+        ph[:, 1:] |= ph_top[:, :-1]
+        mh[:, 1:] |= mh_top[:, :-1]
+        ph[:, 0] |= one
+        pv[:, :active] = mh | ~(xv | ph)
+        mv[:, :active] = ph & xv
+
+        # The value in the last row is the top boundary j + 1 plus the vertical deltas of all rows
+        done = n == j + 1
+        if done.any():
+            deltas = _popcount(pv[done] & mask[done]) - _popcount(mv[done] & mask[done])
+            result[pairs[done]] = np.minimum(n[done] + deltas, k[done] + 1)
+        rejected = np.zeros_like(done)
+        if j % CHECK_INTERVAL == 0:
+            # Walk up the column to the cell above the main diagonal as in _myers()
+            diagonal = m - n + j + 1
+            above = _low_bits(np.maximum(diagonal, 0), n_blocks)
+            lower = j + 1 + _popcount(pv & above) - _popcount(mv & above)
+            rejected = (diagonal >= 0) & (lower > k) & ~done
+            result[pairs[rejected]] = k[rejected] + 1
+
+        keep = ~(done | rejected)
+        if not keep.all():
+            if not keep.any():
+                break
+            pairs, m, n, k, pv, mv, mask = pairs[keep], m[keep], n[keep], k[keep], pv[keep], mv[keep], mask[keep]
+
+    return result
+
+
+def _code_points(strings):
+    """Return the code points of the concatenated strings as numpy array."""
+    return np.frombuffer(''.join(strings).encode('utf-32-le'), dtype=np.uint32).astype(np.int64)
+
+
+def _low_bits(rows, n_blocks):
+    """Return bit vectors of shape (len(rows), n_blocks) with the bits of the first rows[i] rows set."""
+    offset = np.clip(rows[:, None] - WORD_SIZE * np.arange(n_blocks)[None, :], 0, WORD_SIZE).astype(np.uint64)
+    partial = (np.uint64(1) << np.minimum(offset, np.uint64(WORD_SIZE - 1))) - np.uint64(1)
+    return np.where(offset == WORD_SIZE, np.uint64(2 ** 64 - 1), partial)
+
+
+def _popcount(bits):
+    """Return the number of set bits in each row of a uint64 array."""
+    return POPCOUNT[bits.view(np.uint8)].reshape(bits.shape[0], -1).sum(axis=1)
+
+
+def _strip_affixes(s1, s2):
+    """Strip common prefix and suffix and return the longer and the shorter remainder."""
+    if len(s1) < len(s2):
+        s1, s2 = s2, s1
+
+    start = 0
+    stop = len(s2)
+    while start < stop and s1[start] == s2[start]:
+        start += 1
+    offset = len(s1) - len(s2)
+    while stop > start and s1[stop + offset - 1] == s2[stop - 1]:
+        stop -= 1
+
+    return s1[start:stop + offset], s2[start:stop]
+
+
+def _myers(pattern, text, k=None):
+    """Run the bit-parallel recurrences for pattern against text (0 < len(pattern) <= len(text)).
+
+    If k is given, return k + 1 once the distance is known to exceed k.
+    """
+    # Match mask for each character in the pattern
+    peq = {}
+    bit = 1
+    for c in pattern:
+        peq[c] = peq.get(c, 0) | bit
+        bit <<= 1
+
+    m = len(pattern)
+    mask = (1 << m) - 1
+    last = 1 << (m - 1)
+    # Vertical positive and negative deltas of the current DP column
+    pv = mask
+    mv = 0
+    score = m
+    # Row of the main diagonal cell in the current DP column. It enters the matrix in column len(text) - m.
+    diagonal = m - len(text)
+    # Diagonal values grow by at most one per column, so the bound only needs to be checked again once the
+    # remaining gap to k may have been used up. Without k, the check is never reached.
+    check = 0 if k is not None else m + 1
+
+    for c in text:
+        eq = peq.get(c, 0)
+        xv = eq | mv
+        xh = (((eq & pv) + pv) ^ pv) | eq
+        ph = mv | ~(xh | pv)
+        mh = pv & xh
+
+        if ph & last:
+            score += 1
+        elif mh & last:
+            score -= 1
+
+        ph = (ph << 1) | 1
+        mh <<= 1
+        pv = (mh | ~(xv | ph)) & mask
+        mv = ph & xv & mask
+
+        diagonal += 1
+        if diagonal >= check:
+            # Walk up the column from the last row to the diagonal cell by subtracting the vertical deltas
+            lower = score - bin(pv >> diagonal).count('1') + bin(mv >> diagonal).count('1')
+            if lower > k:
+                return k + 1
+            check = diagonal + k - lower + 1
+
+    return score
+
+
+# Available distance engines. The reference engine is kept as fallback.
+ENGINES = {'bitparallel': levenshtein_bitparallel,
+           'reference': levenshtein_reference}
+
+_engine = ENGINES['bitparallel']
+
+
+def set_engine(name):
+    """Select the engine used by levenshtein().
+
+    Arguments:
+        name -- String specifying a key in ENGINES, e.g. 'bitparallel' (default) or 'reference'
+    """
+    global _engine
+    if name not in ENGINES:
+        raise ValueError("Unknown distance engine '{}'. Choose from {}".format(name, ', '.join(ENGINES)))
+    _engine = ENGINES[name]
+
+
+def score_pairs(target, mt):
+    """Score target-mt pairs in one pass.
+
+    Arguments:
+        target -- Series or array-like of target strings
+        mt -- Series or array-like of mt strings with the same length as target
+
+    Returns:
+        lev -- numpy array with the Levenshtein distance of each pair
+        max_char -- numpy array with the maximum string length of each pair
+        score -- numpy array with the distance normalized by max_char (NaN if both strings are empty)
+    """
+    target = pd.Series(target, dtype=object)
+    mt = pd.Series(mt, dtype=object)
+
+    max_char = _max_char(target, mt)
+    lev = np.fromiter(map(levenshtein, target.to_numpy(), mt.to_numpy()), dtype=np.int64, count=len(target))
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        score = lev / max_char
+
+    return lev, max_char, score
+
+
+def classify_pairs(target, mt, ba_limit=BA_LIMIT, pp_limit=PP_LIMIT):
+    """Classify target-mt pairs as bad apples or peach perfects without calculating every distance in full.
+
+    Arguments:
+        target -- Series or array-like of target strings
+        mt -- Series or array-like of mt strings with the same length as target
+        ba_limit -- as lower limit for the bad_apples classification
+        pp_limit -- as upper limit for the peach perfect classification
+
+    Each distance is only calculated up to the smallest value that makes a pair a bad apple, see
+    bounded_distances(). Below that value, the bounded distance is exact and decides on peach perfects.
+
+    Returns:
+        triage -- numpy array with 'bad_apple', 'peach_perfect' or '' for each pair
+    """
+    target = pd.Series(target, dtype=object)
+    mt = pd.Series(mt, dtype=object)
+    max_char = _max_char(target, mt)
+
+    # Find smallest distance with a score at or above ba_limit. Pairs with two empty strings have no score.
+    scored = max_char > 0
+    n = max_char[scored]
+    cap = np.ceil(ba_limit * n).astype(np.int64)
+    cap = np.where((cap > 0) & ((cap - 1) / n >= ba_limit), cap - 1, cap)
+    cap = np.where(cap / n < ba_limit, cap + 1, cap)
+
+    lev = bounded_distances(target.to_numpy()[scored], mt.to_numpy()[scored], cap - 1)
+
+    triage = np.full(len(target), '', dtype=object)
+    triage[np.flatnonzero(scored)[lev >= cap]] = 'bad_apple'
+    triage[np.flatnonzero(scored)[(lev < cap) & (lev / n <= pp_limit)]] = 'peach_perfect'
+
+    return triage
+
+
+def _max_char(target, mt):
+    """Return the maximum string length of each target-mt pair as numpy array."""
+    return np.maximum(target.str.len().to_numpy(dtype=np.int64), mt.str.len().to_numpy(dtype=np.int64))
+
+
+def split_chunks(lengths, n_chunks):
+    """Split pair positions into chunks with a similar number of characters.
+
+    Arguments:
+        lengths -- array-like with the character count of each pair
+        n_chunks -- int() specifying the number of chunks
+
+    Pairs are assigned longest first to the chunk with the fewest characters so far.
+
+    Returns:
+        chunks -- List of sorted numpy arrays containing pair positions
+    """
+    heap = [(0, i) for i in range(n_chunks)]
+    members = [[] for _ in range(n_chunks)]
+
+    for pos in np.argsort(lengths, kind='stable')[::-1]:
+        load, i = heapq.heappop(heap)
+        members[i].append(pos)
+        heapq.heappush(heap, (load + int(lengths[pos]), i))
+
+    return [np.sort(np.array(m, dtype=np.int64)) for m in members if m]
+
+
+def _score_chunk(engine, target, mt):
+    """Score one chunk in a worker process with the engine selected in the parent process."""
+    lev = np.fromiter(map(engine, target, mt), dtype=np.int64, count=len(target))
+    return lev, int(lev.sum())
+
+
+def score_pairs_parallel(target, mt, workers):
+    """Score target-mt pairs in a process pool.
+
+    Arguments:
+        target -- Series or array-like of target strings
+        mt -- Series or array-like of mt strings with the same length as target
+        workers -- int() specifying the number of worker processes
+
+    Returns:
+        Same arrays as score_pairs() and in the same order, plus the sums of lev and max_char merged from the chunks
+    """
+    target = pd.Series(target, dtype=object)
+    mt = pd.Series(mt, dtype=object)
+
+    max_char = _max_char(target, mt)
+    target, mt = target.to_numpy(), mt.to_numpy()
+    lev = np.zeros(len(target), dtype=np.int64)
+    lev_sum = 0
+
+    chunks = split_chunks(max_char, workers * CHUNKS_PER_WORKER)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(_score_chunk, _engine, list(target[c]), list(mt[c])) for c in chunks]
+        for chunk, future in zip(chunks, futures):
+            chunk_lev, chunk_sum = future.result()
+            lev[chunk] = chunk_lev
+            lev_sum += chunk_sum
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        score = lev / max_char
+
+    return lev, max_char, score, lev_sum, int(max_char.sum())
+
+
+def pe_density(df, cache, workers=1, details=True):
     """Calculate post edit density for MT strings.
 
     Arguments:
-        df -- DataFrame table containing string data in "source", "target" and "mt" columns
+        df -- DataFrame table containing the segment key in "file", "unit" and "seg_id" columns and string data in
+              "source", "target" and "mt" columns, e.g. from source.utils.match_target_mt
+        workers -- int() specifying the number of processes used for scoring. Defaults to 1 (no process pool)
+        details -- Flag to add the key, strings and score of each segment to the cache as 'ped_details', keyed by
+                   the row of the segment table. Turn off when
+                   the results are exported from df, e.g. with source.export, to save memory on large documents.
 
-        The function applies the Levenshtein algorithm to each row and stores the output and corresponding ped data in
+        The function scores all target-mt pairs in one pass and stores the output and corresponding ped data in
         three new columns. The aggregated score as well as string and individual score data is the added to the cache.
 
     Returns:
         cache -- Updated dictionary containing ped score data
     """
+    # Get Levenshtein distance, maximum segment length and normalized score for each target-mt pair.
+    # We need the maximum length to avoid dividing by zero.
+    if workers > 1 and df.shape[0] >= MIN_PARALLEL_PAIRS:
+        df['lev'], df['max_char'], df['score'], lev_sum, max_char_sum = score_pairs_parallel(df['target'], df['mt'],
+                                                                                             workers)
+    else:
+        df['lev'], df['max_char'], df['score'] = score_pairs(df['target'], df['mt'])
+        lev_sum, max_char_sum = df['lev'].sum(), df['max_char'].sum()
 
-    # Write the maximum length for each target-mt pair to a new column. We need this value to avoid dividing by zero.
-    df["max_char"] = df.apply(lambda x: max(len(x.target), len(x.mt)), axis=1)
-    # Calculate Levenshtein distance for each target-mt pair.
-    df["lev"] = df.apply(lambda x: levenshtein(x.target, x.mt), axis=1)
-    # Normalize Levenshtein distance by maximum segment length.
-    df['score'] = df['lev'].copy().div(df['max_char'])
-
-    ped_details = df[['score', 'source', 'target', 'mt']].to_dict('index')
-    ped = df['lev'].sum() / df['max_char'].sum()
+    ped = lev_sum / max_char_sum
     cache['ped'] = ped
-    cache['ped_details'] = ped_details
+    if details:
+        cache['ped_details'] = df[['file', 'unit', 'seg_id', 'score', 'source', 'target', 'mt']].to_dict('index')
+
+    return cache
+
+
+def ratio_interval(lev, max_char, strata, weights, confidence=CONFIDENCE):
+    """Estimate post edit density of a document and its confidence interval from a stratified sample.
+
+    Arguments:
+        lev -- array-like with the Levenshtein distance of each sampled pair
+        max_char -- array-like with the maximum string length of each sampled pair
+        strata -- array-like with the stratum label of each sampled pair
+        weights -- array-like with the number of segments each pair stands for, i.e. stratum size / sample size
+        confidence -- confidence level of the interval
+
+        Post edit density is a ratio of sums, so the estimate is the weighted ratio of distances to lengths. Its
+        variance follows from the linearized residuals lev - ped * max_char within each stratum. Strata sampled in
+        full add no variance. The variance of a stratum with a single sampled pair out of several segments is
+        unknown, in which case the bounds are NaN.
+
+    Returns:
+        ped -- estimated post edit density of the document
+        low, high -- bounds of the confidence interval
+    """
+    lev = np.asarray(lev, dtype=float)
+    max_char = np.asarray(max_char, dtype=float)
+    strata = np.asarray(strata)
+    weights = np.asarray(weights, dtype=float)
+
+    x_total = (weights * max_char).sum()
+    if not x_total:
+        return float('nan'), float('nan'), float('nan')
+    ped = (weights * lev).sum() / x_total
+    residuals = lev - ped * max_char
+
+    variance = 0.0
+    for stratum in np.unique(strata):
+        mask = strata == stratum
+        n = mask.sum()
+        population = weights[mask][0] * n
+        if n >= round(population):
+            continue
+        if n < 2:
+            return float(ped), float('nan'), float('nan')
+        variance += population ** 2 * (1 - n / population) * residuals[mask].var(ddof=1) / n
+
+    half_width = NormalDist().inv_cdf(0.5 + confidence / 2) * variance ** 0.5 / x_total
+
+    return float(ped), float(ped - half_width), float(ped + half_width)
+
+
+def pe_triage(df, cache, ba_limit=BA_LIMIT, pp_limit=PP_LIMIT):
+    """Count bad apples and peach perfects without calculating post edit density.
+
+    Arguments:
+        df -- DataFrame table containing string data in "source", "target" and "mt" columns
+        ba_limit -- as lower limit for the bad_apples classification
+        pp_limit -- as upper limit for the peach perfect classification
+
+        This is the fast path for triage runs. The classification is stored in a new "triage" column and the counts
+        are added to the cache.
+
+    Returns:
+        cache -- Updated dictionary containing the number of bad apples and peach perfects
+    """
+    df['triage'] = classify_pairs(df['target'], df['mt'], ba_limit=ba_limit, pp_limit=pp_limit)
+
+    cache['segments'] = int(df.shape[0])
+    cache['bad_apples'] = int((df['triage'] == 'bad_apple').sum())
+    cache['peach_perfects'] = int((df['triage'] == 'peach_perfect').sum())
 
     return cache
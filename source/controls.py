@@ -10,11 +10,16 @@ from distutils import util
 import pandas as pd
 import os
 
+from source.api import create_translator
 from source.parsing import read_from_file
-from source.utils import new_translation, match_target_mt, save_cache
+from source.utils import new_translation, match_target_mt, save_cache, select_mt_segments
 from source.sampling import new_sample
-from source.calculation import pe_density
+from source.calculation import pe_density, BA_LIMIT, PP_LIMIT
 from source.settings import SettingsWindow
+from source.streaming import RunningPED, eligible_segments, stream_density
+
+# Upper limit of the sample size box. Use the Full Document button to translate all segments.
+MAX_SAMPLE_SIZE = 5000
 
 
 class MyControlWidget(widgets.Tab):
@@ -53,6 +58,7 @@ class MyControlWidget(widgets.Tab):
 
         self.toggle_files_button.observe(self.toggle_file_options, names='value')
         self.calculate_button.on_click(self.run_calculation)
+        self.full_button.on_click(self.run_full_document)
         self.plot_button.on_click(self.plot_results)
         self.sample_button.on_click(self.run_sample)
 
@@ -100,8 +106,10 @@ class MyControlWidget(widgets.Tab):
         self.labelled_sample_size_box = self.label_sample_size_box()
         self.sample_button = create_expanded_button('Sample', 'warning')
         self.calculate_button = create_expanded_button('Calculate', 'warning')
+        self.full_button = create_expanded_button('Full Document', 'warning')
 
-        return widgets.GridBox([self.labelled_sample_size_box, self.sample_button, self.calculate_button],
+        return widgets.GridBox([self.labelled_sample_size_box, self.sample_button, self.calculate_button,
+                                self.full_button],
                                layout=widgets.Layout(grid_template_columns="repeat(1, 99.5%)"))
 
     def build_input_widget(self):
@@ -137,19 +145,20 @@ class MyControlWidget(widgets.Tab):
         )
 
     def toggle_file_options(self, change):
-        toggle_dict = {"Source & Target": [True, False, False, "<font color='black'>Sample Size</font>"],
-                       "Source, Target & MT": [False, True, True, "<font color='grey'>Sample Size</font>"]
+        toggle_dict = {"Source & Target": [True, False, False, "<font color='black'>Sample Size</font>", False],
+                       "Source, Target & MT": [False, True, True, "<font color='grey'>Sample Size</font>", True]
                        }
 
         attr_list = [(self.raw_mt_input, 'disabled'), (self.sample_button, 'disabled'),
-                     (self.sample_size_box, 'disabled'), (self.sample_size_label, 'value')]
+                     (self.sample_size_box, 'disabled'), (self.sample_size_label, 'value'),
+                     (self.full_button, 'disabled')]
 
         for i, j in enumerate(attr_list):
             setattr(j[0], j[1], toggle_dict[change['new']][i])
 
     @staticmethod
     def build_sample_size_box():
-        return widgets.BoundedIntText(value=50, min=1, max=125, step=1, disabled=False,
+        return widgets.BoundedIntText(value=50, min=1, max=MAX_SAMPLE_SIZE, step=1, disabled=False,
                                       layout=Layout(width='98.5%', height='30px'))
 
     def label_sample_size_box(self):
@@ -181,17 +190,16 @@ class MyControlWidget(widgets.Tab):
 
             if os.path.exists(self.raw_mt_input.value):
                 raw_mt = self.raw_mt_input.value
+            elif self.source_file_input.value.lower().endswith('.sdlxliff'):
+                # Only HTML previews hold the MT output in the same file
+                self.textarea.value = 'Please enter the path to the raw MT file for SDLXLIFF input.\n'
+                return
             else:
                 raw_mt = True
 
             self.df, self.cache = read_from_file(self.source_file_input.value, raw_mt=raw_mt)
-            #  TODO: Check if the filter index is still necessary when matching string indices in match_target_mt below.
-            filter_index = self.df.query('status == "mt"').index
-            self.df = self.df.loc[filter_index]
-
-            # Create boolean filter with all repetitions except for first occurrences set to True
-            filter_index = self.df.query('stype == "source"').duplicated('text')
-            self.df = self.df[-filter_index]
+            # Keep segments with MT output and drop repetitions
+            self.df = select_mt_segments(self.df)
 
         else:
             self.df = new_translation(self.df, self.cache, self.sample_object)
@@ -205,6 +213,33 @@ class MyControlWidget(widgets.Tab):
 
         self.autosave()
 
+    def run_full_document(self, b):
+        """Translate all eligible segments and score each batch as it returns.
+
+        The text area shows the running Post-Edit Density while batches come in. Segment details are not kept,
+        so that memory stays bounded for large documents. The cache holds the score histogram instead.
+        """
+        self.out.clear_output()
+        self.df, self.cache = read_from_file(self.source_file_input.value)
+        segments = eligible_segments(self.df)
+
+        running = RunningPED(total=len(segments))
+        with create_translator() as translator:
+            for running, _ in stream_density(segments, self.cache['t_lid'], self.cache['s_lid'], translator):
+                self.textarea.value = 'Running Post-Edit Density {:.3f} ({}/{} segments)\n'.format(
+                    running.ped, running.segments, running.total)
+
+        # Without eligible segments, the score is NaN and the summary is empty, as in pe_density.py
+        self.cache['ped'] = running.ped
+        self.cache['ped_summary'] = running.summary() if segments else {}
+        self.cache['ped_details'] = {}
+        self.textarea.value = 'Your Post-Edit Density score is {:.3f} ({} segments)\n'.format(running.ped,
+                                                                                               running.segments)
+        self.textarea.value += 'Bad Apples (PED >= {}): {}\nPeach Perfects (PED <= {}): {}\n'.format(
+            running.ba_limit, running.bad_apples, running.pp_limit, running.peach_perfects)
+
+        self.autosave()
+
     def autosave(self):
         if util.strtobool(self.settings.value("autosave", "")):
             self.save_as(auto=True)
@@ -239,7 +274,7 @@ class MyControlWidget(widgets.Tab):
             with self.out:
                 print("Warning", "Not a valid path for saving!")
 
-    def statistics(self, ba_limit=0.4, pp_limit=0.05):
+    def statistics(self, ba_limit=BA_LIMIT, pp_limit=PP_LIMIT):
         """Run additional statistics on Levenshtein distance results
 
         Arguments:
@@ -0,0 +1,202 @@
+from abc import ABC, abstractmethod
+import csv
+import json
+import math
+
+import numpy as np
+
+# Columns identifying a segment: row of the segment table, original file name, trans-unit id and segment ID
+KEY_COLUMNS = ['row', 'file', 'unit', 'seg_id']
+# Columns of the per-segment results, in the order of the rows yielded by source.streaming
+RESULT_COLUMNS = KEY_COLUMNS + ['score', 'lev', 'max_char', 'source', 'target', 'mt']
+# Columns of the CSV results before the document metadata
+CSV_COLUMNS = KEY_COLUMNS + ['score', 'source', 'target', 'mt']
+# Document metadata added to each row of the results
+META_COLUMNS = ['Relation', 'Project', 'Document', 's_lid', 't_lid']
+# Number of rows per Parquet row group. Rows are buffered until a group is complete.
+ROW_GROUP_SIZE = 50000
+# Parquet compression codec
+COMPRESSION = 'zstd'
+
+
+class RowWriter(ABC):
+    """Base class for writers of per-segment results.
+
+    Subclasses implement write() for rows of tuples in the order of RESULT_COLUMNS and close(). Used as context
+    manager, the writer is closed when the block ends normally and aborted when it raises.
+    """
+
+    @abstractmethod
+    def write(self, rows):
+        """Add rows of tuples in the order of RESULT_COLUMNS."""
+
+    def write_frame(self, df, chunk_size=ROW_GROUP_SIZE):
+        """Add results of source.calculation.pe_density, i.e. a DataFrame from source.utils.match_target_mt."""
+        for start in range(0, df.shape[0], chunk_size):
+            chunk = df.iloc[start:start + chunk_size]
+            self.write(zip(chunk.index, chunk['file'], chunk['unit'], chunk['seg_id'], chunk['score'], chunk['lev'],
+                           chunk['max_char'], chunk['source'], chunk['target'], chunk['mt']))
+
+    @abstractmethod
+    def close(self):
+        """Complete the output."""
+
+    def abort(self):
+        """Release the output after a failed run. Defaults to close(), which keeps the rows written so far."""
+        self.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+class ResultWriter(RowWriter):
+    """Write per-segment results with document metadata to a Parquet file.
+
+    Arguments:
+        fp -- path to the Parquet file
+        cache -- Dictionary with document metadata. The values of META_COLUMNS are added to every row.
+        row_group_size -- number of rows per row group
+        compression -- Parquet compression codec
+
+    Rows can be written in batches as they are scored, so that the results never have to be held in memory in full.
+    Use as context manager or call close() when done.
+    """
+
+    def __init__(self, fp, cache, row_group_size=ROW_GROUP_SIZE, compression=COMPRESSION):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        self.schema = pa.schema([('row', pa.int64()), ('file', pa.dictionary(pa.int32(), pa.string())),
+                                 ('unit', pa.string()), ('seg_id', pa.int64()), ('score', pa.float64()),
+                                 ('lev', pa.int64()),
+                                 ('max_char', pa.int64()), ('source', pa.large_string()),
+                                 ('target', pa.large_string()), ('mt', pa.large_string())] +
+                                [(key, pa.dictionary(pa.int32(), pa.string())) for key in META_COLUMNS])
+        self.meta = [None if cache.get(key) is None else str(cache[key]) for key in META_COLUMNS]
+        self.writer = pq.ParquetWriter(fp, self.schema, compression=compression)
+        self.row_group_size = row_group_size
+        self.rows = []
+        self.segments = 0
+
+    def write(self, rows):
+        """Add rows of tuples in the order of RESULT_COLUMNS."""
+        self.rows.extend(rows)
+        while len(self.rows) >= self.row_group_size:
+            self._flush(self.rows[:self.row_group_size])
+            del self.rows[:self.row_group_size]
+
+    def _flush(self, rows):
+        import pyarrow as pa
+
+        columns = list(zip(*rows))
+        arrays = [pa.array(values, type=field.type) for values, field in zip(columns, self.schema)]
+        # Metadata is constant, so each column is a dictionary with a single entry. Missing values are null.
+        indices = pa.array(np.zeros(len(rows), dtype=np.int32))
+        missing = pa.nulls(len(rows), type=pa.int32())
+        arrays += [pa.DictionaryArray.from_arrays(missing, pa.array([], type=pa.string())) if value is None else
+                   pa.DictionaryArray.from_arrays(indices, pa.array([value], type=pa.string()))
+                   for value in self.meta]
+        self.writer.write_table(pa.Table.from_arrays(arrays, schema=self.schema))
+        self.segments += len(rows)
+
+    def close(self):
+        try:
+            if self.rows:
+                self._flush(self.rows)
+                self.rows = []
+        finally:
+            self.writer.close()
+
+
+class CsvWriter(RowWriter):
+    """Write per-segment results with document metadata as CSV.
+
+    Arguments:
+        fp -- path to the CSV file
+        cache -- Dictionary with document metadata. The values of META_COLUMNS are added to every row.
+
+    Each segment is written as one row in the columns of CSV_COLUMNS as soon as it is passed to write().
+    """
+
+    def __init__(self, fp, cache):
+        self.f = open(fp, 'w', encoding='utf-8', newline='')
+        self.writer = csv.writer(self.f)
+        self.writer.writerow(CSV_COLUMNS + META_COLUMNS)
+        self.meta = [cache.get(key) for key in META_COLUMNS]
+        self.segments = 0
+
+    def write(self, rows):
+        """Add rows of tuples in the order of RESULT_COLUMNS."""
+        for row, file, unit, seg_id, score, lev, max_char, source, target, mt in rows:
+            self.writer.writerow([row, file, unit, seg_id, score, source, target, mt] + self.meta)
+            self.segments += 1
+
+    def close(self):
+        self.f.close()
+
+
+class JsonlWriter(RowWriter):
+    """Write per-segment results as JSON Lines, followed by a summary record.
+
+    Arguments:
+        fp -- path to the JSON Lines file
+        cache -- Dictionary with document metadata and scores. The summary record is taken from it on close, so
+                 update it before closing.
+
+    Each segment is written as one line, e.g. {"row": 0, "file": "...", "seg_id": 1, "score": 0.1, ...}, as soon as
+    it is passed to write(). The last line is {"summary": {...}} with the contents of summary(cache). It is only
+    written by close(), so that the output of a failed run has no summary. NaN values are written as null.
+    """
+
+    def __init__(self, fp, cache):
+        self.f = open(fp, 'w', encoding='utf-8')
+        self.cache = cache
+        self.segments = 0
+
+    def write(self, rows):
+        for row in rows:
+            # numpy integers are not serializable as such
+            self.f.write(json.dumps(json_safe(dict(zip(RESULT_COLUMNS, row))), ensure_ascii=False, default=int,
+                                    allow_nan=False) + '\n')
+            self.segments += 1
+
+    def close(self):
+        try:
+            self.f.write(json.dumps({'summary': summary(self.cache)}, ensure_ascii=False, default=str,
+                                    allow_nan=False) + '\n')
+        finally:
+            self.f.close()
+
+    def abort(self):
+        self.f.close()
+
+
+def json_safe(value):
+    """Replace NaN and infinite floats, which are not valid JSON, with None in nested dictionaries and lists.
+
+    The score of an empty document, or of a segment with empty target and MT strings, is NaN.
+    """
+    if isinstance(value, float):
+        return value if math.isfinite(value) else None
+    if isinstance(value, dict):
+        return {key: json_safe(v) for key, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [json_safe(v) for v in value]
+    return value
+
+
+def summary(cache):
+    """Return cache without the per-segment details, e.g. for a JSON file next to the Parquet results."""
+    return json_safe({key: value for key, value in cache.items() if key != 'ped_details'})
+
+
+def save_summary(fp, cache):
+    """Store cache without per-segment details as JSON."""
+    with open(fp, 'w', encoding='utf-8') as f:
+        json.dump(summary(cache), f, ensure_ascii=False, indent=2, allow_nan=False)
@@ -0,0 +1,134 @@
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+# Database file for MT output. Relative paths are resolved against the working directory, like data/API_key.txt.
+MT_CACHE_FILE = os.path.join('data', 'mt_cache.sqlite')
+# Maximum number of cached translations. Least recently used entries are removed beyond this number.
+MAX_ENTRIES = 500000
+# Maximum age of cached translations in days. MT engines change, so old output is translated again.
+MAX_AGE_DAYS = 180
+# Number of keys per SQL statement. Older SQLite versions accept at most 999 variables.
+CHUNK_SIZE = 500
+
+
+class MTCache:
+    """Persistent cache for MT output, keyed by source text, language pair and API parameters.
+
+    Arguments:
+        fp -- path to the SQLite database file. Created if it does not exist
+        max_entries -- maximum number of entries kept on eviction
+        max_age_days -- entries older than this are removed on eviction
+
+    Counts hits and misses of all lookups. One cache can be shared by several threads, e.g. by the batches of a
+    run. Old entries are evicted when the cache is closed. Use as context manager or call close() when done.
+    """
+
+    def __init__(self, fp=MT_CACHE_FILE, max_entries=MAX_ENTRIES, max_age_days=MAX_AGE_DAYS):
+        if os.path.dirname(fp):
+            os.makedirs(os.path.dirname(fp), exist_ok=True)
+        # Calls from several threads are serialized by the lock
+        self.connection = sqlite3.connect(fp, timeout=30, check_same_thread=False)
+        self.lock = threading.Lock()
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('CREATE TABLE IF NOT EXISTS translations ('
+                                'key BLOB PRIMARY KEY, translation TEXT NOT NULL, '
+                                'created REAL NOT NULL, last_used REAL NOT NULL)')
+        self.connection.execute('CREATE INDEX IF NOT EXISTS last_used_index ON translations (last_used)')
+        self.connection.commit()
+        self.max_entries = max_entries
+        self.max_age_days = max_age_days
+        self.hits = 0
+        self.misses = 0
+        self.stored = 0
+
+    def lookup(self, texts, s_lid, t_lid, **options):
+        """Look up translations of texts.
+
+        Arguments:
+            texts -- list of source strings
+            s_lid, t_lid -- source and target language IDs, eg. 'EN', 'DE'
+            options -- API parameters which change the MT output
+
+        Returns:
+            translations -- list with the cached translation of each text, or None for texts not in the cache
+        """
+        keys = [entry_key(text, s_lid, t_lid, options) for text in texts]
+        found = {}
+        with self.lock:
+            for i in range(0, len(keys), CHUNK_SIZE):
+                chunk = keys[i:i + CHUNK_SIZE]
+                placeholders = ','.join('?' * len(chunk))
+                found.update(self.connection.execute(
+                    'SELECT key, translation FROM translations WHERE key IN ({})'.format(placeholders), chunk))
+                # Mark entries as recently used
+                self.connection.execute(
+                    'UPDATE translations SET last_used = ? WHERE key IN ({})'.format(placeholders),
+                    [time.time()] + chunk)
+            self.connection.commit()
+
+            translations = [found.get(key) for key in keys]
+            hits = sum(t is not None for t in translations)
+            self.hits += hits
+            self.misses += len(translations) - hits
+
+        return translations
+
+    def store(self, texts, translations, s_lid, t_lid, **options):
+        """Add translations of texts to the cache.
+
+        Arguments:
+            texts -- list of source strings
+            translations -- list of translated strings in the same order as texts
+            s_lid, t_lid -- source and target language IDs, eg. 'EN', 'DE'
+            options -- API parameters which change the MT output
+        """
+        now = time.time()
+        rows = [(entry_key(text, s_lid, t_lid, options), translation, now, now)
+                for text, translation in zip(texts, translations)]
+        with self.lock:
+            self.connection.executemany('INSERT OR REPLACE INTO translations VALUES (?, ?, ?, ?)', rows)
+            self.connection.commit()
+            self.stored += len(rows)
+
+    def evict(self):
+        """Remove entries older than max_age_days, then least recently used entries beyond max_entries."""
+        with self.lock:
+            self.connection.execute('DELETE FROM translations WHERE created < ?',
+                                    (time.time() - self.max_age_days * 86400,))
+            count = self.connection.execute('SELECT COUNT(*) FROM translations').fetchone()[0]
+            if count > self.max_entries:
+                self.connection.execute('DELETE FROM translations WHERE key IN '
+                                        '(SELECT key FROM translations ORDER BY last_used LIMIT ?)',
+                                        (count - self.max_entries,))
+            self.connection.commit()
+
+    def __len__(self):
+        with self.lock:
+            return self.connection.execute('SELECT COUNT(*) FROM translations').fetchone()[0]
+
+    def close(self):
+        """Evict old entries if translations were added, and close the database."""
+        if self.hits or self.misses:
+            logging.info('MT cache: %d hits, %d misses', self.hits, self.misses)
+        try:
+            if self.stored:
+                self.evict()
+        finally:
+            self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def entry_key(text, s_lid, t_lid, options):
+    """Create cache key from source text, language pair and API parameters."""
+    data = json.dumps([text, s_lid, t_lid, options], sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(data.encode('utf-8')).digest()
@@ -1,16 +1,25 @@
 import re
-from collections import defaultdict, OrderedDict
+from collections import defaultdict
 import itertools
-import logging
-import os.path
 
 import pandas as pd
-import numpy as np
 from bs4 import BeautifulSoup
+from lxml import etree, html
 
-from PyQt5.QtWidgets import QFileDialog
+from source import caching
+from source.alignment import align, segment_keys
+from source.status import label_mt
+from source.utils import cleanup_strings
 
-from source.utils import cleanup_strings, img_alt
+# Version of the parser output. Increase when changes to the parser alter the DataFrame or metadata, so that
+# documents parsed by earlier versions are no longer read from the document cache.
+PARSER_VERSION = '6'
+
+# Namespaced tag names used in SDLXLIFF files
+XLIFF_NS = '{urn:oasis:names:tc:xliff:document:1.2}'
+SDL_NS = '{http://sdl.com/FileTypes/SdlXliff/1.0}'
+# Elements whose subtrees are released once they have been parsed
+RELEASE_TAGS = {XLIFF_NS + 'trans-unit', XLIFF_NS + 'group', XLIFF_NS + 'header', SDL_NS + 'doc-info'}
 
 
 def collect_metadata_xml(fp):
@@ -59,7 +68,7 @@ def collect_metadata_html(soup):
     """Read header of the bilingual table and parses pertinent project information
 
     Arguments:
-        Soup -- BeautifulSoupObject created from Across HTML export
+        Soup -- lxml.html root element created from Across HTML export
 
     Returns:
         cache -- Dictionary for further referencing and translation calls
@@ -67,9 +76,9 @@ def collect_metadata_html(soup):
     # Parse source and target column header
 
     try:
-        tds_m = soup.find_all('div')
+        tds_m = list(itertools.islice(soup.iter('div'), 1))
 
-        meta = tds_m[0].get_text().split("\n")
+        meta = tds_m[0].text_content().split("\n")
         meta = clean_data(meta)
 
         # Parse string data from column headers
@@ -79,7 +88,7 @@ def collect_metadata_html(soup):
         cache = dict()
         cache['Project'] = result[1]
         cache['Relation'] = result[2].split(', ')[1]
-        cache['Document'] = soup.find('div', attrs={'class': 'docTitleDocumentName'}).get_text()
+        cache['Document'] = soup.find_class('docTitleDocumentName')[0].text_content()
 
         p = re.compile(r'(?:^.+?: )(.+?) \(.+?\) (?:nach|to) (.+?) \(.+?\)$')
         result = p.match(meta[5])
@@ -106,15 +115,15 @@ def collect_metadata_html_v6_3(soup):
     """Read header of the bilingual table and parses pertinent project information
 
     Arguments:
-        Soup -- BeautifulSoupObject created from Across HTML export
+        Soup -- lxml.html root element created from Across HTML export
 
     Returns:
         cache -- Dictionary for further referencing and translation calls
     """
     # Parse source and target column header
-    trs = soup.find_all('tr')
-    tds_m = trs[0].find_all('td')
-    meta = tds_m[1].find_all(string=True) + tds_m[3].find_all(string=True)
+    tr = next(soup.iter('tr'))
+    tds_m = list(tr.iter('td'))
+    meta = [str(t) for t in tds_m[1].xpath('.//text()') + tds_m[3].xpath('.//text()')]
 
     meta = clean_data(meta)
 
@@ -130,102 +139,92 @@ def collect_metadata_html_v6_3(soup):
     return cache, s_lid, t_lid
 
 
-def parse_html_versions_v6_3(soup):
-    """Parse first entry from version history as MT output
+def parse_html_table(soup, versions=False):
+    """Read segment IDs, strings and status information from the rows of an Across HTML export in one walk.
 
     Arguments:
-        soup -- BeautifulSoup object generated from input
+        soup -- lxml.html root element created from Across HTML export
+        versions -- Flag to read the first entry from the version history of each target as MT output
+
+    Rows without segment number, e.g. the table header, are kept and later removed in create_dataframe.
 
     Returns:
-         target_mt -- List of strings from version history
+        seg_id_list -- List containing segment ids
+        text -- Dictionary containing lists with source, target and (optional) mt strings
+        status_list -- List containing segment status information
     """
-    target_mt = []
-    for element in soup.find_all('td', attrs={'class': 'inactiveTarget'})[1:]:
-        versions = [box.span.text for box in element.find_all('div', attrs={'class': 'atomHistory-box'})]
+    seg_id_list = list()
+    text = defaultdict(list)
+    status_list = list()
 
-        # Add last version from table data and ignore any other versions
-        if len(versions) > 0:
-            target_mt.append(versions[-1])
-        else:
-            target_mt.append('')
+    for tr in soup.iter('tr'):
+        row = dict()
+        for td in tr.iterchildren('td'):
+            classes = td.get('class', '').split()
+
+            if 'inactiveNumbering' in classes:
+                row['seg_id'] = td.text_content()
+            elif 'inactiveSource' in classes:
+                row['source'] = td.text_content()
+            elif 'inactiveTarget' in classes:
+                row['target'], row['mt'] = parse_html_target(td)
+
+            # The first image with alt text in a table data element holds the status info
+            if 'status' not in row:
+                img = next((child for child in td.iterchildren() if child.get('alt') is not None), None)
+                if img is not None:
+                    row['status'] = img.get('alt')
+
+        if 'seg_id' not in row:
+            continue
+
+        seg_id_list.append(row['seg_id'])
+        text['source'].append(row.get('source', ''))
+        text['target'].append(row.get('target', ''))
+        status_list.append(row.get('status', ''))
+        if versions:
+            text['mt'].append(row.get('mt', ''))
+
+    # Delete additional whitespace
+    seg_id_list = cleanup_strings(seg_id_list)
+    text['source'] = cleanup_strings(text['source'])
+    text['target'] = cleanup_strings(text['target'])
 
-    return target_mt
+    return seg_id_list, text, status_list
 
 
-def parse_html_versions(soup):
-    """Parse first entry from version history as MT output
+def parse_html_target(td):
+    """Read current target string and first entry from version history from a target table data element.
 
     Arguments:
-        soup -- BeautifulSoup object generated from input
+        td -- lxml.html element of the target column
 
     Returns:
-         target_mt -- List of strings from version history
+        target -- String from the first "pre" element outside of the version history
+        mt -- String from the last (i.e. oldest) version history box, empty if there is no history
     """
-    target_mt = []
-
-    try:
-        for element in soup.find_all('td', attrs={'class': 'inactiveTarget'}):
-
-            box = element.find('div', attrs={'class': 'atomHistory-box'})
-
-            if box.span:
-                versions = box.span.text
-
-            # Add last version from table data and ignore any other versions
-            if len(versions) > 0:
-                target_mt.append(versions)
-            else:
-                target_mt.append('')
-
-    except AttributeError:
-        logging.info("Detected v6.3 HTML")
-        target_mt = parse_html_versions_v6_3(soup)
-
-    return target_mt
-
-
-def parse_html_strings(soup):
-    # Create lists of strings for segment id and source
-    text_dict = defaultdict(list)
-
-    seg_id_list = [element.text for element in soup.find_all('td', attrs={'class': 'inactiveNumbering'})]
-    text_dict['source'] = [element.text for element in soup.find_all('td', attrs={'class': 'inactiveSource'})]
-
-    # Create list of strings from previous version elements in target
-    # TODO: Implement to compare target with previous versions
-    # Remove version elements from soup
-    [element.replace_with('') for element in soup.find_all('div', attrs={'class': 'atomHistory-box'})]
-    # Create list of strings for target
-    targets = list()
-    for element in soup.find_all('td', attrs={'class': 'inactiveTarget'}):
-
-        try:
-            targets.append(element.find('pre', attrs={'class': 'atom'}).text)
-        except AttributeError:
-            targets.append('')
-
-    text_dict['target'] = targets
-    # Function call to delete additional whitespace and ignore first row
-    # TODO: Clean up lines with for loop
-    # Account for the fact that v7.0 segments start in the first table row
-    if seg_id_list[1] != "\xa0":
-        seg_id_list = cleanup_strings(seg_id_list)
-        text_dict['source'] = cleanup_strings(text_dict['source'])
-        text_dict['target'] = cleanup_strings(text_dict['target'])
+    target = None
+    mt = ''
+    for element in td.iter('pre', 'div'):
+        if element.tag == 'div':
+            if 'atomHistory-box' in element.get('class', '').split():
+                span = next(element.iter('span'), None)
+                mt = span.text_content() if span is not None else ''
 
-    else:
-        seg_id_list = cleanup_strings(seg_id_list[1:])
-        text_dict['source'] = cleanup_strings(text_dict['source'][1:])
-        text_dict['target'] = cleanup_strings(text_dict['target'][1:])
+        elif target is None and 'atom' in element.get('class', '').split() \
+                and not any('atomHistory-box' in a.get('class', '').split() for a in element.iterancestors('div')):
+            target = element.text_content()
 
-    return seg_id_list, text_dict
+    return target or '', mt
 
 
-def parse_xml_strings(soup, versions=False):
+def parse_xml_strings(soup, versions=False, units=None):
     """Read segment strings and segments status information.
 
     Arguments:
         soup -- BeautifulSoup object generated from input
+        versions -- Flag to read the segment origin instead of the confirmation status
+        units -- Optional list to which the (file, trans-unit id) of each segment is appended, see source.alignment
 
     Returns:
         seg_id_list -- List containing segment ids
@@ -235,18 +234,18 @@ def parse_xml_strings(soup, versions=False):
     seg_id_list = list()
     text = defaultdict(list)
     status_list = list()
-    # Find mrk elements with mtype attribute value "seg"
-    mrk = soup.find_all('mrk', attrs={'mtype': 'seg'})
-    for i in mrk:
-        for parent in i.parents:
-            if parent.name == 'target':
-                text['target'].append(''.join(i.strings))
-            if parent.name == 'seg-source':
-                text['source'].append(''.join(i.strings))
+    # Find mrk elements with mtype attribute value "seg" inside the segmented source and target elements
+    for container in soup.find_all(['seg-source', 'target']):
+        stype = 'source' if container.name == 'seg-source' else 'target'
+        text[stype] += [''.join(i.strings) for i in container.find_all('mrk', attrs={'mtype': 'seg'})]
 
     segs = soup.find_all('sdl:seg')
     for seg in segs:
         seg_id_list.append(seg.attrs['id'])
+        if units is not None:
+            file, unit = seg.find_parent('file'), seg.find_parent('trans-unit')
+            units.append((file.attrs.get('original', '') if file is not None else '',
+                          unit.attrs.get('id', '') if unit is not None else ''))
 
         if versions:
             status_list.append(seg.attrs.get('origin', 'Unknown'))
@@ -256,130 +255,192 @@ def parse_xml_strings(soup, versions=False):
     return seg_id_list, text, status_list
 
 
-def collect_string_data(soup, filetype, mt_soup=None):
+def parse_xml_stream(fp, versions=False, cache=None, units=None):
+    """Read segment strings and segments status information from an SDLXLIFF file incrementally.
+
+    Arguments:
+        fp -- path to SDLXLIFF file
+        versions -- Flag to read the segment origin instead of the confirmation status
+        cache -- Optional dictionary to which the language IDs of the first "file" element are added
+        units -- Optional list to which the (file, trans-unit id) of each segment is appended, see source.alignment
+
+    Walks the XML elements as they are read from disk. Each trans-unit is released once it has been handled,
+    so that memory use does not grow with the size of the document tree.
+
+    Returns:
+        Same as parse_xml_strings()
+    """
+    seg_id_list = list()
+    text = defaultdict(list)
+    status_list = list()
+    # Name of the text list that mrk elements are added to, depending on the enclosing element
+    container = None
+    # Original file name and trans-unit id of the segments being read
+    file = unit = ''
+
+    for event, elem in etree.iterparse(fp, events=('start', 'end'), remove_comments=True, huge_tree=True):
+        tag = elem.tag
+
+        if event == 'start':
+            if tag == XLIFF_NS + 'seg-source':
+                container = 'source'
+            elif tag == XLIFF_NS + 'target':
+                container = 'target'
+            elif tag == XLIFF_NS + 'trans-unit':
+                unit = elem.get('id', '')
+            elif tag == XLIFF_NS + 'file':
+                file = elem.get('original', '')
+                if cache is not None and 's_lid' not in cache:
+                    cache['s_lid'] = str(elem.get('source-language').split('-')[0]).upper()
+                    cache['t_lid'] = str(elem.get('target-language').split('-')[0]).upper()
+            continue
+
+        if tag == XLIFF_NS + 'mrk':
+            if container and elem.get('mtype') == 'seg':
+                text[container].append(''.join(elem.itertext()))
+
+        elif tag == XLIFF_NS + 'seg-source' or tag == XLIFF_NS + 'target':
+            container = None
+
+        elif tag == SDL_NS + 'seg':
+            seg_id_list.append(elem.get('id'))
+            if units is not None:
+                units.append((file, unit))
+
+            if versions:
+                status_list.append(elem.get('origin', 'Unknown'))
+            else:
+                status_list.append(elem.get('conf', 'Unbearbeitet'))
+
+        elif tag in RELEASE_TAGS:
+            release_element(elem)
+
+    return seg_id_list, text, status_list
+
+
+def release_element(elem):
+    """Free the subtree of a parsed element and the references to its already parsed siblings."""
+    elem.clear()
+    parent = elem.getparent()
+    if parent is not None:
+        while elem.getprevious() is not None:
+            del parent[0]
+
+
+def collect_string_data(soup, filetype, mt_soup=None, cache=None):
     """Read segment ID, source and target strings.
 
     Arguments:
-        soup -- BeautifulSoupObject created from Across HTML export
+        soup -- lxml.html root element created from Across HTML export, or BeautifulSoupObject created from
+                SDLXLIFF. For SDLXLIFF files, this can also be the file path, in which case the file is parsed
+                incrementally.
         filetype -- String specifying supported file type. Takes either 'HTML' or "XML"
-        mt_soup -- Optional soup object identical with the original soup for parsing an MT file
+        mt_soup -- Optional soup object for parsing an MT file (or its path). For HTML, this is identical with the
+                   original soup and the MT strings are read from the version history in the same walk.
+        cache -- Optional dictionary to which language IDs are added while parsing an SDLXLIFF file path
 
     Returns:
-        df -- Cleaned DataFrame object containing Segment IDs as index, and strings, status infos and segment type info
-              as columns.
+        df -- Segment table with one row per segment, see create_dataframe
     """
-    seg_id = defaultdict(list)
-    status = defaultdict(list)
+    mt = None
+    # HTML exports have neither files nor trans-units
+    units = None
 
     if filetype == 'HTML':
-        seg_id['source'], text = parse_html_strings(soup)
-        # function call to extract status data from third column
-        status['source'] = collect_status_data(soup)
+        # Read segment IDs, strings, status data from third column and (optional) MT version strings in one walk
+        seg_id, text, status = parse_html_table(soup, versions=mt_soup is not None)
 
-        if mt_soup:
-
-            # Change status information for lookup purposes and write as new list to dict
-            status['mt'] = ['mt' if x == 'Bearbeitet (Maschinell übersetzt)'
-                            or x == 'Bearbeitet (Maschinell übersetzt und manuell bearbeitet)'
-                            or x == 'Korrigiert (Maschinell übersetzt)'
-                            or x == 'Korrigiert (Maschinell übersetzt und manuell bearbeitet)'
-                            or x == 'Übersetzt (Maschinell übersetzt)'
-                            or x == 'Übersetzt (Maschinell übersetzt und manuell bearbeitet)'
-                            else x for x in status['source']]
-
-            seg_id['mt'] = seg_id['source']
-            # Add MT version strings to text dictionary
-            text['mt'] = parse_html_versions(mt_soup)
+        if mt_soup is not None:
+            # Change status information for lookup purposes
+            mt = text.pop('mt'), label_mt(status, 'HTML')
 
     elif filetype == 'XML':
         # Parse segment information in file and add to dictionaries.
-        seg_id['source'], text, status['source'] = parse_xml_strings(soup)
+        units = []
+        if isinstance(soup, BeautifulSoup):
+            seg_id, text, status = parse_xml_strings(soup, units=units)
+        else:
+            seg_id, text, status = parse_xml_stream(soup, cache=cache, units=units)
 
-        if mt_soup:
+        if mt_soup is not None:
             # Now parse information in MT file.
             # We add the "versions" flag, because this operations is identical to parsing the original file.
             # The only difference is that we are only interested in the segments with origin "mt".
-            seg_id['mt'], mt_text, mt_origin_list = parse_xml_strings(mt_soup, versions=True)
-            status['mt'] = mt_origin_list
-            text['mt'] = mt_text['target']
+            parse = parse_xml_strings if isinstance(mt_soup, BeautifulSoup) else parse_xml_stream
+            mt_units = []
+            mt_seg_id, mt_text, mt_origin_list = parse(mt_soup, versions=True, units=mt_units)
 
-    # Create target keys and populate with source values.
-    status['target'] = status['source']
-    seg_id['target'] = seg_id['source']
-    #  TODO: Add keys in the same order or create DataFrame from keys and not from iterable
-    seg_id = OrderedDict(sorted(seg_id.items(), key=lambda t: t[0]))
-    text = OrderedDict(sorted(text.items(), key=lambda t: t[0]))
-    status = OrderedDict(sorted(status.items(), key=lambda t: t[0]))
+            # Match MT segments to the document by file, trans-unit and segment ID, then by source string
+            positions, report = align(segment_keys(seg_id, units), text['source'],
+                                      segment_keys(mt_seg_id, mt_units), mt_text['source'])
+            if cache is not None:
+                cache['alignment'] = report
+            mt_origin_list = label_mt(mt_origin_list, 'XML')
+            mt_target = mt_text['target']
+            mt = ([mt_target[j] if 0 <= j < len(mt_target) else '' for j in positions],
+                  [mt_origin_list[j] if j >= 0 else None for j in positions])
 
-    return create_dataframe(seg_id, text, status)
+    return create_dataframe(seg_id, text, status, mt=mt, units=units)
 
 
-def create_dataframe(seg_id, text, status):
+def create_dataframe(seg_id, text, status, mt=None, units=None):
     """
-    Create DataFrame object from dictionary with parsed strings.
+    Create segment table from parsed strings.
 
     Arguments:
-        seg_id -- Dictionary mapping segment IDs to segment types (source, target, MT [optional])
-        text -- Dictionary mapping text strings to segment types (source, target, MT [optional])
-        status -- Dictionary mapping status info to segment types (source, target, MT [optional])
+        seg_id -- List of segment IDs
+        text -- Dictionary with lists of source and target strings in the order of seg_id
+        status -- List of status strings in the order of seg_id
+        mt -- Optional tuple of MT strings and MT status strings in the order of seg_id. Segments without MT
+              have an empty string and None as status.
+        units -- Optional list of (file, trans-unit id) tuples in the order of seg_id (SDLXLIFF only)
+
+    Segment IDs restart in every "file" element of an SDLXLIFF file, so they do not identify a row on their own.
+    Rows are numbered in document order instead, and 'file', 'unit' and 'seg_id' are kept as columns.
 
     Returns:
-        df -- Cleaned DataFrame object containing Segment IDs as index, and strings, status infos and segment type info
-              as columns.
+        df -- DataFrame with one row per segment and a RangeIndex. Columns 'file' (categorical, empty for HTML),
+              'unit' (trans-unit id, empty for HTML) and 'seg_id' (integer) identify the segment, 'source' and
+              'target' (and 'mt' if given) hold strings, 'status' (and 'mt_status') are categorical. Segments
+              without MT have an empty 'mt' string.
     """
-
-    # Convert dictionary values to Series'
-    seg_id_se = pd.Series(itertools.chain.from_iterable(seg_id.values()), name='seg_id')
-    text_se = pd.Series(itertools.chain.from_iterable(text.values()), name='text')
-    status_se = pd.Series(itertools.chain.from_iterable(status.values()), name='status')
-
-    # Populate segment type Series from status keys
-    stype = (np.repeat(k, len(v)) for k, v in status.items())
-    stype_se = pd.Series(itertools.chain.from_iterable(stype), name='stype')
-
-    # Merge Series to DataFrame
-    df = pd.concat([text_se, stype_se, status_se], axis=1)
-    df.index = seg_id_se
-
-    # Filter for index items that contain only digits.
-    # This is to ignore split segment which use alphanumerics as IDs. (Studio XML only)
-    split_filter = df.index.str.isdigit()
-    df = df[split_filter]
+    string = string_dtype()
+    if units is None:
+        units = [('', '')] * len(seg_id)
+    file, unit = zip(*units) if units else ((), ())
+    columns = [pd.Series(file, name='file', dtype='category'),
+               pd.Series(unit, name='unit', dtype=string),
+               pd.Series(seg_id, name='seg_id', dtype=object),
+               pd.Series(text['source'], name='source', dtype=string),
+               pd.Series(text['target'], name='target', dtype=string),
+               pd.Series(status, name='status', dtype='category')]
+    if mt is not None:
+        columns += [pd.Series(mt[0], name='mt', dtype=string), pd.Series(mt[1], name='mt_status', dtype='category')]
+    df = pd.concat(columns, axis=1)
+    df = _drop_split_segments(df)
+
+    text_columns = [c for c in ['unit', 'source', 'target', 'mt'] if c in df]
+    df[text_columns] = df[text_columns].fillna('')
 
     return df
 
 
-def collect_status_data(soup):
-    """Select status attribute in each row and write to list
-    Arguments
-        trs -- Rows in data table
-
-    Loops through the table data elements in each row. Calls img_alt function
-    to find first img alt item in each element, which will include status info.
-    Uses regex pattern to extract segment status string.
+def _drop_split_segments(df):
+    """Keep rows with integer segment ID and number them from 0.
 
-    TODO: Implement list comprehension to write img_alt item.
-
-    Returns:
-        status_list -- List object containing status info
+    Rows whose ID is not only digits are dropped. This is to ignore split segments which use alphanumerics as IDs
+    (Studio XML only) and rows without segment number (HTML).
     """
+    split_filter = df['seg_id'].str.isdigit().fillna(False).astype(bool)
+    df = df[split_filter].reset_index(drop=True)
+    df['seg_id'] = df['seg_id'].astype('int64')
 
-    trs = soup.find_all('tr')
-    status_list = []
-    regex = re.compile('((?<= alt=)[^"]+?\b|(?<= alt=").+?(?=" ))')
-
-    for i in range(len(trs)):
-        tds = trs[i].find_all('td')
-
-        for j in range(len(tds)):
-            _ = tds[j].find(img_alt)
+    return df
 
-            if _:
-                status_string = str(_)
-                status = regex.search(status_string)
-                status_list.append(status.group())
 
-    return status_list
+def string_dtype():
+    """Return Arrow-backed string dtype if pyarrow is installed, else Python objects."""
+    return 'string[pyarrow]' if caching.available() else object
 
 
 def read_filetype(file):
@@ -394,7 +455,7 @@ def read_filetype(file):
         return None
 
 
-def read_from_file(fp, encoding='utf-8', raw_mt=False):
+def read_from_file(fp, encoding='utf-8', raw_mt=False, use_cache=True, select_mt_file=None):
     """Read file with translation unit data.
 
     Arguments:
@@ -403,50 +464,68 @@ def read_from_file(fp, encoding='utf-8', raw_mt=False):
         encoding -- defaults to utf-8
         raw_mt -- Flag to control the source of the MT output. Either a Boolean or a valid file path
                     If True, MT strings will be parsed from the version history (HTML) or a separate file (XML).
+        use_cache -- Flag to look up and store the parsed document in the document cache (see source.caching)
+        select_mt_file -- Callback returning the path of the raw MT file for SDLXLIFF input if raw_mt is True,
+                          e.g. a file dialog. It is called with fp as only argument.
     TODO: Check for other encodings,
           idea: Lookup charset from HTML Header / XML declaration and return in cache
     Returns:
-        df -- DataFrame object with parsed text, segment type and status information which uses seg_id as index
+        df -- DataFrame with one row per segment, see create_dataframe
         cache -- Dictionary with metadata pertaining to the project
     """
-    print(f'Here {fp}')
     with open(fp, 'r', encoding="utf-8") as f:
         filetype = read_filetype(f)
-        soup = BeautifulSoup(f, 'lxml')
+
+    if filetype is None:
+        return None
+
+    # Prompt for path to SDLXLIFF containing MT output
+    mt_fp = None
+    if raw_mt and filetype == 'XML':
+        # Updata file path with file path to raw MT file
+        if raw_mt is True:
+            if select_mt_file is None:
+                raise ValueError('Path to raw MT file is required for SDLXLIFF input')
+            mt_fp = select_mt_file(fp)
+        else:
+            mt_fp = raw_mt
+
+    # Skip parsing if the same content has been parsed before
+    key = None
+    if use_cache and caching.available():
+        paths = [fp, mt_fp] if mt_fp else [fp]
+        key = caching.document_key(paths, PARSER_VERSION, encoding=encoding, raw_mt=bool(raw_mt))
+        cached = caching.load_document(key)
+        if cached:
+            df, cache = cached
+            # Project data depends on the file path, not on the content
+            if filetype == 'XML':
+                cache.update(collect_metadata_xml(fp))
+            return df, cache
+
     # Collect metadata from HTML table's head column
     if filetype == 'HTML':
+        soup = html.parse(fp, parser=html.HTMLParser(encoding=encoding)).getroot()
         # function call to extract metadata from first row of table
         cache = collect_metadata_html(soup)
     # Collect metadata from file path and SDLXLIFF "file" element
-    elif filetype == 'XML':
-        # Collect project data from file path
-        cache = collect_metadata_xml(fp)
-        # Collect language IDs from SDLXLIFF "file" element
-        # TODO: Move this bit to collect_metadata_xml method without making new soup
-        with open(fp, 'r', encoding=encoding) as f:
-            soup = BeautifulSoup(f, 'lxml')
-            cache['s_lid'] = str(soup.file['source-language'].split('-')[0]).upper()
-            cache['t_lid'] = str(soup.file['target-language'].split('-')[0]).upper()
     else:
-        return None
+        # Collect project data from file path.
+        # Language IDs are collected from the SDLXLIFF "file" element while parsing the segments.
+        cache = collect_metadata_xml(fp)
+        # SDLXLIFF files are parsed incrementally from disk
+        soup = fp
 
     # function call to extract string data from source and target columns
     if raw_mt:
-        # Prompt for path to SDLXLIFF containing MT output
-        if filetype == 'XML':
-            # Updata file path with file path to raw MT file
-            if bool(raw_mt):
-                fp = QFileDialog.getOpenFileName(caption="Select file with MT segments",
-                                                 filter='SDLXLIFF-Datei ({})'.format(os.path.basename(fp)))[0]
-            else:
-                fp = raw_mt
-        # Make new soup
-
-        with open(fp, 'r', encoding=encoding) as f:
-            mt_soup = BeautifulSoup(f, 'lxml')
-        df = collect_string_data(soup, filetype, mt_soup=mt_soup)
+        # MT strings are read from a separate file (XML) or the version history of the same document (HTML)
+        mt_soup = mt_fp if filetype == 'XML' else soup
+        df = collect_string_data(soup, filetype, mt_soup=mt_soup, cache=cache)
 
     else:
-        df = collect_string_data(soup, filetype)
+        df = collect_string_data(soup, filetype, cache=cache)
+
+    if key:
+        caching.store_document(key, df, cache)
 
     return df, cache
@@ -1,18 +1,34 @@
+import random
 import re
 
+import numpy as np
+import pandas as pd
+
+from source.status import status_mask
+
 # Set maximum number of iterations to create a sample object
 MAX_SAMPLING = 7
+# Number of segment length classes for stratified sampling. Classes hold about the same number of segments.
+LENGTH_STRATA = 4
+# Minimum number of segments sampled per stratum, so that the variance within each stratum can be estimated
+MIN_PER_STRATUM = 2
+# Translatable characters, i.e. word characters except for digits
+LETTERS = re.compile(r'[^\W\d]')
 
 
-def new_sample(df, sample_size):
+def new_sample(df, sample_size, method='alpha'):
     """Create sample object.
     Arguments:
-        df -- Source object DataFrame with columns 'seg_id', 'text', 'stype', 'status'
+        df -- Segment table from source.parsing.create_dataframe
         sample_size -- int() specifying the number of segments in a sample
+        method -- name of the sampler in SAMPLERS. 'alpha' keeps the sample with the most letters,
+                  'stratified' draws by segment length and status and allows for confidence intervals.
     """
+    if method not in SAMPLERS:
+        raise ValueError('Unknown sampling method {!r}. Choose from {}'.format(method, ', '.join(SAMPLERS)))
     filtered_items = prepare_sample_object(df)
 
-    return optimize_sample_object(filtered_items, sample_size)
+    return SAMPLERS[method](filtered_items, sample_size)
 
 
 def prepare_sample_object(df):
@@ -20,87 +36,184 @@ def prepare_sample_object(df):
     Filter project data for valid segments
 
     Arguments:
-    df -- Source object DataFrame with columns 'seg_id', 'text', 'stype', 'status'
-    sample_size -- integer used to define maximum of items in sample object
+    df -- Segment table from source.parsing.create_dataframe
 
     Returns:
     filtered_items -- DataFrame object for filtering out rows with
-                      a) non-source,
-                      b) non-translated
-                      c) repeated segments
+                      a) non-translated
+                      b) repeated segments
+                      Columns 'length' and 'letters' hold the number of characters and translatable characters.
     """
 
-    # Use query logic to filter for valid source segments
-    # Checks for segment type first. Then checks for different valid status
-    my_filter = df.query(
-        'stype == "source" & (status == "ApprovedTranslation" | \
-        status == "ApprovedSignOff" | \
-        status == "Translated" | \
-        status == "Korrigiert" | \
-        status == "Korrigiert (Maschinell übersetzt)" | \
-        status == "Korrigiert (Die Aufgabe ist Ihnen nicht zugewiesen.)" | \
-        status == "Übersetzt" | \
-        status == "Übersetzt (Aus zweisprachigem Dokument eingefügt)" | \
-        status == "Übersetzt (Die Aufgabe ist Ihnen nicht zugewiesen.)" | \
-        status == "Bearbeitet (Aus zweisprachigem Dokument eingefügt)")')
+    # Check for valid status, see source.status.STATUS_VOCABULARY
+    my_filter = df[status_mask(df['status'], 'translated')]
 
     # Eliminate repetitions
-    filtered_items = my_filter.drop_duplicates('text')
+    filtered_items = my_filter.drop_duplicates('source')
     # Adapt sample size, use the lesser of all the sample segments available
     # or a multiple of the sample_size
     if filtered_items.shape[0] != 0:
-        return filtered_items
+        # Count letters once per segment, so that candidate samples are compared by summing counts
+        text = filtered_items['source'].tolist()
+        return filtered_items.assign(length=[len(t) for t in text],
+                                     letters=[len(LETTERS.findall(t)) for t in text])
 
     else:
         print('Not enough items for sampling!')
         raise Exception
 
 
-def optimize_sample_object(filtered_items, sample_size):
+def optimize_sample_object(filtered_items, sample_size, iterations=MAX_SAMPLING, seed=None):
     """
     Sample source strings multiple times to reduce proportion of non-translatables
 
     Arguments:
-        filtered_items -- DataFrame object for filtering out rows with
-                          a) non-source,
-                          b) non-translated
-                          c) repeated segments
+        filtered_items -- DataFrame returned by prepare_sample_object, with 'length' and 'letters' columns
         sample_size -- int() specifying the number of segments in a sample
+        iterations -- number of candidate samples to choose from
+        seed -- Optional seed for the random generator
 
     With this function we avoid sampling non-translatable text which would skew the final result.
 
     Returns:
-        sample_object -- DataFrame object containing seg_id, text, stype and status information
+        sample_object -- DataFrame object with the sampled rows of filtered_items
         max_alpha -- no. letters in proportion to the full string
     """
-    # Create object for storing sample objects, source texts and ratios
-    sample_objects_dict = {}
-    alpha_share = []
     sample_size = min(filtered_items.shape[0], sample_size)
-    # Set count and specify no. of iterations
-    count = 0
-    while count < MAX_SAMPLING:
+    rng = np.random.default_rng(seed)
+    # One row of positions in filtered_items per candidate sample
+    candidates = np.stack([rng.choice(filtered_items.shape[0], sample_size, replace=False)
+                           for _ in range(iterations)])
 
-        # Create dataframe sample from valid segments
-        sample_object = filtered_items.sample(sample_size)
-        # Store sample in dict for later reuse
-        sample_objects_dict[count] = sample_object
+    length = filtered_items['length'].to_numpy()[candidates].sum(axis=1)
+    alpha = filtered_items['letters'].to_numpy()[candidates].sum(axis=1)
+    alpha_share = np.divide(alpha, length, out=np.zeros(iterations), where=length > 0)
 
-        length = 0
-        alpha = 0
-        # Find translatable characters in sample object
-        for i in range(len(sample_object)):
-            length += len(sample_object['text'][i])
-            alpha += len(re.findall('[^\W\d]', sample_object['text'][i]))
+    # Pick sample with maximum number of translatable characters
+    best = int(alpha_share.argmax())
+    sample_object = filtered_items.iloc[candidates[best]]
 
-        alpha_share.append(alpha / length)
-        count += 1
+    return sample_object, float(alpha_share[best])
 
-    max_alpha = max(alpha_share)
-    # Pick sample with maximum number of translatable characters from dict
-    sample_object = sample_objects_dict[alpha_share.index(max_alpha)]
 
-    return sample_object, max_alpha
+def assign_strata(filtered_items, length_strata=LENGTH_STRATA):
+    """Assign each segment to a stratum by its status and length class.
+
+    Arguments:
+        filtered_items -- DataFrame returned by prepare_sample_object
+        length_strata -- number of length classes. Classes are quantiles of the segment lengths.
+
+    Returns:
+        strata -- Series of stratum labels such as 'Translated / 2', on the index of filtered_items
+    """
+    lengths = filtered_items['source'].str.len()
+    # Rank first, so that quantile edges do not collapse on frequent lengths
+    classes = pd.qcut(lengths.rank(method='first'), min(length_strata, len(lengths)), labels=False)
+
+    return filtered_items['status'].astype(str) + ' / ' + classes.astype(str)
+
+
+def fit_strata(filtered_items, sample_size, length_strata=LENGTH_STRATA, min_per_stratum=MIN_PER_STRATUM):
+    """Assign strata which can all receive min_per_stratum segments within the sample size.
+
+    Arguments:
+        filtered_items -- DataFrame returned by prepare_sample_object
+        sample_size -- total number of segments to sample
+        length_strata -- maximum number of length classes
+        min_per_stratum -- number of segments each stratum needs for estimating its variance
+
+    Small samples cannot cover many strata. Neighbouring length classes are merged until the minimums fit into the
+    sample size. If they do not fit with a single length class, all segments form one stratum.
+
+    Returns:
+        strata -- Series of stratum labels on the index of filtered_items, see assign_strata
+    """
+    for classes in range(length_strata, 0, -1):
+        strata = assign_strata(filtered_items, classes)
+        if minimum_size(strata.value_counts().to_dict(), min_per_stratum) <= sample_size:
+            return strata
+
+    return pd.Series('all', index=filtered_items.index)
+
+
+def minimum_size(population, min_per_stratum=MIN_PER_STRATUM):
+    """Return the number of segments needed to sample each stratum min_per_stratum times, or in full if smaller."""
+    return sum(min(min_per_stratum, n) for n in population.values())
+
+
+def allocate(population, sample_size, min_per_stratum=MIN_PER_STRATUM):
+    """Split sample size over strata in proportion to their size.
+
+    Arguments:
+        population -- dict mapping stratum labels to the number of segments in the stratum
+        sample_size -- total number of segments to sample
+        min_per_stratum -- number of segments each stratum receives first. Strata with fewer segments are sampled
+                           in full.
+
+    Raises ValueError if the sample size does not allow for the minimum in every stratum. Use fit_strata to merge
+    strata for small samples.
+
+    Returns:
+        allocation -- dict mapping stratum labels to the number of segments to sample
+    """
+    sample_size = min(sample_size, sum(population.values()))
+    allocation = {h: min(min_per_stratum, n) for h, n in population.items()}
+    if sum(allocation.values()) > sample_size:
+        raise ValueError('Sample size {} is too small for {} segments in each of {} strata'.format(
+            sample_size, min_per_stratum, len(population)))
+
+    # Largest remainder method on the segments left in each stratum
+    rest = sample_size - sum(allocation.values())
+    capacity = {h: population[h] - allocation[h] for h in population}
+    total = sum(capacity.values())
+    if rest and total:
+        quotas = {h: rest * c / total for h, c in capacity.items()}
+        for h in quotas:
+            allocation[h] += int(quotas[h])
+        remainders = sorted(quotas, key=lambda h: quotas[h] - int(quotas[h]), reverse=True)
+        for h in remainders[:sample_size - sum(allocation.values())]:
+            allocation[h] += 1
+
+    return allocation
+
+
+def stratified_sample(filtered_items, sample_size, seed=None):
+    """Draw a random sample within strata of segment length and status.
+
+    Arguments:
+        filtered_items -- DataFrame returned by prepare_sample_object
+        sample_size -- int() specifying the number of segments in a sample
+        seed -- Optional seed for the random generator
+
+    Unlike optimize_sample_object, segments are not selected by their content. Each segment carries the weight of
+    the segments it stands for, so that source.calculation.ratio_interval can estimate the document score and its
+    confidence interval.
+
+    Returns:
+        sample_object -- DataFrame object with the columns of filtered_items plus 'stratum' and 'weight'
+        alpha_share -- no. letters in proportion to the full string
+    """
+    strata = fit_strata(filtered_items, sample_size)
+    members = strata.groupby(strata).groups
+    allocation = allocate({h: len(idx) for h, idx in members.items()}, sample_size)
+
+    rng = random.Random(seed)
+    selected = []
+    for h, idx in members.items():
+        selected.extend(rng.sample(list(idx), allocation[h]))
+
+    sample_object = filtered_items.loc[selected].copy()
+    sample_object['stratum'] = strata.loc[selected]
+    sample_object['weight'] = [len(members[h]) / allocation[h] for h in sample_object['stratum']]
+
+    length = sample_object['length'].sum()
+    alpha_share = float(sample_object['letters'].sum() / length) if length else 0.0
+
+    return sample_object, alpha_share
+
+
+# Sampling methods for new_sample
+SAMPLERS = {'alpha': optimize_sample_object, 'stratified': stratified_sample}
 
 
 def append_sample_translations(df, sample_object, translations):
@@ -108,19 +221,37 @@ def append_sample_translations(df, sample_object, translations):
     Update source object with translations
 
     Arguments:
-        df -- Source object DataFrame with columns 'seg_id', 'text', 'stype', 'status'
-        sample_object -- DataFrame view of source object with the following filters:
-                         stype == "source"
-                         status == "Übersetzt"
-        translations -- list with translated string
+        df -- Segment table from source.parsing.create_dataframe
+        sample_object -- DataFrame with the sampled rows of df
+        translations -- list with translated string in the order of sample_object
+
+    The 'mt' column is replaced in place, so that the other columns of df are not copied. Earlier MT strings, e.g.
+    of a previous sample, are dropped. sample_object is not changed.
+
+    Rows are matched by index label, which is unique in the segment table (see source.parsing.create_dataframe).
 
     Returns:
-        df -- Source object with translated strings being added at the end and marked as 'MT'
+        df -- Segment table with translations in the 'mt' column. Segments outside the sample have empty strings.
     """
+    if len(translations) != sample_object.shape[0]:
+        raise ValueError('Expected {} translations, got {}'.format(sample_object.shape[0], len(translations)))
+    positions = df.index.get_indexer(sample_object.index)
+    if (positions < 0).any():
+        raise ValueError('Sample holds {} rows which are not in the segment table'.format(int((positions < 0).sum())))
 
-    for i in range(sample_object.shape[0]):
-        sample_object['text'].values[i] = translations[i]
-        sample_object['stype'].values[i] = 'mt'
-    df = df.append(sample_object, ignore_index=False)
+    # Row i of the MT column takes translation take[i]. Rows outside the sample take the empty string at the end.
+    take = np.full(df.shape[0], len(translations))
+    take[positions] = np.arange(len(translations))
+    values = list(translations) + ['']
+
+    dtype = df['source'].dtype
+    if getattr(dtype, 'storage', None) == 'pyarrow':
+        import pyarrow as pa
+
+        # Arrow copies the string data of the sample only; the other rows are empty offsets
+        mt = pa.array(values, type=pa.large_string()).take(pa.array(take))
+    else:
+        mt = np.array(values, dtype=object)[take]
+    df['mt'] = pd.array(mt, dtype=dtype)
 
     return df
@@ -0,0 +1,106 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+# Segment status strings per file format, grouped by status class. 'translated' segments are eligible for
+# sampling; 'mt' marks segments whose target was machine translated.
+# HTML holds the status alt texts of Across exports, XML the SDLXLIFF 'conf' values and, for 'mt', 'origin' values.
+STATUS_VOCABULARY = {
+    'HTML': {
+        'translated': ['Korrigiert',
+                       'Korrigiert (Maschinell übersetzt)',
+                       'Korrigiert (Die Aufgabe ist Ihnen nicht zugewiesen.)',
+                       'Übersetzt',
+                       'Übersetzt (Aus zweisprachigem Dokument eingefügt)',
+                       'Übersetzt (Die Aufgabe ist Ihnen nicht zugewiesen.)',
+                       'Bearbeitet (Aus zweisprachigem Dokument eingefügt)'],
+        'mt': ['Bearbeitet (Maschinell übersetzt)',
+               'Bearbeitet (Maschinell übersetzt und manuell bearbeitet)',
+               'Korrigiert (Maschinell übersetzt)',
+               'Korrigiert (Maschinell übersetzt und manuell bearbeitet)',
+               'Übersetzt (Maschinell übersetzt)',
+               'Übersetzt (Maschinell übersetzt und manuell bearbeitet)'],
+    },
+    'XML': {
+        'translated': ['ApprovedTranslation', 'ApprovedSignOff', 'Translated'],
+        'mt': ['mt', 'nmt', 'amt'],
+    },
+}
+# Optional JSON file with additional status strings in the layout of STATUS_VOCABULARY, e.g. for Across exports in
+# other UI languages: {"HTML": {"translated": ["Translated", "Corrected"]}}
+STATUS_FILE = os.path.join('data', 'status_vocabulary.json')
+
+_loaded = False
+
+
+def load_vocabulary(fp=STATUS_FILE):
+    """Add status strings from a JSON file to STATUS_VOCABULARY. Missing files are ignored."""
+    if not os.path.isfile(fp):
+        return
+    with open(fp, 'r', encoding='utf-8') as f:
+        for filetype, classes in json.load(f).items():
+            for status_class, statuses in classes.items():
+                known = STATUS_VOCABULARY.setdefault(filetype, {}).setdefault(status_class, [])
+                known.extend(s for s in statuses if s not in known)
+
+
+def statuses(status_class, filetype=None):
+    """Return set of status strings in a status class.
+
+    Arguments:
+        status_class -- key of the status class, e.g. 'translated' or 'mt'
+        filetype -- 'HTML' or 'XML'. Defaults to the statuses of all file types.
+
+    Returns:
+        statuses -- set of status strings
+    """
+    global _loaded
+    if not _loaded:
+        load_vocabulary()
+        _loaded = True
+
+    if filetype is not None and filetype not in STATUS_VOCABULARY:
+        raise ValueError('Unknown file type {!r}. Choose from {}'.format(filetype, ', '.join(STATUS_VOCABULARY)))
+    filetypes = [filetype] if filetype else list(STATUS_VOCABULARY)
+
+    return {s for f in filetypes for s in STATUS_VOCABULARY[f].get(status_class, [])}
+
+
+def label_mt(status_list, filetype):
+    """Replace status strings of machine translated segments with 'mt'.
+
+    Arguments:
+        status_list -- list of status strings
+        filetype -- 'HTML' or 'XML'
+
+    Returns:
+        status_list -- new list with 'mt' for machine translated segments and unchanged strings otherwise
+    """
+    mt = statuses('mt', filetype)
+    # Look up each distinct status once
+    labels = {s: 'mt' if s in mt else s for s in set(status_list)}
+
+    return [labels[s] for s in status_list]
+
+
+def status_mask(status, status_class, filetype=None):
+    """Select rows whose status belongs to a status class.
+
+    Arguments:
+        status -- Series of status strings, usually categorical as created by source.parsing.create_dataframe
+        status_class -- key of the status class, e.g. 'translated'
+        filetype -- 'HTML' or 'XML'. Defaults to the statuses of all file types.
+
+    Returns:
+        mask -- boolean Series on the index of status
+    """
+    vocabulary = statuses(status_class, filetype)
+    if not isinstance(status.dtype, pd.CategoricalDtype):
+        return status.isin(vocabulary)
+
+    # Classify each category once and index the result with the category codes. Missing values have code -1,
+    # which picks the appended False.
+    flags = np.append(status.cat.categories.isin(vocabulary), False)
+    return pd.Series(flags[status.cat.codes.to_numpy()], index=status.index, name=status.name)
@@ -0,0 +1,227 @@
+import math
+import random
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import nullcontext
+
+import numpy as np
+
+from source.calculation import BA_LIMIT, CONFIDENCE, PP_LIMIT, ratio_interval, score_pairs
+from source.mt_cache import MTCache
+from source.sampling import MIN_PER_STRATUM, allocate, fit_strata, prepare_sample_object
+from source.status import status_mask
+from source.utils import MAX_REQUEST_SIZE, translate_segments
+
+# Width of the histogram bins for segment scores, as in the plots of source.controls
+BIN_WIDTH = 0.05
+# Number of batches queued per concurrent request. Bounds the number of translations held in memory.
+QUEUED_BATCHES = 2
+# Width of the confidence interval at which sequential sampling stops, i.e. a margin of +/- 0.025
+TARGET_WIDTH = 0.05
+
+
+class RunningPED:
+    """Post-Edit Density, score histogram and triage counts of the segments scored so far.
+
+    Arguments:
+        total -- number of segments to be scored, for reporting progress
+        bin_width -- width of the histogram bins. Scores of 1 and above are counted in the last bin.
+        ba_limit -- lower limit for the bad_apples classification
+        pp_limit -- upper limit for the peach perfect classification
+    """
+
+    def __init__(self, total=0, bin_width=BIN_WIDTH, ba_limit=BA_LIMIT, pp_limit=PP_LIMIT):
+        self.total = total
+        self.bin_width = bin_width
+        self.ba_limit = ba_limit
+        self.pp_limit = pp_limit
+        self.segments = 0
+        self.lev_sum = 0
+        self.max_char_sum = 0
+        self.histogram = [0] * math.ceil(1 / bin_width)
+        self.bad_apples = 0
+        self.peach_perfects = 0
+
+    @property
+    def ped(self):
+        """Aggregated score of all segments so far, i.e. sum of distances divided by sum of string lengths."""
+        return self.lev_sum / self.max_char_sum if self.max_char_sum else float('nan')
+
+    def add(self, lev, max_char, score):
+        """Add the scores of one batch as returned by source.calculation.score_pairs."""
+        self.segments += len(lev)
+        self.lev_sum += int(lev.sum())
+        self.max_char_sum += int(max_char.sum())
+        for s in score:
+            # Pairs with two empty strings have no score
+            if s != s:
+                continue
+            self.histogram[min(int(s / self.bin_width), len(self.histogram) - 1)] += 1
+            self.bad_apples += s >= self.ba_limit
+            self.peach_perfects += s <= self.pp_limit
+
+    def summary(self):
+        """Return figures as dictionary, e.g. for the cache."""
+        return {'ped': self.ped, 'segments': self.segments, 'bad_apples': int(self.bad_apples),
+                'peach_perfects': int(self.peach_perfects), 'histogram_bin_width': self.bin_width,
+                'histogram': list(self.histogram)}
+
+
+def eligible_segments(df):
+    """Select all segments which would be eligible for sampling, with their source and target strings.
+
+    Arguments:
+        df -- Segment table from source.parsing.create_dataframe
+
+    Segments are filtered like in source.sampling.prepare_sample_object, i.e. translated segments without
+    repetitions, but a document without such segments gives an empty list instead of an error.
+
+    Returns:
+        segments -- list of (key, source, target) tuples. The key is a (row, file, unit, seg_id) tuple, see
+                    source.export.KEY_COLUMNS.
+    """
+    items = df[status_mask(df['status'], 'translated')].drop_duplicates('source')
+
+    return list(zip(segment_keys(items), items['source'], items['target']))
+
+
+def segment_keys(items):
+    """Return (row, file, unit, seg_id) tuples for the rows of a segment table."""
+    return list(zip(items.index, items['file'], items['unit'], items['seg_id']))
+
+
+def stream_density(segments, t_lid, s_lid, translator, concurrency=None, use_cache=True,
+                   max_segments=MAX_REQUEST_SIZE, seed=None):
+    """Machine translate segments in batches and score each batch as soon as it returns.
+
+    Arguments:
+        segments -- list of (key, source, target) tuples, e.g. from eligible_segments
+        t_lid, s_lid -- target and source language IDs
+        translator -- MT provider from source.api
+        concurrency -- number of batches in flight. Defaults to the concurrency of the translator
+        use_cache -- Flag to look up and store MT output in the MT cache (see source.mt_cache)
+        max_segments -- maximum number of segments per batch
+        seed -- seed for the processing order
+
+    Segments are processed in random order, so that the running figures are an unbiased estimate of the document
+    score from the first batch on. At most QUEUED_BATCHES batches per concurrent request are translated but not
+    yet scored.
+
+    Yields:
+        running -- RunningPED with the figures of all batches scored so far
+        batch -- list of tuples of the batch just scored, in the order of source.export.RESULT_COLUMNS
+    """
+    segments = list(segments)
+    random.Random(seed).shuffle(segments)
+    concurrency = concurrency or translator.concurrency
+    batches = iter([segments[i:i + max_segments] for i in range(0, len(segments), max_segments)])
+    running = RunningPED(total=len(segments))
+
+    def translate(batch):
+        # Requests of one batch are sent one after another. Batches run concurrently.
+        return batch, translate_segments([s for _, s, _ in batch], t_lid, s_lid, translator, concurrency=1,
+                                         use_cache=use_cache, mt_cache=mt_cache)
+
+    with open_mt_cache(translator, use_cache) as mt_cache, ThreadPoolExecutor(max_workers=concurrency) as executor:
+        pending = set()
+        try:
+            while True:
+                # Keep the queue filled up to its limit
+                while len(pending) < concurrency * QUEUED_BATCHES:
+                    batch = next(batches, None)
+                    if batch is None:
+                        break
+                    pending.add(executor.submit(translate, batch))
+                if not pending:
+                    break
+
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    batch, mt = future.result()
+                    lev, max_char, score = score_pairs([t for _, _, t in batch], mt)
+                    running.add(lev, max_char, score)
+                    yield running, [(*key, float(sc), int(le), int(mc), s, t, m)
+                                    for (key, s, t), m, sc, le, mc in zip(batch, mt, score, lev, max_char)]
+
+        finally:
+            for future in pending:
+                future.cancel()
+
+
+def sequential_density(df, t_lid, s_lid, translator, target_width=TARGET_WIDTH, max_size=None, concurrency=None,
+                       use_cache=True, max_segments=MAX_REQUEST_SIZE, confidence=CONFIDENCE, seed=None):
+    """Grow a stratified sample step by step until the confidence interval of the score is narrow enough.
+
+    Arguments:
+        df -- Segment table from source.parsing.create_dataframe
+        t_lid, s_lid -- target and source language IDs
+        translator -- MT provider from source.api
+        target_width -- sampling stops once the confidence interval is at most this wide
+        max_size -- maximum number of segments to translate. Defaults to all eligible segments
+        concurrency -- number of batches in flight. Defaults to the concurrency of the translator
+        use_cache -- Flag to look up and store MT output in the MT cache (see source.mt_cache)
+        max_segments -- maximum number of segments per batch
+        confidence -- confidence level of the interval
+        seed -- seed for the sample
+
+    Each step translates one batch per concurrent request, spread over the strata of source.sampling.fit_strata
+    in proportion to their size. The estimate is updated with source.calculation.ratio_interval after each step.
+
+    Yields:
+        estimate -- dictionary with 'ped', 'ped_ci', 'confidence', 'segments' and 'total'
+        batch -- list of tuples of the step just scored, in the order of source.export.RESULT_COLUMNS
+    """
+    items = prepare_sample_object(df)
+    max_size = min(max_size or len(items), len(items))
+    strata = fit_strata(items, max_size)
+    rng = random.Random(seed)
+    members = {}
+    for h, idx in strata.groupby(strata).groups.items():
+        members[h] = list(idx)
+        rng.shuffle(members[h])
+    population = {h: len(idx) for h, idx in members.items()}
+    taken = dict.fromkeys(members, 0)
+
+    step = max_segments * (concurrency or translator.concurrency)
+    lev, max_char, labels = [], [], []
+    size = 0
+    with open_mt_cache(translator, use_cache) as mt_cache:
+        while size < max_size:
+            # The first step samples each stratum at least MIN_PER_STRATUM times, so that its variance is known
+            allocation = allocate(population, min(max(size + step, MIN_PER_STRATUM * len(members)), max_size))
+            new = [i for h, idx in members.items() for i in idx[taken[h]:allocation[h]]]
+            if not new:
+                break
+            for h in members:
+                taken[h] = max(taken[h], allocation[h])
+            size += len(new)
+
+            keys = segment_keys(items.loc[new])
+            source = list(items.loc[new, 'source'])
+            targets = list(items.loc[new, 'target'])
+            mt = translate_segments(source, t_lid, s_lid, translator, concurrency=concurrency, use_cache=use_cache,
+                                    mt_cache=mt_cache)
+            batch_lev, batch_max_char, score = score_pairs(targets, mt)
+            lev.append(batch_lev)
+            max_char.append(batch_max_char)
+            labels.extend(strata.loc[new])
+
+            ped, low, high = ratio_interval(np.concatenate(lev), np.concatenate(max_char), labels,
+                                            [population[h] / taken[h] for h in labels], confidence=confidence)
+            estimate = {'ped': ped, 'ped_ci': [low, high], 'confidence': confidence, 'segments': size,
+                        'total': len(items)}
+            yield estimate, [(*key, float(sc), int(le), int(mc), s, t, m) for key, s, t, m, sc, le, mc
+                             in zip(keys, source, targets, mt, score, batch_lev, batch_max_char)]
+
+            if high - low <= target_width:
+                break
+
+
+def open_mt_cache(translator, use_cache=True):
+    """Open one MT cache for all batches of a run, or a placeholder if MT output is not cached.
+
+    Returns:
+        Context manager returning an MTCache or None
+    """
+    if use_cache and translator.cacheable:
+        return MTCache()
+    return nullcontext()
@@ -1,18 +1,14 @@
+import itertools
 import json
-import pandas as pd
 
-from source.api import Error414
-from source.api import call_api, collect_trans_parameters
+from source.api import create_translator
+from source.export import json_safe
+from source.mt_cache import MTCache
 from source.sampling import append_sample_translations
 
-# Set the size of your request batches.
-# Reduce if your average segment size is larger; increase if segments are smaller in size.
-# TODO: Check how multi-byte characters affect request sizes
+# Set the maximum number of segments in a request batch.
+# Batches are also limited by their url-encoded size in bytes, see source.api.MAX_REQUEST_BYTES.
 MAX_REQUEST_SIZE = 50
-# Set the increment at which request sizes are automatically reduced if deemed too long by the API.
-# Smaller increments can mean more (unsuccessful) requests until a valid size has been reached.
-# Larger increments can mean more requests due to smaller batch sizes.
-REDUCE_REQUEST_SIZE_STEP = 10
 
 
 def cleanup_strings(string_list):
@@ -20,88 +16,132 @@ def cleanup_strings(string_list):
     return [w.replace('\n', '') for w in string_list]
 
 
-def img_alt(tag):
-    """Filter for 1st img element with alt text after table data tag"""
-    return tag.has_attr('alt') and tag.parent.name == 'td'
-
-
-def match_target_mt(df):
-    """Create new table with corresponding source, target and MT data in separate columns
+def match_target_mt(df, keep=None):
+    """Select segments with MT output and their source, target and MT strings
 
     Arguments:
-        df -- DataFrame from input module, referencing seg_id, text, and type
+        df -- Segment table from source.parsing.create_dataframe with an 'mt' column
+        keep -- Optional index labels of segments selected even if their MT string is empty, e.g. of a stratified
+                sample whose weights count every sampled segment
 
     Returns:
-        df_mt -- Dataframe with source, target and MT data aligned on index numbers
+        df_mt -- DataFrame with 'file', 'unit', 'seg_id', 'source', 'target' and 'mt' columns for segments with
+                 non-empty MT strings, on the index of df
     """
+    mask = df['mt'] != ''
+    if keep is not None:
+        mask |= df.index.isin(keep)
+    return df.loc[mask, ['file', 'unit', 'seg_id', 'source', 'target', 'mt']]
 
-    # Create boolean filters from segment type data
-    target_idx = df[df['stype'] == 'target'].index
-    mt_idx = df[(df['stype'] == 'mt') & (df['text'] != '')].index
-    # Create new index so that only index numbers are included
-    # that exist in both target_idx and mt_idx
-    intersect = mt_idx.intersection(target_idx)
-    df = df.loc[intersect, ['text', 'stype']]
 
-    strings = {stype: df[df['stype'] == stype].loc[:, 'text'] for stype in ['source', 'target', 'mt']}
+def select_mt_segments(df):
+    """Select segments with MT output and drop repetitions.
 
-    df_mt = pd.DataFrame(strings)
+    Arguments:
+        df -- Segment table from source.parsing.create_dataframe with 'mt' and 'mt_status' columns
 
-    return df_mt
+    Returns:
+        df -- DataFrame containing the segments with MT status "mt", except for repeated source texts
+    """
+    df = df[df['mt_status'] == 'mt']
+
+    # Keep first occurrences of repeated source texts only
+    return df[~df.duplicated('source')]
 
 
-def new_translation(df, cache, sample_object):
+def new_translation(df, cache, sample_object, translator=None, concurrency=None, use_cache=True):
     """
     Helper function managing API calls to generate MT output from source strings
 
     Arguments:
-        df -- Source object DataFrame with columns 'seg_id', 'text', 'stype', 'status'
+        df -- Segment table from source.parsing.create_dataframe
         cache -- Dictionary of metadata for indexing purposes and translation calls
-        sample_object -- DataFrame view of source object
-        source -- List of strings selected for translations
+        sample_object -- DataFrame with the sampled rows of df
+        translator -- Optional MT provider from source.api, e.g. an OfflineTranslator. A new DeepLTranslator is created
+                      for this call if omitted, so that all batches share one connection pool.
+        concurrency -- Optional number of batches in flight. Defaults to the concurrency of the translator
+        use_cache -- Flag to look up and store MT output in the MT cache (see source.mt_cache)
 
     Return:
-        df --
+        df -- Segment table with the translations of the sampled segments in the 'mt' column
     """
-    # Setting text parameter limit according to DeepL API recommendations
-    # This is to prevent URI too long (414) errors
-
-    source = sample_object['text']
-    limit = MAX_REQUEST_SIZE
-    base = limit
-    target_mt = list()
-    t_lid, s_lid = cache['t_lid'], cache['s_lid']
-
-    while limit >= REDUCE_REQUEST_SIZE_STEP:
-        try:
-            if max(len(source), limit) - base <= 0:
-                batch = source[base-limit:len(source)]
-                parameters = collect_trans_parameters(source=batch, target_lang=t_lid, source_lang=s_lid)
-                target_mt += call_api(parameters)
-                break
-
-            else:
-                batch = source[base-limit:base]
-                parameters = collect_trans_parameters(source=batch, target_lang=t_lid, source_lang=s_lid)
-                target_mt += call_api(parameters)
-                base += limit
-
-        except Error414:
-            # If URI is too long, reset variables and send requests for smaller batches
-            limit -= REDUCE_REQUEST_SIZE_STEP
-            base = limit
-            target_mt = list()
-
-    # Update DataFrame with translations as new rows
+    target_mt = translate_segments(list(sample_object['source']), cache['t_lid'], cache['s_lid'], translator=translator,
+                                   concurrency=concurrency, use_cache=use_cache)
+
+    # Update DataFrame with translations in the 'mt' column
     df = append_sample_translations(df, sample_object, target_mt)
 
     return df
 
 
+def translate_segments(source, t_lid, s_lid, translator=None, concurrency=None, use_cache=True, mt_cache=None):
+    """Translate list of source strings. Strings translated in earlier runs are read from the MT cache.
+
+    Arguments:
+        source -- list of source strings
+        t_lid, s_lid -- target and source language IDs
+        translator, concurrency -- see new_translation
+        use_cache -- Flag to look up and store MT output in the MT cache (see source.mt_cache)
+        mt_cache -- Optional open MTCache, e.g. shared by all batches of a run. A new one is opened for this call if
+                    omitted.
+
+    Returns:
+        target_mt -- list of translated strings in the order of source
+    """
+    if translator is None:
+        with create_translator() as translator:
+            return translate_segments(source, t_lid, s_lid, translator, concurrency, use_cache, mt_cache)
+
+    if not (use_cache and translator.cacheable):
+        return send_batches(source, t_lid, s_lid, translator, concurrency)
+
+    if mt_cache is None:
+        with MTCache() as mt_cache:
+            return translate_segments(source, t_lid, s_lid, translator, concurrency, use_cache, mt_cache)
+
+    # Output is cached per provider and request parameters, e.g. a different formality is translated again
+    options = translator.request_options()
+    # Only strings missing from the cache are sent to the MT provider
+    target_mt = mt_cache.lookup(source, s_lid, t_lid, **options)
+    missing = [i for i, t in enumerate(target_mt) if t is None]
+
+    if missing:
+        texts = [source[i] for i in missing]
+        translations = send_batches(texts, t_lid, s_lid, translator, concurrency)
+        for i, translation in zip(missing, translations):
+            target_mt[i] = translation
+        mt_cache.store(texts, translations, s_lid, t_lid, **options)
+
+    return target_mt
+
+
+def send_batches(source, t_lid, s_lid, translator, concurrency=None):
+    """Send list of source strings to the MT provider in batches.
+
+    Arguments:
+        source -- list of source strings
+        t_lid, s_lid -- target and source language IDs
+        translator -- MT provider from source.api
+        concurrency -- Optional number of batches in flight. Defaults to the concurrency of the translator
+
+    Returns:
+        target_mt -- list of translated strings in the order of source
+    """
+    # Pack segments into batches by encoded request size, so that requests stay below the URI limit (414).
+    # Batches which are still too long are split on their own, keeping the translations already received.
+    batches = translator.plan(source, target_lang=t_lid, source_lang=s_lid, max_segments=MAX_REQUEST_SIZE)
+
+    # Batches are sent concurrently and returned in sample order
+    translations = translator.translate_batches(batches, target_lang=t_lid, source_lang=s_lid,
+                                                concurrency=concurrency)
+
+    return list(itertools.chain.from_iterable(translations))
+
+
 def save_cache(fp, cache):
-    """Store cache for reference purposes."""
+    """Store cache for reference purposes. NaN scores are stored as null."""
     with open(fp, 'w', encoding='utf-8') as f:
-        json.dump(cache, f, ensure_ascii=False)
+        json.dump(json_safe(cache), f, ensure_ascii=False, allow_nan=False)
 
 
 def range_positive(start, stop, step):
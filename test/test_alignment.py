@@ -0,0 +1,49 @@
+from source.alignment import align, segment_keys
+
+
+def keys(*ids, file='a.docx'):
+    return [(file, '{}-tu'.format(i), str(i)) for i in ids]
+
+
+def test_segment_keys():
+    assert segment_keys(['1', '2'], [('a.docx', 'u1'), ('b.docx', 'u1')]) == [('a.docx', 'u1', '1'),
+                                                                              ('b.docx', 'u1', '2')]
+
+
+def test_align_by_key():
+    positions, report = align(keys(1, 2, 3), ['x', 'y', 'z'], keys(3, 1, 2), ['z', 'x', 'y'])
+    assert positions == [1, 2, 0]
+    assert report == {'key': 3, 'source': 0, 'unaligned': [], 'unused_mt': 0}
+
+
+def test_align_keeps_files_apart():
+    # Segment IDs restart in each file
+    document = keys(1, 2, file='a.docx') + keys(1, 2, file='b.docx')
+    mt = keys(1, 2, file='b.docx') + keys(1, 2, file='a.docx')
+    positions, _ = align(document, ['a1', 'a2', 'b1', 'b2'], mt, ['b1', 'b2', 'a1', 'a2'])
+    assert positions == [2, 3, 0, 1]
+
+
+def test_align_falls_back_to_source():
+    # Trans-units were regenerated in the MT file
+    positions, report = align(keys(1, 2), ['x', 'y'], keys(7, 8), ['y', 'x'])
+    assert positions == [1, 0]
+    assert report['key'] == 0 and report['source'] == 2
+
+
+def test_align_repeated_sources_in_order():
+    positions, _ = align(keys(1, 2, 3), ['x', 'x', 'x'], keys(7, 8), ['x', 'x'])
+    assert positions == [0, 1, -1]
+
+
+def test_align_duplicate_mt_keys_use_first():
+    positions, report = align(keys(1, 2), ['x', 'y'], keys(1, 1), ['x', 'x'])
+    assert positions == [0, -1]
+    assert report['unaligned'] == keys(2)
+    assert report['unused_mt'] == 1
+
+
+def test_align_reports_unaligned_and_unused():
+    positions, report = align(keys(1, 2), ['x', 'y'], keys(1, 5), ['x', 'q'])
+    assert positions == [0, -1]
+    assert report == {'key': 1, 'source': 0, 'unaligned': keys(2), 'unused_mt': 1}
@@ -0,0 +1,109 @@
+import time
+
+import pytest
+import requests
+
+from benchmarks.fake_deepl import FakeDeepL
+from source.api import DeepLTranslator, Error414, MTProvider, OfflineTranslator, plan_batches
+
+
+def translator(server, **kwargs):
+    kwargs.setdefault('backoff', 0.001)
+    return DeepLTranslator(auth_key='test', url=server.url, **kwargs)
+
+
+def test_translate():
+    with FakeDeepL() as server, translator(server) as client:
+        assert client.translate(['Hallo', 'Welt'], 'EN', 'DE') == ['Hallo', 'Welt']
+    assert server.requests == 1
+
+
+def test_retries_failed_requests():
+    with FakeDeepL(fail=[503, 429, 500]) as server, translator(server, max_retries=4) as client:
+        assert client.translate(['Hallo'], 'EN', 'DE') == ['Hallo']
+    assert server.requests == 4
+    assert server.statuses == {503: 1, 429: 1, 500: 1, 200: 1}
+
+
+def test_honours_retry_after():
+    with FakeDeepL(fail=[429], retry_after=0.5) as server, translator(server) as client:
+        start = time.monotonic()
+        assert client.translate(['Hallo'], 'EN', 'DE') == ['Hallo']
+        elapsed = time.monotonic() - start
+    assert server.requests == 2
+    # The backoff alone would wait 1 ms
+    assert 0.5 <= elapsed < 2
+
+
+def test_gives_up_after_max_retries():
+    with FakeDeepL(fail=[503] * 10) as server, translator(server, max_retries=2) as client:
+        with pytest.raises(Exception):
+            client.translate(['Hallo'], 'EN', 'DE')
+    assert server.requests == 3
+    assert server.statuses == {503: 3}
+
+
+def test_does_not_retry_client_errors():
+    with FakeDeepL(fail=[403]) as server, translator(server) as client:
+        with pytest.raises(Exception):
+            client.translate(['Hallo'], 'EN', 'DE')
+    assert server.requests == 1
+
+
+def test_gives_up_on_connection_errors():
+    # Take a free port and close the server again, so that connections are refused
+    with FakeDeepL() as server:
+        url = server.url
+    client = DeepLTranslator(auth_key='test', url=url, max_retries=2, backoff=0.001)
+    with client, pytest.raises(requests.ConnectionError):
+        client.translate(['Hallo'], 'EN', 'DE')
+
+
+def test_plan_batches():
+    source = ['a', 'bb', 'ccc', 'dddd', 'e']
+    sizes = [1, 2, 3, 4, 1]
+    batches = plan_batches(source, sizes, 5)
+    assert batches == [['a', 'bb'], ['ccc'], ['dddd', 'e']]
+    assert [t for batch in batches for t in batch] == source
+
+
+def test_plan_batches_limits():
+    # Strings larger than the limit are sent on their own
+    assert plan_batches(['a', 'long', 'b'], [1, 10, 1], 5) == [['a'], ['long'], ['b']]
+    assert plan_batches(['a'] * 5, [1] * 5, 100, max_segments=2) == [['a', 'a'], ['a', 'a'], ['a']]
+    assert plan_batches([], [], 5) == []
+
+
+def test_splits_batches_on_414():
+    source = ['Segment {} '.format(i) * 5 for i in range(40)]
+    with FakeDeepL(max_uri=1000) as server, translator(server) as client:
+        assert client.translate_batch(source, 'EN', 'DE') == source
+        assert server.statuses[414] > 0
+        # Later batches are planned with the learned limit, which narrows down until no request fails
+        for _ in range(3):
+            failed = server.statuses[414]
+            batches = client.plan(source, 'EN', 'DE')
+            assert [t for batch in client.translate_batches(batches, 'EN', 'DE') for t in batch] == source
+        assert server.statuses[414] == failed
+    assert server.texts == 4 * len(source)
+
+
+def test_single_segment_over_limit():
+    with FakeDeepL(max_uri=200) as server, translator(server) as client:
+        with pytest.raises(Error414):
+            client.translate_batch(['x' * 500], 'EN', 'DE')
+
+
+def test_provider_without_translate():
+    class Incomplete(MTProvider):
+        name = 'incomplete'
+
+    with pytest.raises(TypeError):
+        Incomplete()
+
+
+def test_offline_provider():
+    with OfflineTranslator(mode='identity') as translator:
+        assert translator.translate_batches([['a', 'b'], ['c']], 'DE', concurrency=2) == [['a', 'b'], ['c']]
+    with OfflineTranslator() as translator:
+        assert translator.translate(['ein Satz'], 'DE') == translator.translate(['ein Satz'], 'DE')
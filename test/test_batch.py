@@ -0,0 +1,69 @@
+import os
+
+import pytest
+
+from benchmarks.sdlxliff import write_sdlxliff
+from source.batch import COLUMNS, COUNTS, run_batch, score_file
+
+
+@pytest.fixture
+def project(tmp_path, monkeypatch):
+    """Project tree with two projects of one client, raw MT files in a mirrored tree and one unreadable file."""
+    # The document cache is kept in data/cache below the working directory
+    monkeypatch.chdir(tmp_path)
+    root, mt_root = tmp_path / 'ab Dez 2010', tmp_path / 'MT'
+    for seed, name in enumerate(['P1/a.sdlxliff', 'P1/b.sdlxliff', 'P2/c.sdlxliff', 'P1/broken.sdlxliff']):
+        fp, mt_fp = root / 'Client' / '03_Projekte' / name, mt_root / 'Client' / '03_Projekte' / name
+        os.makedirs(fp.parent, exist_ok=True)
+        os.makedirs(mt_fp.parent, exist_ok=True)
+        write_sdlxliff(str(fp), 60, seed=seed)
+        write_sdlxliff(str(mt_fp), 60, seed=seed, mt=True)
+
+    # Truncated file, e.g. from an interrupted copy
+    fp.write_text(fp.read_text(encoding='utf-8')[:5000], encoding='utf-8')
+    return str(root), str(mt_root)
+
+
+def test_run_batch(project):
+    root, mt_root = project
+    results = run_batch(root, workers=2, mt_root=mt_root)
+    assert list(results.columns) == COLUMNS
+    assert all(results[column].dtype == 'Int64' for column in COUNTS)
+    assert results['ped'].dtype == float
+
+    documents = results[results['level'] == 'Document']
+    documents = documents.set_index(documents['path'].map(os.path.basename))
+    assert sorted(documents.index) == ['a.sdlxliff', 'b.sdlxliff', 'broken.sdlxliff', 'c.sdlxliff']
+    assert documents.loc['broken.sdlxliff', 'error'].startswith('XMLSyntaxError')
+    assert documents.loc['broken.sdlxliff', ['segments', 'lev', 'max_char']].isna().all()
+    assert documents['error'].isna().sum() == 3
+
+    # Pooled scores are the scores of all segments of the scored documents together
+    projects = results[results['level'] == 'Project'].set_index('Project')
+    assert sorted(projects.index) == ['P1', 'P2']
+    p1 = documents.loc[['a.sdlxliff', 'b.sdlxliff']]
+    assert projects.loc['P1', 'lev'] == p1['lev'].sum()
+    assert projects.loc['P1', 'ped'] == pytest.approx(p1['lev'].sum() / p1['max_char'].sum())
+    relation = results[results['level'] == 'Relation'].iloc[0]
+    assert relation['Relation'] == 'Client'
+    assert relation['segments'] == documents['segments'].sum()
+
+
+def test_run_batch_triage(project):
+    root, mt_root = project
+    results = run_batch(root, workers=1, mt_root=mt_root, triage=True)
+    assert all(results[column].dtype == 'Int64' for column in COUNTS)
+
+    scored = results[results['error'].isna()]
+    assert scored[['lev', 'max_char', 'ped']].isna().all().all()
+    assert scored[['segments', 'bad_apples', 'peach_perfects']].notna().all().all()
+
+    fp = os.path.join(root, 'Client', '03_Projekte', 'P2', 'c.sdlxliff')
+    row = score_file(fp, os.path.join(mt_root, 'Client', '03_Projekte', 'P2', 'c.sdlxliff'), triage=True)
+    assert results.loc[results['path'] == fp, 'bad_apples'].item() == row['bad_apples']
+
+
+def test_score_file_without_mt_file(project):
+    root, _ = project
+    row = score_file(os.path.join(root, 'Client', '03_Projekte', 'P2', 'c.sdlxliff'))
+    assert row['error'] == 'FileNotFoundError: No raw MT file found'
@@ -0,0 +1,84 @@
+import os
+
+import pandas as pd
+import pandas.testing as pdt
+import pytest
+
+from benchmarks.sdlxliff import write_sdlxliff
+from source import caching, parsing
+from source.parsing import PARSER_VERSION, read_from_file
+
+pytest.importorskip('pyarrow')
+
+
+@pytest.fixture
+def doc(tmp_path):
+    fp = str(tmp_path / 'doc.sdlxliff')
+    write_sdlxliff(fp, 50)
+    return fp
+
+
+def test_store_and_load_document(tmp_path):
+    cache_dir = str(tmp_path / 'cache')
+    df = pd.DataFrame({'seg_id': [1, 2], 'source': ['Hello', 'World'], 'target': ['Hallo', None]})
+    cache = {'s_lid': 'EN', 't_lid': 'DE', 'alignment': {'unmatched': []}}
+
+    assert caching.load_document('key', cache_dir=cache_dir) is None
+    caching.store_document('key', df, cache, cache_dir=cache_dir)
+    loaded_df, loaded_cache = caching.load_document('key', cache_dir=cache_dir)
+
+    pdt.assert_frame_equal(loaded_df, df)
+    assert loaded_cache == cache
+
+
+def test_read_from_file_hit(doc, tmp_path, monkeypatch):
+    # The document cache is kept in data/cache below the working directory
+    monkeypatch.chdir(tmp_path)
+    df, cache = read_from_file(doc)
+    assert len(os.listdir(caching.CACHE_DIR)) == 1
+
+    # A hit returns the stored document without parsing it again
+    monkeypatch.setattr(parsing, 'collect_string_data', None)
+    cached_df, cached_cache = read_from_file(doc)
+
+    pdt.assert_frame_equal(cached_df, df)
+    assert cached_cache == cache
+
+
+def test_key_changes_with_content_version_and_options(doc):
+    key = caching.document_key([doc], PARSER_VERSION, encoding='utf-8', raw_mt=False)
+    assert caching.document_key([doc], PARSER_VERSION, encoding='utf-8', raw_mt=False) == key
+
+    assert caching.document_key([doc], PARSER_VERSION + 'x', encoding='utf-8', raw_mt=False) != key
+    assert caching.document_key([doc], PARSER_VERSION, encoding='latin-1', raw_mt=False) != key
+    assert caching.document_key([doc], PARSER_VERSION, encoding='utf-8', raw_mt=True) != key
+    assert caching.document_key([doc, doc], PARSER_VERSION, encoding='utf-8', raw_mt=False) != key
+
+    with open(doc, 'a', encoding='utf-8') as f:
+        f.write('\n')
+    assert caching.document_key([doc], PARSER_VERSION, encoding='utf-8', raw_mt=False) != key
+
+
+def test_evicts_least_recently_used_entries(tmp_path):
+    cache_dir = str(tmp_path / 'cache')
+    df = pd.DataFrame({'source': ['x' * 1000]})
+    for i, key in enumerate(['a', 'b', 'c']):
+        caching.store_document(key, df, {}, cache_dir=cache_dir)
+        os.utime(caching.entry_path(key, cache_dir), (i, i))
+    size = os.path.getsize(caching.entry_path('a', cache_dir))
+
+    # Loading 'a' marks it as recently used, which makes 'b' the least recently used entry
+    assert caching.load_document('a', cache_dir=cache_dir) is not None
+    caching.store_document('d', df, {}, cache_dir=cache_dir, max_size=3 * size)
+
+    assert sorted(os.listdir(cache_dir)) == ['a.parquet', 'c.parquet', 'd.parquet']
+
+
+def test_evicts_nothing_below_size_limit(tmp_path):
+    cache_dir = str(tmp_path / 'cache')
+    df = pd.DataFrame({'source': ['x' * 1000]})
+    for key in ['a', 'b', 'c']:
+        caching.store_document(key, df, {}, cache_dir=cache_dir)
+
+    caching.evict(cache_dir, max_size=10 * 2 ** 20)
+    assert len(os.listdir(cache_dir)) == 3
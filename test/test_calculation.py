@@ -0,0 +1,158 @@
+import random
+
+import numpy as np
+import pandas as pd
+import pytest
+
+
+from source.calculation import (BA_LIMIT, ENGINES, PP_LIMIT, WORD_SIZE, bounded_distances, classify_pairs,
+                                levenshtein, levenshtein_bitparallel, levenshtein_bounded, levenshtein_reference,
+                                pe_density, pe_triage, ratio_interval, score_pairs, set_engine)
+
+
+def random_pairs(n, max_length, alphabet='abcdeäß ', seed=0):
+    """Create pairs of random strings, half of them edited copies of each other."""
+    rng = random.Random(seed)
+    pairs = []
+    for i in range(n):
+        s1 = ''.join(rng.choice(alphabet) for _ in range(rng.randint(0, max_length)))
+        if i % 2:
+            s2 = ''.join(rng.choice(alphabet) for _ in range(rng.randint(0, max_length)))
+        else:
+            s2 = list(s1)
+            for _ in range(rng.randint(0, 5)):
+                pos = rng.randint(0, len(s2))
+                s2[pos:pos + rng.randint(0, 2)] = rng.choice(alphabet) * rng.randint(0, 2)
+            s2 = ''.join(s2)
+        pairs.append((s1, s2))
+    return pairs
+
+
+@pytest.mark.parametrize('max_length', [8, WORD_SIZE, 3 * WORD_SIZE])
+def test_bitparallel_matches_reference(max_length):
+    for s1, s2 in random_pairs(300, max_length, seed=max_length):
+        assert levenshtein_bitparallel(s1, s2) == levenshtein_reference(s1, s2)
+
+
+def test_known_distances():
+    assert levenshtein('kitten', 'sitting') == 3
+    assert levenshtein('', 'abc') == 3
+    assert levenshtein('abc', '') == 3
+    assert levenshtein('Übersetzung', 'Übersetzung') == 0
+    assert levenshtein('a' * 100 + 'b', 'a' * 100 + 'c') == 1
+
+
+@pytest.mark.parametrize('max_length', [8, WORD_SIZE, 3 * WORD_SIZE])
+def test_bounded_cuts_off_above_k(max_length):
+    for s1, s2 in random_pairs(200, max_length, seed=max_length + 1):
+        distance = levenshtein_reference(s1, s2)
+        for k in (0, 1, 2, distance - 1, distance, distance + 1, 2 * max_length):
+            if k < 0:
+                continue
+            assert levenshtein_bounded(s1, s2, k) == min(distance, k + 1)
+
+
+@pytest.mark.parametrize('max_length', [8, WORD_SIZE, 3 * WORD_SIZE])
+def test_bounded_distances_match_bounded(max_length):
+    pairs = random_pairs(300, max_length, alphabet='abcdeäß 😀', seed=max_length + 2)
+    s1, s2 = [p[0] for p in pairs], [p[1] for p in pairs]
+    rng = random.Random(max_length)
+    k = [rng.randint(0, max_length) for _ in pairs]
+    expected = [min(levenshtein_reference(a, b), bound + 1) for a, b, bound in zip(s1, s2, k)]
+    assert list(bounded_distances(s1, s2, k)) == expected
+    # Without effective bound, the distances are exact
+    assert list(bounded_distances(s1, s2, 10 * max_length)) == [levenshtein_reference(a, b) for a, b in pairs]
+
+
+def test_bounded_distances_carry_across_blocks():
+    # Runs of matches set all bits of a block, so that the carry of the addition ripples through several blocks
+    s1 = 'a' * (3 * WORD_SIZE) + 'b'
+    s2 = 'c' + 'a' * (3 * WORD_SIZE)
+    assert list(bounded_distances([s1, s2], [s2, s1], 1000)) == [2, 2]
+
+
+def test_bounded_by_length_difference():
+    assert levenshtein_bounded('a' * 50, 'a', 10) == 11
+    assert levenshtein_bounded('', 'abc', 3) == 3
+    assert levenshtein_bounded('', 'abc', 2) == 3
+
+
+def test_set_engine():
+    try:
+        set_engine('reference')
+        assert levenshtein('kitten', 'sitting') == 3
+    finally:
+        set_engine('bitparallel')
+    assert set(ENGINES) == {'bitparallel', 'reference'}
+    with pytest.raises(ValueError):
+        set_engine('unknown')
+
+
+def test_score_pairs():
+    lev, max_char, score = score_pairs(['abcd', '', 'abc'], ['abce', '', ''])
+    assert list(lev) == [1, 0, 3]
+    assert list(max_char) == [4, 0, 3]
+    assert score[0] == 0.25 and np.isnan(score[1]) and score[2] == 1.0
+
+
+def test_classify_pairs_agrees_with_scores():
+    pairs = random_pairs(400, 40, seed=7)
+    target, mt = [p[0] for p in pairs], [p[1] for p in pairs]
+    _, _, score = score_pairs(target, mt)
+    triage = classify_pairs(target, mt, ba_limit=0.4, pp_limit=0.05)
+    for s, t in zip(score, triage):
+        if s != s:
+            assert t == ''
+        elif s >= 0.4:
+            assert t == 'bad_apple'
+        elif s <= 0.05:
+            assert t == 'peach_perfect'
+        else:
+            assert t == ''
+
+
+def test_pe_triage_agrees_with_pe_density():
+    pairs = random_pairs(400, 120, seed=8)
+    df = pd.DataFrame({'file': '', 'unit': '', 'seg_id': range(len(pairs)), 'source': '',
+                       'target': [p[0] for p in pairs], 'mt': [p[1] for p in pairs]})
+    cache = pe_triage(df.copy(), {})
+    scores = pd.Series({k: v['score'] for k, v in pe_density(df.copy(), {})['ped_details'].items()})
+    # Counted like the statistics of the GUI
+    assert cache['segments'] == len(pairs)
+    assert cache['bad_apples'] == (scores >= BA_LIMIT).sum()
+    assert cache['peach_perfects'] == (scores <= PP_LIMIT).sum()
+
+
+def test_ratio_interval_single_stratum():
+    lev = [1, 2, 3, 4]
+    max_char = [10, 10, 10, 10]
+    # 4 of 40 segments
+    ped, low, high = ratio_interval(lev, max_char, ['a'] * 4, [10] * 4, confidence=0.95)
+    assert ped == pytest.approx(0.25)
+    residuals = np.array(lev) - 0.25 * np.array(max_char)
+    half_width = 1.959964 * (40 ** 2 * (1 - 4 / 40) * residuals.var(ddof=1) / 4) ** 0.5 / 400
+    assert (low, high) == pytest.approx((0.25 - half_width, 0.25 + half_width))
+
+
+def test_ratio_interval_weights_strata():
+    # Stratum 'b' stands for three times as many segments as stratum 'a'
+    ped, low, high = ratio_interval([0, 0, 5, 5], [10, 10, 10, 10], ['a', 'a', 'b', 'b'], [10, 10, 30, 30])
+    assert ped == pytest.approx(0.375)
+    assert low == high == pytest.approx(0.375)
+
+
+def test_ratio_interval_census_has_no_variance():
+    ped, low, high = ratio_interval([1, 3, 7], [10, 10, 10], ['a', 'a', 'b'], [1, 1, 1])
+    assert ped == pytest.approx(11 / 30)
+    assert low == high == pytest.approx(ped)
+
+
+def test_ratio_interval_unknown_variance():
+    # A single pair out of 20 segments in stratum 'b' leaves its variance unknown
+    ped, low, high = ratio_interval([1, 3, 7], [10, 10, 10], ['a', 'a', 'b'], [5, 5, 20])
+    assert ped == pytest.approx((5 * 4 + 20 * 7) / 300)
+    assert np.isnan(low) and np.isnan(high)
+
+
+def test_ratio_interval_without_characters():
+    assert all(np.isnan(x) for x in ratio_interval([0], [0], ['a'], [1]))
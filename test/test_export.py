@@ -0,0 +1,89 @@
+import csv
+import json
+import math
+
+import pandas as pd
+import pytest
+
+from source.export import (CSV_COLUMNS, META_COLUMNS, RESULT_COLUMNS, CsvWriter, JsonlWriter, ResultWriter,
+                           RowWriter, save_summary)
+
+CACHE = {'Relation': 'ACME', 'Document': 'manual.docx', 's_lid': 'EN', 't_lid': 'DE'}
+
+
+def rows(n):
+    return [(i, 'a.docx', '{}-tu'.format(i), i + 1, 0.5, 2, 4, 'source', 'Ziel', 'MT') for i in range(n)]
+
+
+def test_csv_writer(tmp_path):
+    fp = tmp_path / 'scores.csv'
+    with CsvWriter(str(fp), CACHE) as writer:
+        writer.write(rows(3))
+    assert writer.segments == 3
+
+    with open(fp, encoding='utf-8', newline='') as f:
+        records = list(csv.DictReader(f))
+    assert list(records[0]) == CSV_COLUMNS + META_COLUMNS
+    assert [r['seg_id'] for r in records] == ['1', '2', '3']
+    assert records[2]['unit'] == '2-tu' and records[2]['mt'] == 'MT'
+    assert records[0]['Relation'] == 'ACME' and records[0]['Project'] == ''
+
+
+def test_row_writer_is_abstract():
+    class Incomplete(RowWriter):
+        def close(self):
+            pass
+
+    with pytest.raises(TypeError):
+        Incomplete()
+
+
+def test_jsonl_writer_ends_with_summary(tmp_path):
+    fp = tmp_path / 'scores.jsonl'
+    cache = dict(CACHE)
+    with JsonlWriter(str(fp), cache) as writer:
+        writer.write(rows(2))
+        cache['ped'] = 0.5
+
+    lines = [json.loads(line) for line in fp.read_text(encoding='utf-8').splitlines()]
+    assert list(lines[0]) == RESULT_COLUMNS
+    assert lines[-1] == {'summary': dict(CACHE, ped=0.5)}
+
+
+def test_jsonl_writer_without_summary_on_failure(tmp_path):
+    fp = tmp_path / 'scores.jsonl'
+    with pytest.raises(RuntimeError):
+        with JsonlWriter(str(fp), dict(CACHE)) as writer:
+            writer.write(rows(2))
+            raise RuntimeError('translation failed')
+
+    lines = [json.loads(line) for line in fp.read_text(encoding='utf-8').splitlines()]
+    assert len(lines) == 2 and 'summary' not in lines[-1]
+
+
+def test_json_output_of_empty_document(tmp_path):
+    # Scores of empty documents and empty segments are NaN, which is not valid JSON
+    cache = dict(CACHE, ped=float('nan'), ped_summary={})
+    fp = tmp_path / 'scores.jsonl'
+    with JsonlWriter(str(fp), cache) as writer:
+        writer.write([(0, '', '', 1, math.nan, 0, 0, '', '', '')])
+    first, last = [json.loads(line) for line in fp.read_text(encoding='utf-8').splitlines()]
+    assert first['score'] is None
+    assert last['summary']['ped'] is None
+
+    save_summary(str(tmp_path / 'summary.json'), cache)
+    assert json.loads((tmp_path / 'summary.json').read_text(encoding='utf-8'))['ped'] is None
+
+
+def test_parquet_writer(tmp_path):
+    pytest.importorskip('pyarrow')
+    fp = tmp_path / 'scores.parquet'
+    with ResultWriter(str(fp), CACHE, row_group_size=2) as writer:
+        writer.write(rows(5))
+    assert writer.segments == 5
+
+    df = pd.read_parquet(fp)
+    assert list(df.columns) == RESULT_COLUMNS + META_COLUMNS
+    assert list(df['seg_id']) == [1, 2, 3, 4, 5]
+    assert set(df['file']) == {'a.docx'}
+    assert df['Project'].isna().all()
@@ -0,0 +1,72 @@
+import os
+import time
+
+from benchmarks.fake_deepl import FakeDeepL
+from source.api import DeepLTranslator
+from source.mt_cache import MTCache
+from source.utils import translate_segments
+
+
+def test_lookup_and_store(tmp_path):
+    with MTCache(str(tmp_path / 'mt.sqlite')) as mt_cache:
+        assert mt_cache.lookup(['Hello', 'World'], 'EN', 'DE') == [None, None]
+        mt_cache.store(['Hello'], ['Hallo'], 'EN', 'DE')
+        assert mt_cache.lookup(['Hello', 'World'], 'EN', 'DE') == ['Hallo', None]
+        assert (mt_cache.hits, mt_cache.misses) == (1, 3)
+        assert len(mt_cache) == 1
+
+    # Entries persist between connections
+    with MTCache(str(tmp_path / 'mt.sqlite')) as mt_cache:
+        assert mt_cache.lookup(['Hello'], 'EN', 'DE') == ['Hallo']
+
+
+def test_key_covers_languages_and_options(tmp_path):
+    with MTCache(str(tmp_path / 'mt.sqlite')) as mt_cache:
+        mt_cache.store(['Hello'], ['Hallo'], 'EN', 'DE', provider='deepl', formality='less')
+        assert mt_cache.lookup(['Hello'], 'EN', 'DE', provider='deepl', formality='less') == ['Hallo']
+        assert mt_cache.lookup(['Hello'], 'EN', 'DE', provider='deepl', formality='more') == [None]
+        assert mt_cache.lookup(['Hello'], 'EN', 'DE', provider='deepl') == [None]
+        assert mt_cache.lookup(['Hello'], 'EN', 'FR', provider='deepl', formality='less') == [None]
+
+
+def test_evicts_least_recently_used_on_close(tmp_path):
+    fp = str(tmp_path / 'mt.sqlite')
+    with MTCache(fp, max_entries=3) as mt_cache:
+        for text in ['a', 'b', 'c']:
+            mt_cache.store([text], [text.upper()], 'EN', 'DE')
+            time.sleep(0.01)
+        # Using 'a' makes 'b' the least recently used entry
+        mt_cache.lookup(['a'], 'EN', 'DE')
+        time.sleep(0.01)
+        mt_cache.store(['d'], ['D'], 'EN', 'DE')
+        assert len(mt_cache) == 4
+
+    with MTCache(fp, max_entries=3) as mt_cache:
+        assert len(mt_cache) == 3
+        assert mt_cache.lookup(['a', 'b', 'c', 'd'], 'EN', 'DE') == ['A', None, 'C', 'D']
+
+
+def test_evicts_old_entries(tmp_path):
+    with MTCache(str(tmp_path / 'mt.sqlite'), max_age_days=30) as mt_cache:
+        mt_cache.store(['old', 'new'], ['alt', 'neu'], 'EN', 'DE')
+        mt_cache.connection.execute('UPDATE translations SET created = ? WHERE translation = ?',
+                                    (time.time() - 31 * 86400, 'alt'))
+        mt_cache.evict()
+        assert mt_cache.lookup(['old', 'new'], 'EN', 'DE') == [None, 'neu']
+
+
+def test_translate_segments_uses_cache(tmp_path, monkeypatch):
+    # The MT cache is created in data/ below the working directory
+    monkeypatch.chdir(tmp_path)
+    source = ['Hello', 'World', 'Hello again']
+    with FakeDeepL() as server:
+        with DeepLTranslator(auth_key='test', url=server.url) as translator:
+            assert translate_segments(source, 'DE', 'EN', translator) == source
+            assert translate_segments(source[:2], 'DE', 'EN', translator) == source[:2]
+        assert server.texts == 3
+
+        # Output for other request parameters is not taken from the cache
+        with DeepLTranslator(auth_key='test', url=server.url, options={'formality': 'less'}) as translator:
+            assert translate_segments(source, 'DE', 'EN', translator) == source
+        assert server.texts == 6
+    assert os.path.exists(os.path.join('data', 'mt_cache.sqlite'))
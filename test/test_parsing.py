@@ -0,0 +1,117 @@
+import os
+
+import pytest
+from bs4 import BeautifulSoup
+from lxml import html
+
+from benchmarks.sdlxliff import FILE_FOOTER, FILE_HEADER, FOOTER, HEADER, write_sdlxliff
+from source.parsing import (collect_metadata_html, parse_html_table, parse_xml_stream, parse_xml_strings,
+                            read_from_file)
+
+# Across HTML preview with version history, exported from a test project
+HTML_PREVIEW = os.path.join(os.path.dirname(__file__), 'HTML_preview_test.htm')
+
+# Trans-unit with nested g, x and mrk elements, a comment and entities inside the segments
+MARKUP_UNIT = ('<group><trans-unit id="markup-tu"><source>x</source><seg-source>'
+               '<mrk mtype="seg" mid="1"><g id="1">Press <x id="2"/>&lt;Enter&gt;</g> &amp; '
+               '<mrk mtype="x-sdl-comment" sdl:cid="c1">wait</mrk><!-- note --></mrk> '
+               '<g id="3"><mrk mtype="seg" mid="2">Caf&#233; <g id="4"><g id="5">"open"</g></g></mrk></g>'
+               '</seg-source><target>'
+               '<mrk mtype="seg" mid="1"><g id="1">Drücken Sie <x id="2"/>&lt;Eingabe&gt;</g> &amp; '
+               '<mrk mtype="x-sdl-comment" sdl:cid="c1">warten</mrk></mrk> '
+               '<g id="3"><mrk mtype="seg" mid="2"><!-- note -->Caf&#xE9; <g id="4">&#34;offen&#34;</g></mrk></g>'
+               '</target><sdl:seg-defs><sdl:seg id="1" conf="Translated" origin="interactive"/>'
+               '<sdl:seg id="2" conf="Draft" origin="mt"/></sdl:seg-defs></trans-unit></group>\n')
+
+
+def read_preview():
+    return html.parse(HTML_PREVIEW, parser=html.HTMLParser(encoding='utf-8')).getroot()
+
+
+def test_html_metadata():
+    cache = collect_metadata_html(read_preview())
+    assert cache['Relation'] == 'TEST_MT-INTEGRATION'
+    assert cache['Document'] == 'HTML_preview_test.docx'
+    assert cache['s_lid'] == 'EN'
+    assert cache['t_lid'] == 'DE'
+
+
+def test_html_table():
+    seg_id, text, status = parse_html_table(read_preview(), versions=True)
+    # The first row holds the column headers and has no segment number
+    assert seg_id[1:] == [str(i) for i in range(1, 13)]
+    assert len(text['source']) == len(text['target']) == len(text['mt']) == len(status) == 13
+    assert text['source'][1] == 'This is a text file.'
+    assert text['target'][1] == 'Hier haben wir eine Textdatei.'
+    # Current target and first entry of the version history
+    assert text['target'][3] == 'Es verfügt über einen Header mit Projektdaten.'
+    assert text['mt'][3] == 'Es verfügt über einen Kopf mit Projektdaten.'
+    assert status[2] == 'Übersetzt (Maschinell übersetzt)'
+
+
+def test_html_table_without_versions():
+    _, text, _ = parse_html_table(read_preview())
+    assert 'mt' not in text
+
+
+def test_read_html_preview():
+    df, cache = read_from_file(HTML_PREVIEW, raw_mt=True, use_cache=False)
+    assert df.shape[0] == 12
+    assert list(df.index) == list(range(12))
+    assert list(df['seg_id']) == list(range(1, 13))
+    assert list(df.loc[df['mt_status'] == 'mt', 'seg_id']) == [2, 5]
+    assert df['status'].dtype == 'category'
+    assert df.loc[0, 'mt'] == 'Hier haben wir eine Textdatei.'
+    assert set(df['file']) == {''}
+    assert cache['Project'].strip() == 'TESTRUN_5'
+
+
+def test_read_sdlxliff_with_several_files(tmp_path):
+    fp, mt_fp = str(tmp_path / 'doc.sdlxliff'), str(tmp_path / 'mt.sdlxliff')
+    write_sdlxliff(fp, 200, files=2)
+    write_sdlxliff(mt_fp, 200, files=2, mt=True)
+
+    df, cache = read_from_file(fp, raw_mt=mt_fp, use_cache=False)
+    # Segment IDs restart in the second file, rows are numbered through
+    assert df.index.is_unique and list(df.index) == list(range(df.shape[0]))
+    assert df['seg_id'].duplicated().any()
+    assert not df.duplicated(['file', 'seg_id']).any()
+    assert list(df['file'].cat.categories) == ['C:\\Projekte\\benchmark_1.docx', 'C:\\Projekte\\benchmark_2.docx']
+    assert df['unit'].str.endswith('-tu').all()
+    assert cache['alignment']['key'] == df.shape[0]
+
+
+def parse_both(fp, versions=False):
+    units, stream_units = [], []
+    with open(fp, encoding='utf-8') as f:
+        soup = BeautifulSoup(f, 'xml')
+    return (parse_xml_strings(soup, versions=versions, units=units), units,
+            parse_xml_stream(fp, versions=versions, units=stream_units), stream_units)
+
+
+@pytest.mark.parametrize('versions', [False, True])
+def test_xml_stream_matches_soup_parser(tmp_path, versions):
+    fp = str(tmp_path / 'doc.sdlxliff')
+    write_sdlxliff(fp, 300, files=2)
+
+    strings, units, stream, stream_units = parse_both(fp, versions=versions)
+    assert stream == strings
+    assert stream_units == units
+    assert len(units) == len(strings[0]) == len(strings[1]['source']) == len(strings[1]['target'])
+
+
+def test_xml_stream_matches_soup_parser_on_markup(tmp_path):
+    fp = str(tmp_path / 'markup.sdlxliff')
+    with open(fp, 'w', encoding='utf-8') as f:
+        f.write(HEADER + FILE_HEADER.format(name='markup', s_lid='en-US', t_lid='de-DE', payload='')
+                + MARKUP_UNIT + FILE_FOOTER + FOOTER)
+
+    strings, units, stream, stream_units = parse_both(fp)
+    assert stream == strings
+    assert stream_units == units
+    seg_id, text, status = stream
+    assert seg_id == ['1', '2']
+    assert text['source'] == ['Press <Enter> & wait', 'Café "open"']
+    assert text['target'] == ['Drücken Sie <Eingabe> & warten', 'Café "offen"']
+    assert status == ['Translated', 'Draft']
+    assert units == [('C:\\Projekte\\markup.docx', 'markup-tu')] * 2
@@ -0,0 +1,70 @@
+import json
+import re
+
+import pytest
+
+from benchmarks.sdlxliff import write_sdlxliff
+from source import api
+from source.calculation import BA_LIMIT, PP_LIMIT
+from pe_density import main
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    # The document and MT caches are kept in data/ below the working directory
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+def test_full_document_without_translated_segments(workdir, capsys):
+    fp = str(workdir / 'draft.sdlxliff')
+    write_sdlxliff(fp, 100)
+    with open(fp, encoding='utf-8') as f:
+        text = re.sub(r'conf="[^"]*"', 'conf="Draft"', f.read())
+    with open(fp, 'w', encoding='utf-8') as f:
+        f.write(text)
+
+    assert main([fp, '--full', '--provider', 'offline', '--format', 'jsonl', '--out', 'scores.jsonl']) == 0
+    assert 'Translating 0 segments' in capsys.readouterr().out
+    lines = [json.loads(line) for line in (workdir / 'scores.jsonl').read_text(encoding='utf-8').splitlines()]
+    assert lines == [{'summary': lines[0]['summary']}]
+    assert lines[0]['summary']['ped'] is None
+    assert lines[0]['summary']['ped_summary'] == {}
+
+
+def test_triage_counts_raw_mt_pairs(workdir, capsys):
+    fp, mt_fp = str(workdir / 'doc.sdlxliff'), str(workdir / 'mt.sdlxliff')
+    write_sdlxliff(fp, 200)
+    write_sdlxliff(mt_fp, 200, mt=True)
+
+    assert main([fp, '--raw-mt', mt_fp, '--triage', '--out', 'triage.json']) == 0
+    triage = json.loads((workdir / 'triage.json').read_text(encoding='utf-8'))
+    assert main([fp, '--raw-mt', mt_fp, '--out', 'scores.json']) == 0
+    details = json.loads((workdir / 'scores.json').read_text(encoding='utf-8'))['ped_details']
+    scores = [v['score'] for v in details.values()]
+
+    assert triage['segments'] == len(scores)
+    assert triage['bad_apples'] == sum(s >= BA_LIMIT for s in scores)
+    assert triage['peach_perfects'] == sum(s <= PP_LIMIT for s in scores)
+    assert '{} bad apples'.format(triage['bad_apples']) in capsys.readouterr().out
+
+
+def test_triage_needs_json_output(workdir):
+    with pytest.raises(SystemExit):
+        main(['doc.sdlxliff', '--raw-mt', 'mt.sdlxliff', '--triage', '--format', 'csv', '--out', 'triage.csv'])
+
+
+def test_stratified_sample_keeps_segments_without_mt(workdir, monkeypatch, capsys):
+    fp = str(workdir / 'doc.sdlxliff')
+    write_sdlxliff(fp, 300)
+    # The offline provider returns an empty string for every third source text
+    monkeypatch.setattr(api, 'perturb', lambda text, rate, salt='': '' if len(text) % 3 == 0 else text)
+
+    assert main([fp, '--sampling', 'stratified', '--sample-size', '60', '--provider', 'offline',
+                 '--out', 'scores.json']) == 0
+    details = json.loads((workdir / 'scores.json').read_text(encoding='utf-8'))['ped_details'].values()
+
+    assert len(details) == 60
+    empty = [v for v in details if v['mt'] == '']
+    assert empty and all(v['score'] == 1.0 for v in empty if v['target'])
+    assert '(60 segments)' in capsys.readouterr().out
@@ -0,0 +1,83 @@
+import pandas as pd
+import pytest
+
+from benchmarks.sdlxliff import write_sdlxliff
+from source.parsing import read_from_file
+from source.sampling import (allocate, append_sample_translations, fit_strata, minimum_size, new_sample,
+                             prepare_sample_object, stratified_sample)
+
+
+def segment_table(n, statuses=('Translated',)):
+    """Create a segment table with source strings of growing length."""
+    status = [statuses[i % len(statuses)] for i in range(n)]
+    return pd.DataFrame({'source': ['word ' * (i % 40 + 1) + str(i) for i in range(n)],
+                         'target': ['Wort ' * (i % 40 + 1) + str(i) for i in range(n)],
+                         'status': pd.Series(status, dtype='category')})
+
+
+def test_allocate_is_proportional():
+    population = {'a': 600, 'b': 300, 'c': 100}
+    allocation = allocate(population, 100)
+    assert sum(allocation.values()) == 100
+    for h, n in population.items():
+        assert abs(allocation[h] - n / 10) <= 1
+
+
+def test_allocate_keeps_minimum():
+    allocation = allocate({'a': 990, 'b': 5, 'c': 5}, 20)
+    assert sum(allocation.values()) == 20
+    assert min(allocation.values()) >= 2
+
+
+def test_allocate_samples_small_strata_in_full():
+    allocation = allocate({'a': 100, 'b': 1}, 10)
+    assert allocation['b'] == 1
+    assert sum(allocation.values()) == 10
+
+
+def test_allocate_caps_at_population():
+    assert allocate({'a': 3, 'b': 2}, 50) == {'a': 3, 'b': 2}
+
+
+def test_allocate_rejects_too_small_sample():
+    with pytest.raises(ValueError):
+        allocate({'a': 10, 'b': 10, 'c': 10}, 5)
+
+
+def test_fit_strata_merges_for_small_samples():
+    items = prepare_sample_object(segment_table(400, statuses=('Translated', 'ApprovedTranslation')))
+    # 2 statuses x 4 length classes need 16 segments
+    assert fit_strata(items, 16).nunique() == 8
+    strata = fit_strata(items, 6)
+    assert minimum_size(strata.value_counts().to_dict()) <= 6
+    assert fit_strata(items, 3).nunique() == 1
+
+
+def test_stratified_sample_draws_two_per_stratum():
+    items = prepare_sample_object(segment_table(400, statuses=('Translated', 'ApprovedTranslation')))
+    for sample_size in (3, 6, 10, 50):
+        sample, _ = stratified_sample(items, sample_size, seed=1)
+        assert sample.shape[0] == sample_size
+        assert sample['stratum'].value_counts().min() >= 2
+        # Weights add up to the number of segments
+        assert round(sample['weight'].sum()) == items.shape[0]
+
+
+def test_append_translations_with_repeated_seg_ids(tmp_path):
+    fp = str(tmp_path / 'doc.sdlxliff')
+    write_sdlxliff(fp, 400, files=2)
+    df, _ = read_from_file(fp, use_cache=False)
+    sample_object, _ = new_sample(df, sample_size=20, method='stratified')
+
+    df = append_sample_translations(df, sample_object, ['MT ' + s for s in sample_object['source']])
+    translated = df[df['mt'] != '']
+    assert list(translated.index) == sorted(sample_object.index)
+    assert (translated['mt'] == 'MT ' + translated['source']).all()
+
+
+def test_append_translations_rejects_unknown_rows():
+    df = segment_table(10)
+    with pytest.raises(ValueError):
+        append_sample_translations(df, df.iloc[:2].set_axis([3, 42]), ['a', 'b'])
+    with pytest.raises(ValueError):
+        append_sample_translations(df, df.iloc[:2], ['a'])
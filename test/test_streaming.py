@@ -0,0 +1,67 @@
+import math
+
+from benchmarks.fake_deepl import FakeDeepL
+from benchmarks.sdlxliff import write_sdlxliff
+from source import streaming
+from source.api import DeepLTranslator, OfflineTranslator
+from source.mt_cache import MTCache
+from source.parsing import read_from_file
+from source.streaming import RunningPED, sequential_density, stream_density
+
+
+def segments(n):
+    return [((i, '', '', i + 1), 'Segment number {}'.format(i), 'Segment Nummer {}'.format(i)) for i in range(n)]
+
+
+def test_stream_density_scores_all_segments():
+    with OfflineTranslator(mode='identity') as translator:
+        results = list(stream_density(segments(120), 'DE', 'EN', translator, max_segments=50, seed=1))
+    running = results[-1][0]
+    rows = [row for _, batch in results for row in batch]
+    assert len(results) == 3
+    assert running.segments == running.total == 120
+    assert sorted(row[0] for row in rows) == list(range(120))
+    assert math.isclose(running.ped, sum(row[5] for row in rows) / sum(row[6] for row in rows))
+
+
+def test_stream_density_without_segments():
+    with OfflineTranslator() as translator:
+        assert list(stream_density([], 'DE', 'EN', translator)) == []
+    assert math.isnan(RunningPED().ped)
+
+
+def test_stream_density_opens_one_mt_cache(tmp_path, monkeypatch):
+    opened = []
+
+    class CountingCache(MTCache):
+        def __init__(self):
+            super().__init__(str(tmp_path / 'mt.sqlite'))
+            opened.append(self)
+
+    monkeypatch.setattr(streaming, 'MTCache', CountingCache)
+    with FakeDeepL() as server, DeepLTranslator(auth_key='test', url=server.url, concurrency=3) as translator:
+        for _ in range(2):
+            rows = [row for _, batch in stream_density(segments(200), 'DE', 'EN', translator, max_segments=20)
+                    for row in batch]
+            assert sorted(row[0] for row in rows) == list(range(200))
+    # One cache per run, shared by the batches in all threads. The second run is read from the cache.
+    assert len(opened) == 2
+    assert server.texts == 200
+    assert opened[1].hits == 200
+
+
+def test_sequential_density_keeps_file_keys(tmp_path):
+    fp = str(tmp_path / 'doc.sdlxliff')
+    write_sdlxliff(fp, 400, files=2)
+    df, _ = read_from_file(fp, use_cache=False)
+
+    with OfflineTranslator() as translator:
+        rows = [row for _, batch in sequential_density(df, 'DE', 'EN', translator, target_width=0, max_size=100,
+                                                       seed=1) for row in batch]
+    assert len(rows) == 100
+    # Rows are unique, segment IDs are only unique within their file
+    assert len({row[0] for row in rows}) == 100
+    assert len({row[1:4] for row in rows}) == 100
+    assert {row[1] for row in rows} == set(df['file'])
+    for row in rows:
+        assert df.loc[row[0], 'seg_id'] == row[3] and df.loc[row[0], 'source'] == row[7]